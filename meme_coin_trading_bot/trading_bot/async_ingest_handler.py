@@ -0,0 +1,115 @@
+import os
+import time
+import random
+import asyncio
+import aiohttp
+from urllib.parse import urlsplit
+from .ingest_handler import IngestAPIHandler
+from .http_client import http_client, retry_after_seconds
+
+
+class TokenBucket:
+    """
+        Token bucket limiting how many requests may start per second.
+        Tokens refill continuously at `rate` per second up to `capacity`.
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        async with self.lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+    def penalize(self, seconds):
+        """
+            Push every waiting request back by `seconds` (used on 429s).
+            A floor rather than a deduction, so concurrent 429s from the
+            same rate limit event do not stack their penalties.
+        """
+        self._refill()
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class AsyncIngestAPIHandler(IngestAPIHandler):
+    def __init__(self, rate_limit=None, burst=None, max_in_flight=None, timeout=None, max_retries=5):
+        """
+            asyncio version of IngestAPIHandler. Requests run concurrently
+            and are throttled by a token bucket sized to the CryptoCompare quota.
+        """
+        super().__init__()
+        self.rate_limit = rate_limit or float(os.getenv("CRYPTOCOMPARE_RATE_LIMIT", 20))  # Requests per second
+        self.burst = burst or int(os.getenv("CRYPTOCOMPARE_BURST", 50))
+        self.max_in_flight = max_in_flight or int(os.getenv("CRYPTOCOMPARE_MAX_IN_FLIGHT", 200))
+        self.timeout = timeout or 30  # Seconds
+        self.max_retries = max_retries
+
+    async def _get_json(self, session, bucket, semaphore, url, params=None):
+        """GET a JSON document, backing off on 429s and transient errors"""
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            parts = urlsplit(url)
+            endpoint = f"{parts.netloc}{parts.path}"
+            start = time.perf_counter()
+            try:
+                async with semaphore:
+                    async with session.get(url, params=params) as response:
+                        http_client.latency.record(endpoint, time.perf_counter() - start, response.status)
+                        if response.status == 200:
+                            return await response.json(content_type=None)
+                        if response.status != 429:
+                            return None
+                        delay = retry_after_seconds(response.headers.get("Retry-After"))
+                if delay is None:
+                    delay = 2 ** attempt
+                bucket.penalize(delay)
+                print(f"Rate limited by CryptoCompare, backing off {delay:.1f}s")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                http_client.latency.record(endpoint, time.perf_counter() - start)
+                print(f"Request to {url} failed: {e}")
+                delay = min(2 ** attempt, 30)
+            # Slept after the response and the semaphore are released, so
+            # backing off holds neither a connection nor a concurrency slot
+            await asyncio.sleep(delay + random.uniform(0, 1))
+        return None
+
+    def _session(self):
+        return aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            connector=aiohttp.TCPConnector(limit=self.max_in_flight),
+        )
+
+    async def fetch_coins_data_async(self, coin_symbols, currency="USD"):
+        bucket = TokenBucket(self.rate_limit, self.burst)
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        url = f"{self.base_url}data/pricemultifull"
+        async with self._session() as session:
+            responses = await asyncio.gather(*[
+                self._get_json(session, bucket, semaphore, url, {"fsyms": ",".join(chunk), "tsyms": currency})
+                for chunk in self.chunk_symbols(coin_symbols)
+            ])
+
+        coins_data = {"RAW": {}}
+        for coin_data in responses:
+            if coin_data and coin_data.get("RAW"):
+                coins_data["RAW"].update(coin_data["RAW"])
+        return coins_data
+
+    def fetch_coin_data(self, coin_id, currency="USD"):
+        coins_data = asyncio.run(self.fetch_coins_data_async([coin_id], currency))
+        return coins_data if coins_data["RAW"] else None
+
+    def fetch_coins_data(self, coin_symbols, currency="USD"):
+        return asyncio.run(self.fetch_coins_data_async(coin_symbols, currency))
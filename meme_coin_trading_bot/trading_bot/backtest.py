@@ -0,0 +1,491 @@
+import math
+import datetime
+import numpy as np
+from .filtering_handler import FilteringAlgorithm
+from .indicator_store import RSI_PERIOD, MA_WINDOWS
+from .latest_quotes import latest_market_data
+from .models import LatestQuote, MarketData, MemeCoins
+from .scoring import ColumnarScorer
+
+# Tick columns replayed, named as in HistoryStore, with their MarketData field
+TICK_COLUMNS = {
+    "price": "price",
+    "volume_24h": "volume_24h_base",
+    "price_change_1h": "price_change_percentage_1h",
+    "price_change_24h": "price_change_percentage_24h",
+}
+
+
+def best_markets(coin_ids=None):
+    """
+        Market traded for each coin: the best quote kept on ingest, else the
+        highest volume market of the latest ticks, as get_insights_batch does.
+    """
+    quotes = LatestQuote.objects.filter(is_best=True)
+    if coin_ids is not None:
+        quotes = quotes.filter(coin_id__in=coin_ids)
+    markets = dict(quotes.values_list("coin_id", "market"))
+
+    if coin_ids is None:
+        coin_ids = MarketData.objects.exclude(market=None).values_list("coin_id", flat=True).distinct()
+    missing = [coin_id for coin_id in coin_ids if coin_id not in markets]
+    if missing:
+        best = {}
+        for market_data in latest_market_data(missing).exclude(market=None):
+            current = best.get(market_data.coin_id)
+            if current is None or (market_data.volume_24h_base or 0) > (current.volume_24h_base or 0):
+                best[market_data.coin_id] = market_data
+        markets.update((coin_id, market_data.market) for coin_id, market_data in best.items())
+    return markets
+
+
+class IndicatorArrays:
+    def __init__(self, size, rsi_period=RSI_PERIOD, ma_windows=MA_WINDOWS):
+        """
+            The incremental RSI and moving average states of IndicatorStore
+            (update_rsi, update_moving_averages) held as arrays with one slot
+            per coin, so a batch of ticks of distinct coins is applied in a
+            few array operations. Prices go through the same float operations
+            in the same order, so values match the stored states.
+        """
+        self.rsi_period = rsi_period
+        self.ma_windows = tuple(ma_windows)
+        self.capacity = max(self.ma_windows)
+
+        self.sample_count = np.zeros(size, dtype=np.int64)
+        self.last_price = np.zeros(size)
+        self.avg_gain = np.zeros(size)
+        self.avg_loss = np.zeros(size)
+        # Ring buffer of the last `capacity` prices of each coin
+        self.buffer = np.zeros((size, self.capacity))
+        self.head = np.zeros(size, dtype=np.int64)
+        self.window_sums = {window: np.zeros(size) for window in self.ma_windows}
+
+    def update(self, coins, prices):
+        """Feed one price to each of `coins`, which must be distinct"""
+        counts = self.sample_count[coins]
+        filled = np.minimum(counts, self.capacity)
+
+        # Moving averages first: they read the sample count before this price
+        for window in self.ma_windows:
+            sums = self.window_sums[window][coins] + prices
+            full = filled >= window
+            sums[full] -= self.buffer[coins[full], (self.head[coins[full]] - window) % self.capacity]
+            self.window_sums[window][coins] = sums
+        self.buffer[coins, self.head[coins]] = prices
+        self.head[coins] = (self.head[coins] + 1) % self.capacity
+
+        # Resynchronise the running sums once per buffer length to bound float drift
+        resync = counts % self.capacity == 0
+        lengths = np.minimum(counts[resync] + 1, self.capacity)  # Buffered prices, this one included
+        for coin, length in zip(coins[resync].tolist(), lengths.tolist()):
+            recent = np.roll(self.buffer[coin], -self.head[coin])[self.capacity - length:]
+            for window in self.ma_windows:
+                self.window_sums[window][coin] = math.fsum(recent[-window:])
+
+        # Wilder RSI, with running sums until `rsi_period` deltas are seen
+        period = self.rsi_period
+        delta = np.where(counts > 0, prices - self.last_price[coins], 0.0)
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+        avg_gain, avg_loss = self.avg_gain[coins], self.avg_loss[coins]
+        smoothing = counts > period
+        avg_gain = np.where(smoothing, (avg_gain * (period - 1) + gain) / period, avg_gain + gain)
+        avg_loss = np.where(smoothing, (avg_loss * (period - 1) + loss) / period, avg_loss + loss)
+        seeding = counts == period  # The sums become the simple-average seed
+        avg_gain[seeding] /= period
+        avg_loss[seeding] /= period
+        self.avg_gain[coins], self.avg_loss[coins] = avg_gain, avg_loss
+        self.last_price[coins] = prices
+        self.sample_count[coins] = counts + 1
+
+    def rsi(self):
+        """rsi_value of every coin"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = 100 - (100 / (1 + self.avg_gain / self.avg_loss))
+        values = np.where(self.avg_loss == 0, 100.0, values)
+        return np.where(self.sample_count < self.rsi_period + 1, 0, values)
+
+    def ma(self, window):
+        """ma_value of every coin"""
+        if window not in self.window_sums:
+            return np.zeros(len(self.sample_count))
+        filled = np.minimum(self.sample_count, self.capacity)
+        return np.where(filled < window, 0.0, self.window_sums[window] / window)
+
+
+class TickReader:
+    def __init__(self, columns=None, store=None, pair=None, rows=None):
+        """
+            Reads the ticks of one pair forward in time, either from in-memory
+            `columns` or from the HistoryStore files of `pair`. Timestamps are
+            read ahead in blocks to find where each read stops, then only
+            those rows of the other columns are read, so walking thousands of
+            pairs keeps neither the files open nor the history in memory.
+        """
+        self.columns = columns
+        self.store = store
+        self.pair = pair
+        self.rows = len(columns["timestamp"]) if columns is not None else rows
+        self.cursor = 0
+        self.pending = np.empty(0, dtype=np.int64)  # Timestamps read ahead, from the cursor on
+        self.block = 4096
+
+    def _column(self, name, start, stop):
+        if self.columns is not None:
+            return self.columns[name][start:stop]
+        return self.store.read(*self.pair, name, start, stop)
+
+    def bounds(self):
+        """First and last timestamp"""
+        return int(self._column("timestamp", 0, 1)[0]), int(self._column("timestamp", self.rows - 1, self.rows)[0])
+
+    def read(self, until):
+        """Columns of the ticks after the previous read up to `until` included, or None"""
+        block = self.block
+        while (len(self.pending) == 0 or self.pending[-1] <= until) and self.cursor + len(self.pending) < self.rows:
+            start = self.cursor + len(self.pending)
+            self.pending = np.concatenate((self.pending, self._column("timestamp", start, min(start + block, self.rows))))
+            block *= 2
+        count = int(np.searchsorted(self.pending, until, side="right"))
+        if count == 0:
+            return None
+
+        ticks = {"timestamp": self.pending[:count]}
+        for name in TICK_COLUMNS:
+            ticks[name] = np.asarray(self._column(name, self.cursor, self.cursor + count), dtype=np.float64)
+        self.cursor += count
+        self.pending = self.pending[count:]
+        return ticks
+
+
+class Backtest:
+    def __init__(self, algorithm=None, fee_bps=10, slippage_bps=50, usd_per_trade=100, cycle_minutes=15,
+                 max_buys=3, newest=None, history_store=None):
+        """
+            Replays stored market data through the FilteringAlgorithm strategy
+            and the buy/sell logic of TradingBot.execute_trading_cycle: every
+            `cycle_minutes` open positions are scored for selling, then the
+            best `max_buys` coins ready to buy without an open position are
+            bought for `usd_per_trade`. Ticks stream in time order from the
+            HistoryStore column files (MarketData for pairs never exported)
+            and indicators are updated tick by tick from the full history.
+
+            Fills pay `slippage_bps` against the tick price and `fee_bps` of
+            the notional, the slippageBps/feeBps ExecutionHandler quotes with.
+            `newest` limits buys to the N newest coins created so far, as the
+            live cycle only evaluates the newest coins; None considers all.
+            Without a history_store every pair is read from MarketData.
+        """
+        self.algorithm = algorithm or FilteringAlgorithm()
+        self.scorer = ColumnarScorer(self.algorithm)
+        self.fee = fee_bps / 10000
+        self.slippage = slippage_bps / 10000
+        self.usd_per_trade = usd_per_trade
+        self.cycle_seconds = cycle_minutes * 60
+        self.max_buys = max_buys
+        self.newest = newest
+        self.history_store = history_store
+        self.chunk_steps = 7 * 24 * 60 * 60 // self.cycle_seconds or 1  # Cycles of ticks read at once
+        self.ticks_replayed = 0
+
+    def _readers(self, pairs, end):
+        """
+            A TickReader per pair: over its HistoryStore export, or for pairs
+            never exported, over its MarketData rows loaded now.
+        """
+        readers = []
+        for coin_id, market in pairs:
+            if self.history_store is not None:
+                meta = self.history_store.meta(coin_id, market)
+                if meta["rows"] and all(name in meta.get("columns", ()) for name in ["timestamp", *TICK_COLUMNS]):
+                    readers.append(TickReader(store=self.history_store, pair=(coin_id, market), rows=meta["rows"]))
+                    continue
+
+            history = MarketData.objects.filter(coin_id=coin_id, market=market).exclude(last_updated=None)
+            if end is not None:
+                history = history.filter(last_updated__lte=datetime.datetime.fromtimestamp(end, datetime.timezone.utc))
+            rows = history.order_by("last_updated").values_list("last_updated", *TICK_COLUMNS.values())
+            timestamps, values = [], []
+            for last_updated, *row in rows.iterator(chunk_size=10000):
+                timestamps.append(int(last_updated.timestamp()))
+                values.append(row)
+            values = np.array(values, dtype=np.float64).reshape(-1, len(TICK_COLUMNS))
+            columns = {name: values[:, index] for index, name in enumerate(TICK_COLUMNS)}
+            columns["timestamp"] = np.array(timestamps, dtype=np.int64)
+            readers.append(TickReader(columns=columns))
+        return readers
+
+    def _read_ticks(self, readers, until):
+        """Ticks of every pair after the previous read, up to `until`, merged in time order"""
+        read = {name: [] for name in ["timestamp", "coin", *TICK_COLUMNS]}
+        for index, reader in enumerate(readers):
+            ticks = reader.read(until)
+            if ticks is None:
+                continue
+            for name, values in ticks.items():
+                read[name].append(values)
+            read["coin"].append(np.full(len(ticks["timestamp"]), index, dtype=np.int64))
+
+        if not read["timestamp"]:
+            return {name: np.empty(0, dtype=np.int64) for name in read}
+        ticks = {name: np.concatenate(values) for name, values in read.items()}
+        order = np.argsort(ticks["timestamp"], kind="stable")
+        return {name: values[order] for name, values in ticks.items()}
+
+    def _apply_ticks(self, ticks, latest, indicators):
+        """
+            Apply ticks in time order. A coin can have several ticks in one
+            batch, so they are applied in rounds holding each coin once.
+            Ticks not newer than a coin's last one are ignored, like
+            IndicatorStore does.
+        """
+        coins = ticks["coin"]
+        if len(np.unique(coins)) == len(coins):
+            rounds = [np.arange(len(coins))]
+        else:
+            by_coin = np.argsort(coins, kind="stable")
+            sorted_coins = coins[by_coin]
+            starts = np.concatenate(([True], sorted_coins[1:] != sorted_coins[:-1]))
+            positions = np.arange(len(coins))
+            rank = positions - np.maximum.accumulate(np.where(starts, positions, 0))
+            by_rank = by_coin[np.argsort(rank, kind="stable")]
+            bounds = np.searchsorted(np.sort(rank), np.arange(rank.max() + 2))
+            rounds = [by_rank[bounds[r]:bounds[r + 1]] for r in range(len(bounds) - 1)]
+
+        for batch in rounds:
+            batch_coins = coins[batch]
+            newer = ticks["timestamp"][batch] > latest["timestamp"][batch_coins]
+            batch, batch_coins = batch[newer], batch_coins[newer]
+            if len(batch) == 0:
+                continue
+            latest["timestamp"][batch_coins] = ticks["timestamp"][batch]
+            for name in TICK_COLUMNS:
+                latest[name][batch_coins] = ticks[name][batch]
+            indicators.update(batch_coins, ticks["price"][batch])
+
+    def creation_dates(self, coin_ids):
+        """
+            Creation timestamps of every meme coin (sorted) and of each of
+            `coin_ids`, for newest_mask(). Coins without a creation date are
+            never among the newest.
+        """
+        created = np.array(sorted(
+            int(date.timestamp())
+            for date in MemeCoins.objects.exclude(coin_creation_date=None).values_list("coin_creation_date", flat=True)
+        ), dtype=np.int64)
+        by_coin = dict(
+            MemeCoins.objects.filter(coin_symbol__in=coin_ids).exclude(coin_creation_date=None)
+            .values_list("coin_symbol", "coin_creation_date")
+        )
+        coin_created = np.array([
+            int(by_coin[coin_id].timestamp()) if coin_id in by_coin else np.iinfo(np.int64).max
+            for coin_id in coin_ids
+        ], dtype=np.int64)
+        return created, coin_created
+
+    def newest_mask(self, creation_dates, t):
+        """Mask of the coins among the `newest` most recently created meme coins at time t"""
+        created, coin_created = creation_dates
+        created_so_far = int(np.searchsorted(created, t, side="right"))
+        if created_so_far == 0:
+            return np.zeros(len(coin_created), dtype=bool)
+        threshold = created[max(created_so_far - self.newest, 0)]
+        return (coin_created <= t) & (coin_created >= threshold)
+
+    def pairs(self, coin_ids=None):
+        """(coin_id, market) replayed for `coin_ids` (default: every coin with market data)"""
+        markets = best_markets(coin_ids)
+        return [(coin_id, markets[coin_id]) for coin_id in sorted(markets)]
+
+    def run(self, coin_ids=None, start=None, end=None, strategy=None):
+        """
+            Replay the history of `coin_ids` (default: every coin with market
+            data) and trade from `start` to `end` (datetimes, default: the
+            whole history) with `strategy` (default: the algorithm's).
+            Returns a dict with a summary, the trade list and the equity curve.
+        """
+        pairs = self.pairs(coin_ids)
+        creation_dates = self.creation_dates([coin_id for coin_id, _ in pairs]) if self.newest else None
+        result = self.trade(pairs, self.replay(pairs, start, end), strategy or self.algorithm.strategy, creation_dates)
+        result["summary"]["ticks"] = self.ticks_replayed
+        return result
+
+    def replay(self, pairs, start=None, end=None):
+        """
+            Stream the ticks of `pairs` in time order and yield (t, columns)
+            at every cycle from `start` to `end`, columns holding the insight
+            arrays of every pair (reused between cycles). Ticks before `start`
+            only warm up the indicators. Counts ticks in ticks_replayed.
+        """
+        self.ticks_replayed = 0
+        end = int(end.timestamp()) if end else None
+        readers = self._readers(pairs, end)
+        bounds = [reader.bounds() for reader in readers if reader.rows]
+        if not bounds:
+            return
+        first = min(first for first, _ in bounds)
+        end = end if end is not None else max(last for _, last in bounds)
+        start = int(start.timestamp()) if start else first
+        # Cycles aligned on `start`, the ones before it only warm up indicators
+        first_step = start - (start - first) // self.cycle_seconds * self.cycle_seconds
+        steps = np.arange(first_step, end + 1, self.cycle_seconds, dtype=np.int64)
+
+        size = len(pairs)
+        latest = {"timestamp": np.full(size, np.iinfo(np.int64).min, dtype=np.int64)}
+        latest.update({name: np.full(size, np.nan) for name in TICK_COLUMNS})
+        indicators = IndicatorArrays(size)
+        for chunk_start in range(0, len(steps), self.chunk_steps):
+            chunk = steps[chunk_start:chunk_start + self.chunk_steps]
+            ticks = self._read_ticks(readers, int(chunk[-1]))
+            self.ticks_replayed += len(ticks["timestamp"])
+            step_ends = np.searchsorted(ticks["timestamp"], chunk, side="right")
+            step_start = 0
+            for t, step_end in zip(chunk.tolist(), step_ends.tolist()):
+                if step_end > step_start:
+                    self._apply_ticks(
+                        {name: values[step_start:step_end] for name, values in ticks.items()}, latest, indicators
+                    )
+                    step_start = step_end
+                if t < start:
+                    continue
+                yield t, {
+                    "price": latest["price"],
+                    "ma_50": indicators.ma(50),
+                    "ma_200": indicators.ma(200),
+                    "rsi_14": indicators.rsi(),
+                    "volume_24h": latest["volume_24h"],
+                    "price_change_1h": latest["price_change_1h"],
+                    "price_change_24h": latest["price_change_24h"],
+                }
+
+    def trade(self, pairs, cycles, strategy, creation_dates=None):
+        """
+            Run the trading cycle over (t, columns) of `pairs` from replay()
+            or any other source: sell the open positions the strategy scores
+            for selling, then buy the best candidates. Needs creation_dates()
+            when `newest` is set. Returns the result of run().
+        """
+        size = len(pairs)
+        # Open trades as arrays, oldest first
+        positions = {
+            "coin": np.empty(0, dtype=np.int64),
+            "bought_at": np.empty(0, dtype=np.int64),
+            "buying_price": np.empty(0),
+            "quantity": np.empty(0),
+        }
+        holding = np.zeros(size, dtype=bool)
+        trades, equity, trading_steps = [], [], []
+        realized, prices = 0.0, np.full(size, np.nan)
+
+        for t, columns in cycles:
+            prices = columns["price"]
+
+            # Process existing trades first
+            if len(positions["coin"]):
+                sell, _, _, _ = self.scorer.score_sells(
+                    {name: values[positions["coin"]] for name, values in columns.items()},
+                    positions["buying_price"],
+                    positions["bought_at"],
+                    t * 10 ** 6,
+                    strategy,
+                )
+                if sell.any():
+                    sold = {name: values[sell] for name, values in positions.items()}
+                    closed = self._close(pairs, sold, prices[sold["coin"]], t)
+                    realized += sum(trade["pnl"] for trade in closed)
+                    trades.extend(closed)
+                    holding[sold["coin"]] = False
+                    positions = {name: values[~sell] for name, values in positions.items()}
+
+            # Best buy candidates without an open position
+            ready, scores, _ = self.scorer.score_buys(columns, strategy)
+            eligible = ready & ~holding & (prices > 0)
+            if self.newest:
+                eligible &= self.newest_mask(creation_dates, t)
+            candidates = np.flatnonzero(eligible)
+            if len(candidates):
+                bought = candidates[np.argsort(-scores[candidates], kind="stable")][:self.max_buys]
+                positions = self._open(positions, bought, prices[bought], t)
+                holding[bought] = True
+
+            unrealized = self._liquidation(positions, prices[positions["coin"]]).sum() - self.usd_per_trade * len(positions["coin"])
+            trading_steps.append(t)
+            equity.append(realized + unrealized)
+
+        trades.extend(self._close(pairs, positions, prices[positions["coin"]], None))
+        trades.sort(key=lambda trade: trade["bought_at"])
+        return self._result(trades, np.array(trading_steps, dtype=np.int64), np.array(equity), size)
+
+    def _open(self, positions, coins, prices, t):
+        """Positions with `coins` bought at `prices`"""
+        fill_prices = prices * (1 + self.slippage)
+        quantity = self.usd_per_trade * (1 - self.fee) / fill_prices
+        bought = {
+            "coin": coins,
+            "bought_at": np.full(len(coins), t * 10 ** 6, dtype=np.int64),
+            "buying_price": self.usd_per_trade / quantity,  # USD per token, costs included as in execute_buy_order
+            "quantity": quantity,
+        }
+        return {name: np.concatenate((values, bought[name])) for name, values in positions.items()}
+
+    def _liquidation(self, positions, prices):
+        return positions["quantity"] * prices * (1 - self.slippage) * (1 - self.fee)
+
+    def _close(self, pairs, positions, prices, t):
+        """Trade records of positions sold at `prices`, or marked at them when still open (t is None)"""
+        proceeds = self._liquidation(positions, prices)
+        fees = self.usd_per_trade * self.fee + positions["quantity"] * prices * (1 - self.slippage) * self.fee
+        return [
+            {
+                "coin_id": pairs[coin][0],
+                "market": pairs[coin][1],
+                "status": "OPEN" if t is None else "CLOSED",
+                "bought_at": _datetime(bought_at // 10 ** 6),
+                "sold_at": None if t is None else _datetime(t),
+                "buying_price": buying_price,
+                "selling_price": trade_proceeds / quantity,
+                "quantity": quantity,
+                "cost": self.usd_per_trade,
+                "proceeds": trade_proceeds,
+                "fees": trade_fees,
+                "pnl": trade_proceeds - self.usd_per_trade,
+                "return": trade_proceeds / self.usd_per_trade - 1,
+            }
+            for coin, bought_at, buying_price, quantity, trade_proceeds, trade_fees in zip(
+                positions["coin"].tolist(), positions["bought_at"].tolist(), positions["buying_price"].tolist(),
+                positions["quantity"].tolist(), proceeds.tolist(), fees.tolist(),
+            )
+        ]
+
+    def _result(self, trades, timestamps, equity, coins):
+        closed = [trade for trade in trades if trade["status"] == "CLOSED"]
+        realized = sum(trade["pnl"] for trade in closed)
+        unrealized = sum(trade["pnl"] for trade in trades if trade["status"] == "OPEN")
+        wins = sum(trade["pnl"] > 0 for trade in closed)
+        drawdown = np.maximum.accumulate(np.concatenate(([0.0], equity)))[1:] - equity if len(equity) else equity
+        return {
+            "summary": {
+                "coins": coins,
+                "ticks": None,  # Filled in by run()
+                "cycles": len(timestamps),
+                "start": _datetime(int(timestamps[0])) if len(timestamps) else None,
+                "end": _datetime(int(timestamps[-1])) if len(timestamps) else None,
+                "closed_trades": len(closed),
+                "open_trades": len(trades) - len(closed),
+                "win_rate": wins / len(closed) if closed else None,
+                "invested": sum(trade["cost"] for trade in trades),
+                "fees": sum(trade["fees"] for trade in trades),
+                "realized_pnl": realized,
+                "unrealized_pnl": unrealized,
+                "total_pnl": realized + unrealized,
+                "max_drawdown": float(drawdown.max()) if len(drawdown) else 0.0,
+            },
+            "trades": trades,
+            "timestamps": timestamps,
+            "equity": equity,
+        }
+
+
+def _datetime(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc)
@@ -0,0 +1,144 @@
+import datetime
+import pytz
+from django.db import transaction
+from django.db.models import Min, Q
+from .models import Candle, MarketData
+
+# Bucket length of every timeframe, in seconds
+TIMEFRAMES = {
+    "1m": 60,
+    "15m": 15 * 60,
+    "1h": 60 * 60,
+    "1d": 24 * 60 * 60,
+}
+
+CANDLE_FIELDS = ["open", "high", "low", "close", "volume", "tick_count", "open_at", "close_at"]
+
+
+def bucket_start(last_updated, timeframe):
+    """Start of the timeframe bucket holding a tick, aligned to the Unix epoch in UTC"""
+    seconds = TIMEFRAMES[timeframe]
+    timestamp = int(last_updated.timestamp())
+    return datetime.datetime.fromtimestamp(timestamp - timestamp % seconds, tz=pytz.UTC)
+
+
+def apply_tick(candle, price, volume, last_updated):
+    """Fold one tick into a candle. Ticks older than the open only move the open"""
+    if candle.tick_count == 0:
+        candle.open = candle.high = candle.low = candle.close = price
+        candle.volume = volume
+        candle.open_at = candle.close_at = last_updated
+    else:
+        candle.high = max(candle.high, price)
+        candle.low = min(candle.low, price)
+        if last_updated < candle.open_at:
+            candle.open, candle.open_at = price, last_updated
+        if last_updated > candle.close_at:
+            candle.close, candle.volume, candle.close_at = price, volume, last_updated
+    candle.tick_count += 1
+
+
+class CandleStore:
+    def __init__(self, timeframes=None):
+        """
+            OHLCV candles per (coin_id, market, timeframe), rolled up from the
+            ticks of each ingest so indicators can read a few compact rows per
+            timeframe instead of the raw tick history. MarketData carries no
+            per-interval volume, so a candle's volume is the rolling 24h volume
+            of its closing tick.
+        """
+        self.timeframes = tuple(timeframes or TIMEFRAMES)
+        self.batch_size = 1000
+
+    def _new_candle(self, coin_id, market, timeframe, start):
+        return Candle(coin_id=coin_id, market=market, timeframe=timeframe, bucket_start=start, tick_count=0)
+
+    def update(self, rows):
+        """
+            Roll newly ingested MarketData rows into their candles. Ticks that
+            are not newer than a candle's close (duplicates, replays) are
+            ignored; rebuild() recomputes candles exactly from the history.
+        """
+        rows = [row for row in rows if row.market is not None and row.last_updated is not None]
+        if not rows:
+            return
+
+        # Only the buckets touched by this ingest are loaded
+        keys = {
+            (row.coin_id, row.market, timeframe, bucket_start(row.last_updated, timeframe))
+            for row in rows for timeframe in self.timeframes
+        }
+        earliest = {}
+        for _, _, timeframe, start in keys:
+            earliest[timeframe] = min(start, earliest.get(timeframe, start))
+        query = Q()
+        for timeframe, start in earliest.items():
+            query |= Q(timeframe=timeframe, bucket_start__gte=start)
+
+        with transaction.atomic():
+            candles = {
+                (candle.coin_id, candle.market, candle.timeframe, candle.bucket_start): candle
+                for candle in Candle.objects.select_for_update().filter(
+                    query, coin_id__in={row.coin_id for row in rows}
+                )
+            }
+            new_candles, changed_candles = {}, {}
+            for row in sorted(rows, key=lambda row: row.last_updated):
+                for timeframe in self.timeframes:
+                    key = (row.coin_id, row.market, timeframe, bucket_start(row.last_updated, timeframe))
+                    candle = candles.get(key)
+                    if candle is None:
+                        candle = candles[key] = new_candles[key] = self._new_candle(*key)
+                    elif row.last_updated <= candle.close_at:
+                        continue
+                    apply_tick(candle, row.price, row.volume_24h_base, row.last_updated)
+                    if key not in new_candles:
+                        changed_candles[key] = candle
+
+            Candle.objects.bulk_create(new_candles.values(), batch_size=self.batch_size)
+            Candle.objects.bulk_update(changed_candles.values(), CANDLE_FIELDS, batch_size=self.batch_size)
+
+    def rebuild(self, coin_symbols=None):
+        """
+            Recompute candles from the full MarketData history in one ordered
+            scan, replacing the stored ones. Candles older than the oldest
+            stored tick are kept: their ticks were dropped by the retention
+            policy, so they cannot be rebuilt. Returns the number of candles.
+        """
+        history = MarketData.objects.exclude(last_updated=None).exclude(market=None)
+        if coin_symbols:
+            history = history.filter(coin_id__in=coin_symbols)
+        first = history.aggregate(first=Min('last_updated'))['first']
+        if first is None:
+            print("No market data to rebuild candles from, keeping the stored ones")
+            return 0
+        history = history.order_by('coin_id', 'market', 'last_updated').values_list(
+            'coin_id', 'market', 'price', 'volume_24h_base', 'last_updated'
+        )
+
+        count = 0
+        with transaction.atomic():
+            covered = Q()
+            for timeframe in self.timeframes:
+                covered |= Q(timeframe=timeframe, bucket_start__gte=bucket_start(first, timeframe))
+            existing = Candle.objects.filter(covered)
+            if coin_symbols:
+                existing = existing.filter(coin_id__in=coin_symbols)
+            existing.delete()
+
+            # Candles are written per (coin_id, market) so memory stays bounded
+            pair, candles = None, {}
+            for coin_id, market, price, volume, last_updated in history.iterator(chunk_size=10000):
+                if (coin_id, market) != pair:
+                    Candle.objects.bulk_create(candles.values(), batch_size=self.batch_size)
+                    count += len(candles)
+                    pair, candles = (coin_id, market), {}
+                for timeframe in self.timeframes:
+                    key = (coin_id, market, timeframe, bucket_start(last_updated, timeframe))
+                    candle = candles.get(key)
+                    if candle is None:
+                        candle = candles[key] = self._new_candle(*key)
+                    apply_tick(candle, price, volume, last_updated)
+            Candle.objects.bulk_create(candles.values(), batch_size=self.batch_size)
+            count += len(candles)
+        return count
@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import hashlib
+import ijson
+from pathlib import Path
+from django.conf import settings
+from .http_client import http_client
+
+
+def coin_digest(coin):
+    """Short stable fingerprint of a coin list entry"""
+    return hashlib.blake2b(json.dumps(coin, sort_keys=True).encode(), digest_size=8).hexdigest()
+
+
+class CoinListCache:
+    def __init__(self, url, cache_dir=None, ttl=None):
+        """
+            Keeps the CryptoCompare coin list on local disk. The payload is
+            revalidated with ETag/If-Modified-Since once it is older than
+            `ttl` seconds, and callers diff it against the digests of the
+            previous cycle to process only added, changed and removed coins.
+            The payload is decoded incrementally so memory stays flat as the
+            coin list grows.
+        """
+        self.url = url
+        self.cache_dir = Path(cache_dir or os.getenv("COIN_LIST_CACHE_DIR", settings.BASE_DIR / ".cache"))
+        self.ttl = int(os.getenv("COIN_LIST_TTL", 3600)) if ttl is None else ttl  # Seconds
+        self.payload_path = self.cache_dir / "coinlist.json"
+        self.meta_path = self.cache_dir / "coinlist.meta.json"
+
+    def _read_json(self, path, default):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return default
+
+    def _write_json(self, path, data):
+        """Write through a temporary file so readers never see a partial file"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def load_meta(self):
+        return self._read_json(self.meta_path, {})
+
+    def refresh(self):
+        """
+            Revalidate the cached payload when it is older than the TTL.
+            Returns the metadata of the payload on disk, or None when there
+            is no usable payload.
+        """
+        meta = self.load_meta()
+        has_payload = self.payload_path.exists() and meta.get("version")
+        if has_payload and time.time() - meta.get("fetched_at", 0) < self.ttl:
+            return meta
+
+        headers = {}
+        if has_payload and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if has_payload and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            with http_client.get(self.url, headers=headers, stream=True) as response:
+                if response.status_code == 304:
+                    meta["fetched_at"] = time.time()
+                    self._write_json(self.meta_path, meta)
+                    return meta
+                if response.status_code != 200:
+                    print(f"Coin list download returned {response.status_code}")
+                    return meta if has_payload else None
+
+                version = self._download(response)
+                meta = {
+                    "version": version,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "fetched_at": time.time(),
+                }
+            self._write_json(self.meta_path, meta)
+        except Exception as e:
+            # The cached copy, if any, is used until a download succeeds
+            print(f"Failed to download the coin list: {e}")
+            return meta if has_payload else None
+        return meta
+
+    def _download(self, response):
+        """Stream the payload to disk, hashing it on the way. Returns its version"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.payload_path.with_suffix(".tmp")
+        version = hashlib.sha256()
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=1024 * 1024):
+                    version.update(chunk)
+                    f.write(chunk)
+            os.replace(tmp_path, self.payload_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return version.hexdigest()
+
+    def iter_coins(self):
+        """Yield (Name, coin) pairs decoded incrementally from the cached payload"""
+        try:
+            with open(self.payload_path, "rb") as f:
+                yield from ijson.kvitems(f, "Data", use_float=True)
+        except FileNotFoundError:
+            return
+
+    def iter_delta(self, previous_digests, digests):
+        """
+            Yield (Name, coin) for coins added or changed since a previous
+            cycle. `digests` is filled with the digest of every coin seen;
+            once exhausted, removed coins are previous_digests - digests.
+        """
+        for name, coin in self.iter_coins():
+            digest = coin_digest(coin)
+            digests[name] = digest
+            if previous_digests.get(name) != digest:
+                yield name, coin
@@ -9,7 +9,9 @@ from solders.transaction import Transaction
 from solders.keypair import Keypair
 import time
 from datetime import timezone
-from .models import Trades, MarketData
+from .models import Trades
+from .http_client import http_client
+from .latest_quotes import LatestQuoteStore
 import dotenv
 
 logger = logging.getLogger(__name__)
@@ -24,6 +26,7 @@ class ExecutionHandler:
         self.wallet = self._load_wallet()
         self.token_list = self._fetch_jupiter_token_list()
         self.jup_base = "https://quote-api.jup.ag/v6"
+        self.latest_quotes = LatestQuoteStore()
 
     def _load_wallet(self) -> Keypair:
         """Load wallet from environment variable"""
@@ -39,7 +42,7 @@ class ExecutionHandler:
     def _fetch_jupiter_token_list_old(self) -> dict:
         """Fetch latest token list from Jupiter"""
         try:
-            response = requests.get("https://token.jup.ag/api/tokens/")
+            response = http_client.get("https://token.jup.ag/api/tokens/")
             response.raise_for_status()
             return {t['symbol'].upper(): t for t in response.json()}
         except Exception as e:
@@ -56,7 +59,7 @@ class ExecutionHandler:
 
         for url in endpoints:
             try:
-                response = requests.get(url, timeout=10)
+                response = http_client.get(url, retries=1)
                 response.raise_for_status()
 
                 # New response format validation
@@ -74,6 +77,10 @@ class ExecutionHandler:
         logger.error("All Jupiter token list endpoints failed")
         return {}
 
+    def _get_sol_data(self):
+        """Latest SOL tick, from the quote kept on ingest when there is one"""
+        return self.latest_quotes.latest("SOL")
+
     def _get_token_metadata(self, symbol: str) -> dict:
         """Get token mint address and decimals"""
         token = self.token_list.get(symbol.upper())
@@ -88,7 +95,7 @@ class ExecutionHandler:
         """Execute buy order for a meme coin"""
         try:
             # Get current SOL price in USD
-            sol_data = MarketData.objects.filter(coin_id="SOL").latest('last_updated')
+            sol_data = self._get_sol_data()
             print("sol_data: ", sol_data)
             sol_price = float(sol_data.price)
             sol_amount = usd_amount / sol_price
@@ -143,7 +150,7 @@ class ExecutionHandler:
             tx_sig = self._execute_swap(quote)
 
             # Get current SOL price
-            sol_data = MarketData.objects.filter(coin_id="SOL").latest('last_updated')
+            sol_data = self._get_sol_data()
             sol_price = float(sol_data.price)
             received_usd = (quote['outAmount'] / 1e9) * sol_price
 
@@ -170,7 +177,7 @@ class ExecutionHandler:
                 "feeBps": "10",  # 0.1% platform fee
                 "onlyDirectRoutes": "false"
             }
-            response = requests.get(f"{self.jup_base}/quote", params=params)
+            response = http_client.get(f"{self.jup_base}/quote", params=params)
             response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
@@ -186,7 +193,8 @@ class ExecutionHandler:
                 "userPublicKey": str(self.wallet.pubkey()),
                 "wrapAndUnwrapSol": True
             }
-            response = requests.post(
+            # Building the swap transaction has no side effects, so retries are safe
+            response = http_client.post(
                 f"{self.jup_base}/swap",
                 json=payload,
                 headers=headers
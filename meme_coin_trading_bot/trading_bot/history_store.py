@@ -0,0 +1,144 @@
+import os
+import json
+import numpy as np
+from pathlib import Path
+from urllib.parse import quote, unquote
+from django.conf import settings
+from .models import MarketData
+
+# Column name -> (MarketData field, dtype); timestamps are Unix seconds
+COLUMNS = {
+    "timestamp": ("last_updated", np.dtype("<i8")),
+    "price": ("price", np.dtype("<f8")),
+    "high_24h": ("high_24h", np.dtype("<f8")),
+    "low_24h": ("low_24h", np.dtype("<f8")),
+    "volume_24h": ("volume_24h_base", np.dtype("<f8")),
+    "price_change_1h": ("price_change_percentage_1h", np.dtype("<f8")),
+    "price_change_24h": ("price_change_percentage_24h", np.dtype("<f8")),
+}
+# Columns of exports written before meta.json recorded them
+LEGACY_COLUMNS = ["timestamp", "price", "high_24h", "low_24h", "volume_24h"]
+
+
+class HistoryStore:
+    def __init__(self, root=None):
+        """
+            Columnar copy of the MarketData history for offline analysis. Each
+            (coin_id, market) gets a directory with one raw little-endian file
+            per column and a meta.json holding the row count, the columns and
+            the newest exported tick. Exports append only ticks newer than
+            that (a changed column set is re-exported in full), and load()
+            memory-maps the files so readers never touch the database.
+            Ticks ingested late, older than the newest exported one, cannot
+            be appended in time order: a pair that has more stored ticks up
+            to that point than it exported is re-exported in full.
+        """
+        self.root = Path(root or os.getenv("HISTORY_STORE_DIR", settings.BASE_DIR / ".cache" / "history"))
+        self.chunk_size = 10000
+
+    def _pair_dir(self, coin_id, market):
+        return self.root / quote(coin_id, safe="") / quote(market, safe="")
+
+    def meta(self, coin_id, market):
+        try:
+            with open(self._pair_dir(coin_id, market) / "meta.json") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"rows": 0, "last_updated": None, "columns": list(COLUMNS)}
+
+    def _write_meta(self, path, meta):
+        tmp_path = path / "meta.json.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path / "meta.json")
+
+    def _flush(self, path, rows):
+        columns = np.array(rows, dtype=np.float64).reshape(-1, len(COLUMNS))
+        for index, (name, (_, dtype)) in enumerate(COLUMNS.items()):
+            with open(path / f"{name}.bin", "ab") as f:
+                f.write(columns[:, index].astype(dtype).tobytes())
+
+    def export_pair(self, coin_id, market, full=False):
+        """Append the new ticks of one coin/market. Returns the number of rows written"""
+        path = self._pair_dir(coin_id, market)
+        path.mkdir(parents=True, exist_ok=True)
+        meta = None if full else self.meta(coin_id, market)
+        if meta is not None and meta["last_updated"] is not None and MarketData.objects.filter(
+            coin_id=coin_id, market=market, last_updated__lte=meta["last_updated"]
+        ).count() > meta["rows"]:
+            print(f"Re-exporting {coin_id}/{market}: ticks older than the last export arrived since")
+            meta = None
+        if meta is None or meta.get("columns", LEGACY_COLUMNS) != list(COLUMNS):
+            full = True
+            meta = {"rows": 0, "last_updated": None, "columns": list(COLUMNS)}
+
+        # Drop anything past the recorded row count, left by an interrupted export
+        for name, (_, dtype) in COLUMNS.items():
+            with open(path / f"{name}.bin", "ab") as f:
+                f.truncate(meta["rows"] * dtype.itemsize)
+
+        history = MarketData.objects.filter(coin_id=coin_id, market=market).exclude(last_updated=None)
+        if meta["last_updated"] is not None:
+            history = history.filter(last_updated__gt=meta["last_updated"])
+        history = history.order_by("last_updated").values_list(*(field for field, _ in COLUMNS.values()))
+
+        written, rows = 0, []
+        for last_updated, *values in history.iterator(chunk_size=self.chunk_size):
+            timestamp = last_updated.timestamp()
+            rows.append([timestamp] + [np.nan if value is None else value for value in values])
+            if len(rows) == self.chunk_size:
+                self._flush(path, rows)
+                written += len(rows)
+                rows = []
+        if rows:
+            self._flush(path, rows)
+            written += len(rows)
+
+        if written:
+            meta = {"rows": meta["rows"] + written, "last_updated": last_updated.isoformat(), "columns": list(COLUMNS)}
+        if written or full:
+            self._write_meta(path, meta)
+        return written
+
+    def export(self, coin_symbols=None, full=False):
+        """Export every coin/market, or those of the given coins. Returns the number of rows written"""
+        pairs = MarketData.objects.exclude(market=None)
+        if coin_symbols:
+            pairs = pairs.filter(coin_id__in=coin_symbols)
+        pairs = pairs.order_by("coin_id", "market").values_list("coin_id", "market").distinct()
+        return sum(self.export_pair(coin_id, market, full) for coin_id, market in pairs)
+
+    def pairs(self):
+        """(coin_id, market) of every exported history"""
+        if not self.root.exists():
+            return []
+        return sorted(
+            (unquote(coin_dir.name), unquote(market_dir.name))
+            for coin_dir in self.root.iterdir() if coin_dir.is_dir()
+            for market_dir in coin_dir.iterdir() if (market_dir / "meta.json").exists()
+        )
+
+    def load(self, coin_id, market):
+        """
+            Read-only memory maps of every exported column of a coin/market,
+            oldest first. Nothing is copied until the arrays are read. Exports
+            older than a column miss it until they are exported again.
+        """
+        path = self._pair_dir(coin_id, market)
+        meta = self.meta(coin_id, market)
+        columns = [name for name in meta.get("columns", LEGACY_COLUMNS) if name in COLUMNS]
+        if meta["rows"] == 0:
+            return {name: np.empty(0, dtype=COLUMNS[name][1]) for name in columns}
+        return {
+            name: np.memmap(path / f"{name}.bin", dtype=COLUMNS[name][1], mode="r", shape=(meta["rows"],))
+            for name in columns
+        }
+
+    def read(self, coin_id, market, name, start, stop):
+        """
+            Rows start:stop of one column, read into memory. Unlike load() no
+            file stays open, for readers stepping through many pairs at once.
+        """
+        dtype = COLUMNS[name][1]
+        path = self._pair_dir(coin_id, market) / f"{name}.bin"
+        return np.fromfile(path, dtype=dtype, count=max(stop - start, 0), offset=start * dtype.itemsize)
@@ -0,0 +1,150 @@
+import time
+import random
+import logging
+import datetime
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def retry_after_seconds(value):
+    """Seconds to wait from a Retry-After header (delay-seconds or HTTP-date), None if it cannot be parsed"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+    return max((retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0.0)
+
+
+class LatencyRecorder:
+    """Thread-safe per-endpoint request latency statistics"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def record(self, endpoint, seconds, status=None):
+        with self.lock:
+            stats = self.endpoints.setdefault(endpoint, {
+                "count": 0, "errors": 0, "total": 0.0, "max": 0.0, "last": 0.0
+            })
+            stats["count"] += 1
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+            stats["last"] = seconds
+            if status is None or status >= 400:
+                stats["errors"] += 1
+        logger.debug(f"{endpoint} -> {status} in {seconds * 1000:.1f}ms")
+
+    def stats(self):
+        """Snapshot of the statistics with the mean latency filled in"""
+        with self.lock:
+            return {
+                endpoint: dict(stats, mean=stats["total"] / stats["count"])
+                for endpoint, stats in self.endpoints.items()
+            }
+
+    def reset(self):
+        with self.lock:
+            self.endpoints = {}
+
+
+class HttpClient:
+    def __init__(self, pool_size=20, max_retries=3, backoff=0.5, timeouts=None):
+        """
+            Shared HTTP client keeping one keep-alive connection pool per
+            host, retrying transient failures with jittered exponential
+            backoff and recording the latency of every request.
+        """
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff = backoff  # Seconds, doubled on every attempt
+
+        # (connect, read) timeouts matched on the longest "host/path" prefix
+        self.timeouts = timeouts or {
+            "": (5, 15),
+            "min-api.cryptocompare.com/data/all/coinlist": (5, 60),
+            "quote-api.jup.ag/v6/quote": (3, 5),
+            "quote-api.jup.ag/v6/swap": (3, 10),
+            "token.jup.ag": (5, 10),
+            "cache.jup.ag": (5, 10),
+            "cdn.jsdelivr.net": (5, 10),
+        }
+        self.latency = LatencyRecorder()
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def _session(self, host):
+        with self.lock:
+            session = self.sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self.sessions[host] = session
+            return session
+
+    def _timeout(self, endpoint):
+        prefix = max((p for p in self.timeouts if endpoint.startswith(p)), key=len, default=None)
+        return self.timeouts.get(prefix, (5, 15))
+
+    def _sleep(self, attempt, response=None):
+        delay = retry_after_seconds(response.headers.get("Retry-After")) if response is not None else None
+        if delay is None:
+            # Full jitter keeps concurrent retries from synchronising
+            delay = random.uniform(0, self.backoff * 2 ** attempt)
+        time.sleep(delay)
+
+    def request(self, method, url, retries=None, **kwargs):
+        """
+            Send a request through the host's pooled session. Connection
+            errors, timeouts and retryable status codes are retried; the
+            final response is returned for the caller to check.
+        """
+        parts = urlsplit(url)
+        endpoint = f"{parts.netloc}{parts.path}"
+        kwargs.setdefault("timeout", self._timeout(endpoint))
+        session = self._session(parts.netloc)
+        retries = self.max_retries if retries is None else retries
+
+        for attempt in range(retries + 1):
+            start = time.perf_counter()
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.latency.record(endpoint, time.perf_counter() - start)
+                if attempt == retries:
+                    raise
+                logger.warning(f"{method} {endpoint} failed ({e}), retrying")
+                self._sleep(attempt)
+                continue
+
+            self.latency.record(endpoint, time.perf_counter() - start, response.status_code)
+            if response.status_code in RETRY_STATUS_CODES and attempt < retries:
+                logger.warning(f"{method} {endpoint} returned {response.status_code}, retrying")
+                self._sleep(attempt, response)
+                continue
+            return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+
+# Shared by every handler so connections are reused across calls
+http_client = HttpClient()
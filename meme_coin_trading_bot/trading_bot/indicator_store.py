@@ -0,0 +1,189 @@
+import os
+import math
+from django.db import transaction
+from .models import IndicatorState, MarketData
+
+RSI_PERIOD = 14
+MA_WINDOWS = (50, 200)  # Read by the insights and the strategy rules as ma_50 and ma_200
+
+
+def update_rsi(state, price, period=RSI_PERIOD):
+    """
+        Feed one price into a Wilder RSI state. `state` is any object with
+        last_price, sample_count, avg_gain and avg_loss attributes. Until
+        `period` deltas are seen avg_gain/avg_loss hold running sums, which
+        become the simple-average seed of Wilder smoothing.
+    """
+    deltas = state.sample_count  # Deltas seen once this price is applied
+    if deltas > 0:
+        delta = price - state.last_price
+        gain = delta if delta > 0 else 0
+        loss = -delta if delta < 0 else 0
+
+        if deltas < period:
+            state.avg_gain += gain
+            state.avg_loss += loss
+        elif deltas == period:
+            state.avg_gain = (state.avg_gain + gain) / period
+            state.avg_loss = (state.avg_loss + loss) / period
+        else:
+            state.avg_gain = (state.avg_gain * (period - 1) + gain) / period
+            state.avg_loss = (state.avg_loss * (period - 1) + loss) / period
+
+    state.last_price = price
+    state.sample_count += 1
+
+
+def rsi_value(state, period=RSI_PERIOD):
+    """Relative Strength Index of a state, 0 until enough history is seen"""
+    if state is None or state.sample_count < period + 1:
+        return 0
+    if state.avg_loss == 0:
+        return 100.0
+    rs = state.avg_gain / state.avg_loss
+    return 100 - (100 / (1 + rs))
+
+
+def update_moving_averages(state, price, windows=MA_WINDOWS):
+    """
+        Feed one price into the rolling moving-average state. `state` has a
+        price_window list (the last max(windows) prices, oldest first) and a
+        window_sums dict of running sums keyed by str(window).
+    """
+    buffer = state.price_window
+    sums = state.window_sums
+    capacity = max(windows)
+
+    for window in windows:
+        key = str(window)
+        if key not in sums:
+            # Window added to the configuration, seed it from the buffer
+            sums[key] = math.fsum(buffer[-window:])
+        sums[key] += price
+        if len(buffer) >= window:
+            sums[key] -= buffer[-window]
+
+    buffer.append(price)
+    if len(buffer) > capacity:
+        del buffer[:len(buffer) - capacity]
+
+    # Resynchronise the running sums once per buffer length to bound float drift
+    if state.sample_count % capacity == 0:
+        for window in windows:
+            sums[str(window)] = math.fsum(buffer[-window:])
+
+
+def ma_value(state, window):
+    """Simple moving average over the last `window` prices, 0.0 until enough history is seen"""
+    if state is None or len(state.price_window) < window or str(window) not in state.window_sums:
+        return 0.0
+    return state.window_sums[str(window)] / window
+
+
+class IndicatorStore:
+    def __init__(self, rsi_period=RSI_PERIOD, ma_windows=None):
+        """
+            Indicator state per (coin_id, market), updated in O(1) per tick
+            as market data is ingested so reads never scan history. Moving
+            averages are kept for 50 and 200 plus the windows listed in the
+            MA_WINDOWS env var (e.g. "20,100"), each exposed as ma_<window>
+            in the insights; a window larger than the stored buffers needs
+            a rebuild.
+        """
+        self.rsi_period = rsi_period
+        configured = ma_windows or (
+            int(window) for window in os.getenv("MA_WINDOWS", "").split(",") if window.strip()
+        )
+        self.ma_windows = tuple(sorted(set(MA_WINDOWS) | set(configured)))
+        self.state_fields = [
+            "last_price", "last_updated", "sample_count", "avg_gain", "avg_loss", "price_window", "window_sums"
+        ]
+
+    def _apply(self, state, price, last_updated):
+        # Moving averages first: they read the sample count before this price
+        update_moving_averages(state, price, self.ma_windows)
+        update_rsi(state, price, self.rsi_period)
+        state.last_updated = last_updated
+
+    def update(self, rows):
+        """
+            Apply newly ingested MarketData rows. Ticks that are not newer
+            than a state's last_updated (duplicates, replays) are ignored.
+            A (coin_id, market) without a state yet is seeded from its stored
+            history first, so it does not start over from a single tick.
+        """
+        rows = sorted((row for row in rows if row.last_updated), key=lambda row: row.last_updated)
+        if not rows:
+            return
+
+        states = {
+            (state.coin_id, state.market): state
+            for state in IndicatorState.objects.filter(coin_id__in={row.coin_id for row in rows})
+        }
+        new_states, changed_states = {}, {}
+        missing = {(row.coin_id, row.market) for row in rows} - set(states)
+        if missing:
+            new_states.update(self._replay({coin_id for coin_id, _ in missing}, missing))
+            states.update(new_states)
+        for row in rows:
+            key = (row.coin_id, row.market)
+            state = states.get(key)
+            if state is None:
+                state = IndicatorState(coin_id=row.coin_id, market=row.market)
+                states[key] = new_states[key] = state
+            elif state.last_updated and row.last_updated <= state.last_updated:
+                continue
+            self._apply(state, float(row.price), row.last_updated)
+            if key not in new_states:
+                changed_states[key] = state
+
+        with transaction.atomic():
+            IndicatorState.objects.bulk_create(new_states.values(), batch_size=1000)
+            IndicatorState.objects.bulk_update(changed_states.values(), self.state_fields, batch_size=1000)
+
+    def get(self, coin_symbol, market):
+        return IndicatorState.objects.filter(coin_id=coin_symbol, market=market).first()
+
+    def rsi(self, state):
+        return rsi_value(state, self.rsi_period)
+
+    def ma(self, state, window):
+        return ma_value(state, window)
+
+    def rebuild(self, coin_symbols=None):
+        """
+            Recompute states from the full MarketData history in one ordered
+            scan, replacing the stored ones. Returns the number of states.
+        """
+        states = self._replay(coin_symbols)
+        with transaction.atomic():
+            existing = IndicatorState.objects.all()
+            if coin_symbols:
+                existing = existing.filter(coin_id__in=coin_symbols)
+            existing.delete()
+            IndicatorState.objects.bulk_create(states.values(), batch_size=1000)
+        return len(states)
+
+    def _replay(self, coin_symbols=None, keys=None):
+        """
+            Unsaved states computed from the MarketData history of
+            `coin_symbols` (default: every coin) in one ordered scan, keyed
+            by (coin_id, market). Only `keys` are kept when given.
+        """
+        history = MarketData.objects.exclude(last_updated=None)
+        if coin_symbols:
+            history = history.filter(coin_id__in=coin_symbols)
+        history = history.order_by('coin_id', 'market', 'last_updated').values_list(
+            'coin_id', 'market', 'price', 'last_updated'
+        )
+
+        states = {}
+        for coin_id, market, price, last_updated in history.iterator(chunk_size=10000):
+            key = (coin_id, market)
+            if keys is not None and key not in keys:
+                continue
+            state = states.get(key)
+            if state is None:
+                state = states[key] = IndicatorState(coin_id=coin_id, market=market)
+            self._apply(state, float(price), last_updated)
+        return states
@@ -0,0 +1,238 @@
+import math
+import numpy as np
+from functools import reduce
+from operator import or_
+from collections import defaultdict
+from django.db.models import F, OuterRef, Q, Subquery, Window
+from django.db.models.functions import Coalesce, RowNumber
+from .models import MarketData, Candle, LatestQuote
+
+# Longest exponent reached inside one _ewm block, keeps beta ** -k finite and precise
+_EWM_MAX_EXPONENT = 50.0
+
+
+def load_prices(coin_symbol, market, limit=None):
+    """Price history of a coin/market, oldest first, as a float64 array"""
+    history = MarketData.objects.filter(coin_id=coin_symbol, market=market)
+    if limit:
+        prices = history.order_by('-last_updated').values_list('price', flat=True)[:limit]
+        return np.fromiter(prices, dtype=np.float64)[::-1]
+    return np.fromiter(history.order_by('last_updated').values_list('price', flat=True), dtype=np.float64)
+
+
+def _columns(rows):
+    # None (missing high/low) becomes NaN
+    columns = np.array(rows, dtype=np.float64).reshape(-1, 3)
+    return {'price': columns[:, 0], 'high': columns[:, 1], 'low': columns[:, 2]}
+
+
+def load_history(coin_symbol, market, limit=None):
+    """Price, 24h high and 24h low history, oldest first, as float64 arrays"""
+    history = MarketData.objects.filter(coin_id=coin_symbol, market=market)
+    fields = ('price', 'high_24h', 'low_24h')
+    if limit:
+        rows = list(history.order_by('-last_updated').values_list(*fields)[:limit])[::-1]
+    else:
+        rows = list(history.order_by('last_updated').values_list(*fields))
+    return _columns(rows)
+
+
+def _pairs_filter(pairs):
+    """Q matching (coin_id, market) pairs, one coin_id IN (...) per market"""
+    coins_by_market = defaultdict(list)
+    for coin_symbol, market in pairs:
+        coins_by_market[market].append(coin_symbol)
+    return reduce(or_, (Q(market=market, coin_id__in=coins) for market, coins in coins_by_market.items()))
+
+
+def _since(queryset, pairs, order_field, limit):
+    """
+        Oldest of the last `limit` rows of every pair, as a lower bound that
+        keeps the windowed query from numbering the whole history. Found
+        with two index seeks per pair, driven by the pairs' LatestQuote
+        rows; None when a pair has no quote yet (history left unbounded).
+    """
+    pair_rows = queryset.filter(coin_id=OuterRef('coin_id'), market=OuterRef('market'))
+    nth_newest = pair_rows.order_by(F(order_field).desc()).values(order_field)[limit - 1:limit]
+    oldest = pair_rows.order_by(order_field).values(order_field)[:1]  # Pairs with fewer than `limit` rows
+    cutoffs = list(
+        LatestQuote.objects.filter(_pairs_filter(pairs)).annotate(
+            cutoff=Coalesce(Subquery(nth_newest), Subquery(oldest))
+        ).values_list('cutoff', flat=True)
+    )
+    if len(cutoffs) < len(pairs):
+        return None
+    return min((cutoff for cutoff in cutoffs if cutoff is not None), default=None)
+
+
+def _load_recent(queryset, pairs, order_field, fields, limit):
+    """Last `limit` rows of every (coin_id, market) pair in one windowed query, as column arrays"""
+    pairs = list(pairs)
+    rows = {pair: [] for pair in pairs}
+    if not pairs:
+        return {}
+
+    history = queryset.filter(_pairs_filter(pairs))
+    since = _since(queryset, pairs, order_field, limit)
+    if since is not None:
+        history = history.filter(**{f'{order_field}__gte': since})
+    history = history.annotate(
+        row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('coin_id'), F('market')],
+            order_by=F(order_field).desc(),
+        )
+    ).filter(row_number__lte=limit).order_by('coin_id', 'market', order_field).values_list(
+        'coin_id', 'market', *fields
+    )
+    for coin_symbol, market, *values in history:
+        rows[(coin_symbol, market)].append(values)
+    return {pair: _columns(pair_rows) for pair, pair_rows in rows.items()}
+
+
+def load_histories(pairs, limit):
+    """
+        load_history for many (coin_symbol, market) pairs in one query,
+        keeping the last `limit` ticks of each. Returns a dict keyed by pair.
+    """
+    return _load_recent(MarketData.objects.all(), pairs, 'last_updated', ('price', 'high_24h', 'low_24h'), limit)
+
+
+def load_candle_histories(pairs, timeframe, limit):
+    """
+        Like load_histories over the candles of a timeframe: 'price' holds
+        the candle closes and 'high'/'low' the candle highs and lows.
+    """
+    candles = Candle.objects.filter(timeframe=timeframe)
+    return _load_recent(candles, pairs, 'bucket_start', ('close', 'high', 'low'), limit)
+
+
+def _ewm(values, alpha, seed):
+    """
+        Exponential smoothing y[n] = (1 - alpha) * y[n-1] + alpha * x[n] with
+        y[-1] = seed, evaluated in closed form over fixed-size blocks:
+        y[k] = beta^(k+1) * (carry + alpha * sum(beta^-(j+1) * x[j])).
+    """
+    beta = 1.0 - alpha
+    out = np.empty(len(values), dtype=np.float64)
+    if len(values) == 0:
+        return out
+    if beta == 0:
+        out[:] = values
+        return out
+
+    block = max(1, int(_EWM_MAX_EXPONENT / -math.log(beta)))
+    exponents = np.arange(1, min(block, len(values)) + 1, dtype=np.float64)
+    growth = beta ** -exponents  # beta^-(j+1)
+    decay = beta ** exponents  # beta^(k+1)
+
+    carry = seed
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        n = len(chunk)
+        smoothed = decay[:n] * (carry + alpha * np.cumsum(chunk * growth[:n]))
+        out[start:start + n] = smoothed
+        carry = smoothed[-1]
+    return out
+
+
+def sma(prices, window):
+    """Simple moving average, NaN until `window` prices are seen"""
+    out = np.full(len(prices), np.nan)
+    if len(prices) >= window:
+        cumulative = np.concatenate(([0.0], np.cumsum(prices)))
+        out[window - 1:] = (cumulative[window:] - cumulative[:-window]) / window
+    return out
+
+
+def ema(prices, span):
+    """Exponential moving average seeded with the SMA of the first `span` prices"""
+    out = np.full(len(prices), np.nan)
+    if len(prices) >= span:
+        seed = prices[:span].mean()
+        out[span - 1] = seed
+        out[span:] = _ewm(prices[span:], 2.0 / (span + 1), seed)
+    return out
+
+
+def wilder(values, period):
+    """Wilder smoothing seeded with the mean of the first `period` values"""
+    out = np.full(len(values), np.nan)
+    if len(values) >= period:
+        seed = values[:period].mean()
+        out[period - 1] = seed
+        out[period:] = _ewm(values[period:], 1.0 / period, seed)
+    return out
+
+
+def rsi(prices, period=14):
+    """Wilder Relative Strength Index, NaN until period + 1 prices are seen"""
+    out = np.full(len(prices), np.nan)
+    if len(prices) < period + 1:
+        return out
+    deltas = np.diff(prices)
+    avg_gain = wilder(np.where(deltas > 0, deltas, 0.0), period)
+    avg_loss = wilder(np.where(deltas < 0, -deltas, 0.0), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = 100 - 100 / (1 + avg_gain / avg_loss)
+    out[1:] = np.where(avg_loss == 0, 100.0, values)
+    return out
+
+
+def macd(prices, fast=12, slow=26, signal=9):
+    """MACD line, signal line and histogram"""
+    line = ema(prices, fast) - ema(prices, slow)
+    signal_line = np.full(len(prices), np.nan)
+    valid = ~np.isnan(line)
+    signal_line[valid] = ema(line[valid], signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger_bands(prices, window=20, num_std=2.0):
+    """Upper, middle and lower Bollinger bands"""
+    middle = sma(prices, window)
+    std = np.full(len(prices), np.nan)
+    if len(prices) >= window:
+        std[window - 1:] = np.lib.stride_tricks.sliding_window_view(prices, window).std(axis=1)
+    return middle + num_std * std, middle, middle - num_std * std
+
+
+def atr(high, low, close, period=14):
+    """
+        Average True Range. MarketData has no per-tick high/low, so callers
+        pass the 24h high/low of each tick with the tick price as close.
+    """
+    previous_close = np.concatenate(([np.nan], close[:-1]))
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - previous_close), np.abs(low - previous_close)))
+    true_range = np.nan_to_num(true_range, nan=0.0)
+    return wilder(true_range, period)
+
+
+def last(series):
+    """Last value of an indicator series, 0.0 when it has not warmed up"""
+    if len(series) == 0 or np.isnan(series[-1]):
+        return 0.0
+    return float(series[-1])
+
+
+def compute_indicators(prices, high=None, low=None, rsi_period=14, ma_windows=(50, 200)):
+    """Latest value of every indicator over one price history"""
+    indicators = {f'rsi_{rsi_period}': last(rsi(prices, rsi_period))}
+    for window in ma_windows:
+        indicators[f'ma_{window}'] = last(sma(prices, window))
+
+    macd_line, signal_line, histogram = macd(prices)
+    upper, middle, lower = bollinger_bands(prices)
+    indicators.update({
+        'ema_12': last(ema(prices, 12)),
+        'ema_26': last(ema(prices, 26)),
+        'macd': last(macd_line),
+        'macd_signal': last(signal_line),
+        'macd_histogram': last(histogram),
+        'bollinger_upper': last(upper),
+        'bollinger_middle': last(middle),
+        'bollinger_lower': last(lower),
+    })
+    if high is not None and low is not None:
+        indicators['atr_14'] = last(atr(high, low, prices))
+    return indicators
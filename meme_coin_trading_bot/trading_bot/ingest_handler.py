@@ -1,9 +1,11 @@
-import requests
 import time 
-import re
 import datetime
 import pytz
+from django.db import transaction
 from .models import Categories, MemeCoins, MemeCoinCategories, MarketData
+from .http_client import http_client
+from .coin_list_cache import CoinListCache
+from .meme_classifier import meme_classifier
 
 
 class IngestAPIHandler:
@@ -13,144 +15,290 @@ class IngestAPIHandler:
         """
         self.base_url = "https://min-api.cryptocompare.com/"
 
-    def fetch_all_coins(self):
-        url = f"{self.base_url}data/all/coinlist"
-
-        response = requests.get(url)
-        if response.status_code == 200:
-            return response.json()["Data"]
-        else:
-            return None
-    
-
-    def is_meme_coin(self, coin_data):
-        """Advanced meme coin detection using 7+ factors"""
-        name = coin_data['Name'].lower()
-        symbol = coin_data['Symbol'].lower()
-        description = coin_data.get('Description', '').lower()
-        image = coin_data.get('ImageUrl', '').lower()
+        # pricemultifull limits for the fsyms parameter
+        self.max_symbols_per_request = 100
+        self.max_fsyms_length = 300
 
-        # Pattern database (expandable list)
-        meme_patterns = {
-            'name_keywords': ['meme', 'doge', 'shib', 'floki', 'pepe', 'elon', 'sats', 'bonk'],
-            'symbol_format': r'\$?[A-Z]{3,5}\d*$',  # Matches formats like DOGE, PEPE2, $SHIB
-            'animal_words': ['inu', 'kitty', 'woof', 'meow', 'hamster'],
-            'meme_references': ['wojak', 'diamond hands', 'to the moon', 'ngmi'],
-            'supply_indicators': ['quadrillion', 'trillion', 'billion supply'],
-            'mascot_check': bool(coin_data.get('LogoUrl'))
-        }
+        self.coin_list_cache = CoinListCache(f"{self.base_url}data/all/coinlist")
 
-        # Scoring system
-        score = 0
+    def iter_all_coins(self):
+        """Yield (Name, coin) pairs of the coin list without loading it whole"""
+        if self.coin_list_cache.refresh() is None:
+            return
+        yield from self.coin_list_cache.iter_coins()
 
-        # Name analysis
-        score += 2 if any(kw in name for kw in meme_patterns['name_keywords']) else 0
-        score += 1 if re.search(r'(.+)(inu|coin|dog|cat)$', name) else 0
-
-        # Symbol analysis
-        score += 2 if re.match(meme_patterns['symbol_format'], coin_data['Symbol']) else 0
-
-        # Description analysis
-        score += 1.5 if any(kw in description for kw in meme_patterns['meme_references']) else 0
-        score += 1 if any(aw in description for aw in meme_patterns['animal_words']) else 0
-        score += 1 if any(si in description for si in meme_patterns['supply_indicators']) else 0
+    def fetch_all_coins(self):
+        if self.coin_list_cache.refresh() is None:
+            return None
+        return dict(self.coin_list_cache.iter_coins())
 
-        # Social proof indicators
-        score += 1.5 if coin_data.get('SocialMentions', 0) > 1000 else 0
-        score += 1 if coin_data.get('RedditSubscribers', 0) > 5000 else 0
+    def fetch_coin_list_delta(self, state):
+        """
+            Compare the coin list with the state saved by the previous cycle
+            ({"version", "digests"}). "coins" lazily yields (Name, coin) for
+            added or changed coins and fills "digests" as it goes, so removed
+            coins are known once it is exhausted. Returns None when the coin
+            list is unavailable.
+        """
+        meta = self.coin_list_cache.refresh()
+        if meta is None:
+            return None
+        digests = {}
+        if state.get("version") == meta["version"]:
+            # Same payload as last cycle, nothing to parse
+            digests.update(state["digests"])
+            coins = iter(())
+        else:
+            coins = self.coin_list_cache.iter_delta(state.get("digests") or {}, digests)
+        return {"version": meta["version"], "coins": coins, "digests": digests}
 
-        return score >= 3  # Threshold for meme classification
 
+    def is_meme_coin(self, coin_data):
+        """Advanced meme coin detection using 7+ factors"""
+        return meme_classifier.is_meme_coin(coin_data)
 
     def fetch_coin_data(self, coin_id, currency="USD"):
-        url = f"{self.base_url}data/pricemultifull?fsyms={coin_id}&tsyms={currency}"
-        response = requests.get(url)
+        url = f"{self.base_url}data/pricemultifull"
+        response = http_client.get(url, params={"fsyms": coin_id, "tsyms": currency})
         if response.status_code == 200:
             return response.json()
         else:
             return None
 
+    def chunk_symbols(self, coin_symbols):
+        """
+            Split symbols into fsyms lists that stay under the symbol-count
+            and character-length limits of pricemultifull
+        """
+        chunk = []
+        for symbol in dict.fromkeys(s for s in coin_symbols if s):
+            if chunk and (len(chunk) >= self.max_symbols_per_request
+                          or len(",".join(chunk + [symbol])) > self.max_fsyms_length):
+                yield chunk
+                chunk = []
+            chunk.append(symbol)
+        if chunk:
+            yield chunk
+
+    def fetch_coins_data(self, coin_symbols, currency="USD"):
+        """
+            Fetch market data for many symbols using as few pricemultifull
+            requests as possible. Returns a response shaped like
+            fetch_coin_data's with every symbol merged under RAW.
+        """
+        coins_data = {"RAW": {}}
+        for chunk in self.chunk_symbols(coin_symbols):
+            coin_data = self.fetch_coin_data(",".join(chunk), currency)
+            if coin_data and coin_data.get("RAW"):
+                coins_data["RAW"].update(coin_data["RAW"])
+        return coins_data
+
+
+
+def parse_launch_date(value):
+    """Parse a CryptoCompare AssetLaunchDate into an aware UTC datetime"""
+    if not value or value == "0000-00-00":
+        return None
+    try:
+        return pytz.UTC.localize(datetime.datetime.strptime(value, '%Y-%m-%d'))
+    except ValueError:
+        return None
 
 
 class IngestDBHandler:
     def __init__(self):
-        pass
+        self.batch_size = 1000
+
+    def _bulk_create(self, model, rows, label):
+        """
+            bulk_create rows skipping conflicts. One malformed row fails the
+            whole batch, so on error retry row by row inside savepoints.
+            Returns the rows that were written or already stored, without
+            the ones that failed.
+        """
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(rows, batch_size=self.batch_size, ignore_conflicts=True)
+            return rows
+        except Exception as e:
+            print(f"Bulk insert of {label} failed ({e}), falling back to row inserts")
+
+        saved = []
+        with transaction.atomic():
+            for row in rows:
+                try:
+                    with transaction.atomic():
+                        model.objects.bulk_create([row], ignore_conflicts=True)
+                    saved.append(row)
+                except Exception as e:
+                    print(f"Error saving {label} row {row}: ", e)
+        return saved
 
     def save_categories(self, categories):
+        existing = set(Categories.objects.values_list('category_id', flat=True))
+        new_categories = {}
         for category in categories:
-            Categories.objects.get_or_create(
-                category_id=category.get("category_id"), 
-                category_name=category.get("name")
-                )
-    
+            category_id = category.get("category_id")
+            if category_id not in existing:
+                new_categories.setdefault(category_id, Categories(
+                    category_id=category_id,
+                    category_name=category.get("name")
+                ))
+        saved = self._bulk_create(Categories, list(new_categories.values()), "categories")
+        print(f"Categories inserted: {len(saved)}")
+
     def save_meme_coins(self, coins):
+        """
+            Insert coins that are not stored yet. Existing coin ids are loaded
+            in one query and the missing rows are written with bulk_create.
+            Returns the rows that were saved.
+        """
+        existing = set(MemeCoins.objects.values_list('coin_id', flat=True))
+        new_coins = {}
         for coin in coins:
-            try:
-                obj, created = MemeCoins.objects.get_or_create(
-                    coin_id=coin.get("Name"),
-                    defaults={
-                        "coin_name": coin.get("CoinName"), 
-                        "coin_full_name": coin.get("FullName"), 
-                        "coin_symbol": coin.get("Symbol"), 
-                        "coin_description": coin.get("Description"), 
-                        "total_coins_mined": coin.get("TotalCoinsMined"),
-                        "coin_creation_date": coin.get("AssetLaunchDate")
-                        }
-                )
-                if created:
-                    print("Coin inserted")
-                else:
-                    print("Coin already exists")
-            except Exception as e:
-                print(f"Duplicate entry detected for {coin.get('Name')}. Skipping...")
-    
+            coin_id = coin.get("Name")
+            if coin_id in existing or coin_id in new_coins:
+                continue
+            total_coins_mined = coin.get("TotalCoinsMined")
+            new_coins[coin_id] = MemeCoins(
+                coin_id=coin_id,
+                coin_name=coin.get("CoinName"),
+                coin_full_name=coin.get("FullName"),
+                coin_symbol=coin.get("Symbol"),
+                coin_description=coin.get("Description"),
+                total_coins_mined=int(total_coins_mined) if total_coins_mined is not None and abs(total_coins_mined) < 2 ** 63 else None,
+                coin_creation_date=parse_launch_date(coin.get("AssetLaunchDate"))
+            )
+
+        with transaction.atomic():
+            saved = self._bulk_create(MemeCoins, list(new_coins.values()), "meme coins")
+        print(f"Coins inserted: {len(saved)}, already existing: {len(coins) - len(new_coins)}")
+        return saved
 
     def save_meme_coin_categories(self, coins):
-        for coin in coins:
-            categories = coin.get("categories")
-            for category in categories:
-                MemeCoinCategories.objects.get_or_create(
-                    coin_id=MemeCoins.objects.get(coin_id=coin.get("id")),
-                    category_id=Categories.objects.get(category_id=category)
+        """
+            Link coins to their categories. Coin and category primary keys are
+            prefetched once, missing categories and links are bulk created in
+            a single transaction.
+        """
+        with transaction.atomic():
+            coin_pks = dict(MemeCoins.objects.values_list('coin_id', 'pk'))
+            category_pks = dict(Categories.objects.values_list('category_id', 'pk'))
+
+            missing_categories = {
+                category for coin in coins for category in coin.get("categories") or []
+                if category not in category_pks
+            }
+            if missing_categories:
+                self._bulk_create(Categories, [
+                    Categories(category_id=category, category_name=category) for category in missing_categories
+                ], "categories")
+                category_pks.update(
+                    Categories.objects.filter(category_id__in=missing_categories).values_list('category_id', 'pk')
                 )
 
+            existing_links = set(MemeCoinCategories.objects.values_list('coin_id_id', 'category_id_id'))
+            new_links = set()
+            for coin in coins:
+                coin_pk = coin_pks.get(coin.get("id"))
+                if coin_pk is None:
+                    print(f"Coin {coin.get('id')} is not stored. Skipping its categories...")
+                    continue
+                for category in coin.get("categories") or []:
+                    category_pk = category_pks.get(category)
+                    if category_pk is None:
+                        print(f"Category {category} is not stored. Skipping it for {coin.get('id')}...")
+                        continue
+                    link = (coin_pk, category_pk)
+                    if link not in existing_links:
+                        new_links.add(link)
+
+            self._bulk_create(MemeCoinCategories, [
+                MemeCoinCategories(coin_id_id=coin_pk, category_id_id=category_pk)
+                for coin_pk, category_pk in new_links
+            ], "meme coin categories")
+        print(f"Meme coin categories inserted: {len(new_links)}")
+
+
+    def parse_market_data(self, coin_name, coin_symbol, currency, coin_data):
+        """
+            Build an unsaved MarketData row from a pricemultifull response.
+            Returns None when the response has no usable quote for the coin.
+        """
+        coin_data = coin_data.get("RAW", {}).get(coin_symbol, {}).get(currency)
+        if not coin_data or coin_data.get("PRICE") is None or coin_data.get("CIRCULATINGSUPPLY") is None:
+            print(f"No market data for {coin_name}. Skipping...")
+            return None
+
+        if coin_data.get("LASTUPDATE"):
+            date = datetime.datetime.fromtimestamp(coin_data.get("LASTUPDATE"), tz=pytz.UTC)
+        else:
+            date = None
+
+        return MarketData(
+            coin_id=coin_name,
+            market=coin_data.get("MARKET"),
+            last_updated=date,
+            price=coin_data.get("PRICE"),
+            currency=coin_data.get("TOSYMBOL"),
+            high_24h=coin_data.get("HIGH24HOUR"),
+            low_24h=coin_data.get("LOW24HOUR"),
+            open_24h=coin_data.get("OPEN24HOUR"),
+            last_volume_base=coin_data.get("LASTVOLUME"),
+            last_volume_quote=coin_data.get("LASTVOLUMETO"),
+            volume_24h_base=coin_data.get("VOLUME24HOUR"),
+            volume_24h_quote=coin_data.get("VOLUME24HOURTO"),
+            price_change_percentage_1h=coin_data.get("CHANGEPCTHOUR"),
+            price_change_percentage_24h=coin_data.get("CHANGEPCT24HOUR"),
+            circulating_supply=coin_data.get("CIRCULATINGSUPPLY"),
+            total_supply=coin_data.get("SUPPLY"),
+            market_cap=coin_data.get("MKTCAP"),
+            market_cap_rank=coin_data.get("MKTCAPRANK"),
+            bid_ask_spread=coin_data.get("BIDASKSPREAD"),
+            liquidity_score=coin_data.get("LIQUIDITYSCORE"),
+            conversion_type=coin_data.get("CONVERSIONTYPE"),
+            conversion_symbol=coin_data.get("CONVERSIONSYMBOL")
+        )
 
     def save_market_data(self, coin_name, coin_symbol, currency, coin_data):
-        try:
-            coin_data = coin_data["RAW"][coin_symbol][currency]
-            if coin_data.get("LASTUPDATE"):
-                date = datetime.datetime.fromtimestamp(coin_data.get("LASTUPDATE"))
-            else:
-                date = None
-            print(" Coin: ", coin_name)
-        
-            obj, created = MarketData.objects.get_or_create(
-                coin_id=coin_name,
-                market=coin_data.get("MARKET"),
-                last_updated=date,
-                price=coin_data.get("PRICE"),
-                currency=coin_data.get("TOSYMBOL"),
-                high_24h=coin_data.get("HIGH24HOUR"),
-                low_24h=coin_data.get("LOW24HOUR"),
-                open_24h=coin_data.get("OPEN24HOUR"),
-                last_volume_base=coin_data.get("LASTVOLUME"),
-                last_volume_quote=coin_data.get("LASTVOLUMETO"),
-                volume_24h_base=coin_data.get("VOLUME24HOUR"),
-                volume_24h_quote=coin_data.get("VOLUME24HOURTO"),
-                price_change_percentage_1h=coin_data.get("CHANGEPCTHOUR"),
-                price_change_percentage_24h=coin_data.get("CHANGEPCT24HOUR"),
-                circulating_supply=coin_data.get("CIRCULATINGSUPPLY"),
-                total_supply=coin_data.get("SUPPLY"),
-                market_cap=coin_data.get("MKTCAP"),
-                market_cap_rank=coin_data.get("MKTCAPRANK"),
-                bid_ask_spread=coin_data.get("BIDASKSPREAD"),
-                liquidity_score=coin_data.get("LIQUIDITYSCORE"),
-                conversion_type=coin_data.get("CONVERSIONTYPE"),
-                conversion_symbol=coin_data.get("CONVERSIONSYMBOL")
-            )
-            if created:
-                print("Coin inserted")
-            else:
-                print("Coin already exists")
-        except Exception as e:
-            print(f"Error: ", e)
\ No newline at end of file
+        row = self.parse_market_data(coin_name, coin_symbol, currency, coin_data)
+        if row:
+            self.save_market_data_bulk([row])
+
+    def save_market_data_bulk(self, rows):
+        """
+            Write a whole cycle of MarketData rows in one transaction. Ticks
+            that are already stored, or repeated in the cycle, are left out
+            before the insert and the (coin_id, market, last_updated) unique
+            constraint skips any that a concurrent writer added meanwhile.
+            Returns the new rows that were saved, so the stores maintained on
+            ingest and the insight cache only see new ticks.
+        """
+        new_rows = self._new_ticks(rows)
+        saved = self._bulk_create(MarketData, new_rows, "market data")
+        duplicates, failed = len(rows) - len(new_rows), len(new_rows) - len(saved)
+        print(
+            f"Saved {len(saved)} market data rows"
+            + (f", {duplicates} already stored" if duplicates else "")
+            + (f", {failed} failed" if failed else "")
+        )
+        return saved
+
+    def _new_ticks(self, rows):
+        """Rows whose (coin_id, market, last_updated) is neither stored nor repeated earlier in `rows`"""
+        seen = set()
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            # Ticks of the batch's coins within its time span, on the unique index
+            seen.update(MarketData.objects.filter(
+                coin_id__in={row.coin_id for row in batch},
+                last_updated__range=(min(row.last_updated for row in batch), max(row.last_updated for row in batch)),
+            ).values_list('coin_id', 'market', 'last_updated'))
+
+        new_rows = []
+        for row in rows:
+            key = (row.coin_id, row.market, row.last_updated)
+            if key not in seen:
+                seen.add(key)
+                new_rows.append(row)
+        return new_rows
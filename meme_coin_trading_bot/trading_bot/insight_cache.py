@@ -0,0 +1,60 @@
+import os
+import time
+from collections import OrderedDict
+
+
+class InsightCache:
+    def __init__(self, max_entries=10000, ttl=None):
+        """
+            LRU cache of coin insights keyed by symbol. Each entry records the
+            version it was computed from (market, last_updated of the best
+            quote and the indicator settings), so a lookup only hits while no
+            newer tick has arrived. Ingest also invalidates the symbols it
+            wrote, and entries expire after `ttl` seconds as a safety net.
+        """
+        self.max_entries = max_entries
+        self.ttl = int(os.getenv("INSIGHT_CACHE_TTL", 3600)) if ttl is None else ttl  # Seconds
+        self.entries = OrderedDict()  # Symbol -> (version, stored_at, insights)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, symbol, version):
+        """Cached insights of a symbol for this version, or None. Callers must not modify them"""
+        entry = self.entries.get(symbol)
+        if entry is None or entry[0] != version or time.monotonic() - entry[1] > self.ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(symbol)
+        return entry[2]
+
+    def set(self, symbol, version, insights):
+        if self.max_entries <= 0:
+            return
+        self.entries[symbol] = (version, time.monotonic(), insights)
+        self.entries.move_to_end(symbol)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, symbols=None):
+        """Drop the given symbols, or everything"""
+        if symbols is None:
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+            return
+        for symbol in symbols:
+            if self.entries.pop(symbol, None) is not None:
+                self.invalidations += 1
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+# Shared so cached insights survive across trading cycles
+insight_cache = InsightCache()
@@ -0,0 +1,124 @@
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from .models import LatestQuote, MarketData
+
+QUOTE_FIELDS = [
+    "last_updated", "price", "currency", "high_24h", "low_24h", "volume_24h_base",
+    "price_change_percentage_1h", "price_change_percentage_24h", "circulating_supply",
+    "total_supply", "market_cap", "market_cap_rank",
+]
+
+
+def latest_market_data(coin_symbols=None):
+    """Newest MarketData tick of every (coin_id, market), using ROW_NUMBER() per partition"""
+    history = MarketData.objects.filter(last_updated__isnull=False)
+    if coin_symbols is not None:
+        history = history.filter(coin_id__in=coin_symbols)
+    return history.annotate(
+        row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('coin_id'), F('market')],
+            order_by=F('last_updated').desc(),
+        )
+    ).filter(row_number=1)
+
+
+def _best_key(quote):
+    return (quote.volume_24h_base or 0, quote.last_updated)
+
+
+class LatestQuoteStore:
+    def __init__(self):
+        """
+            One LatestQuote row per (coin_id, market) holding the newest tick,
+            with is_best marking the highest volume market of each coin, so
+            latest price reads are index lookups whatever the history size.
+        """
+        self.batch_size = 1000
+
+    def update(self, rows):
+        """
+            Upsert newly ingested MarketData rows. Rows without a market or
+            not newer than the stored quote are ignored.
+        """
+        newest = {}
+        for row in rows:
+            if row.market is None or row.last_updated is None:
+                continue
+            key = (row.coin_id, row.market)
+            if key not in newest or row.last_updated > newest[key].last_updated:
+                newest[key] = row
+        if not newest:
+            return
+
+        coin_symbols = {coin_id for coin_id, _ in newest}
+        with transaction.atomic():
+            quotes = {
+                (quote.coin_id, quote.market): quote
+                for quote in LatestQuote.objects.select_for_update().filter(coin_id__in=coin_symbols)
+            }
+            changed = []
+            for key, row in newest.items():
+                quote = quotes.get(key)
+                if quote is not None and quote.last_updated >= row.last_updated:
+                    continue
+                quote = LatestQuote(coin_id=row.coin_id, market=row.market, is_best=False)
+                for field in QUOTE_FIELDS:
+                    setattr(quote, field, getattr(row, field))
+                quotes[key] = quote
+                changed.append(quote)
+
+            LatestQuote.objects.bulk_create(
+                changed,
+                batch_size=self.batch_size,
+                update_conflicts=True,
+                unique_fields=["coin_id", "market"],
+                update_fields=QUOTE_FIELDS,
+            )
+            self._mark_best(coin_symbols)
+
+    def _mark_best(self, coin_symbols):
+        """Recompute is_best for the given coins, clearing before setting so the partial unique index holds"""
+        best = {}
+        for quote in LatestQuote.objects.filter(coin_id__in=coin_symbols).only(
+            "id", "coin_id", "volume_24h_base", "last_updated"
+        ):
+            if quote.coin_id not in best or _best_key(quote) > _best_key(best[quote.coin_id]):
+                best[quote.coin_id] = quote
+        best_ids = [quote.id for quote in best.values()]
+
+        LatestQuote.objects.filter(coin_id__in=coin_symbols, is_best=True).exclude(id__in=best_ids).update(is_best=False)
+        LatestQuote.objects.filter(id__in=best_ids, is_best=False).update(is_best=True)
+
+    def best(self, coin_symbol):
+        """Latest quote of the highest volume market of a coin, or None"""
+        return LatestQuote.objects.filter(coin_id=coin_symbol, is_best=True).first()
+
+    def latest(self, coin_symbol):
+        """best(), falling back to the newest MarketData tick of a coin before its quotes are built"""
+        quote = self.best(coin_symbol)
+        if quote is None:
+            quote = MarketData.objects.filter(coin_id=coin_symbol).latest('last_updated')
+        return quote
+
+    def best_many(self, coin_symbols):
+        """best() for many coins in one query, as a dict keyed by coin id"""
+        return {
+            quote.coin_id: quote
+            for quote in LatestQuote.objects.filter(coin_id__in=coin_symbols, is_best=True)
+        }
+
+    def rebuild(self, coin_symbols=None):
+        """
+            Recompute quotes from the MarketData history, replacing the
+            stored ones. Returns the number of quotes.
+        """
+        rows = list(latest_market_data(coin_symbols))
+        with transaction.atomic():
+            existing = LatestQuote.objects.all()
+            if coin_symbols:
+                existing = existing.filter(coin_id__in=coin_symbols)
+            existing.delete()
+            self.update(rows)
+        return len([row for row in rows if row.market is not None])
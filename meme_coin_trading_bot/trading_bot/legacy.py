@@ -0,0 +1,75 @@
+import re
+from django.db.models import OuterRef, Subquery
+from .models import MarketData
+
+# Implementations the optimized code replaced, kept as references for the
+# parity tests and the benchmark command
+
+
+def legacy_is_meme_coin(coin_data):
+    """The per-call is_meme_coin implementation the classifier replaced"""
+    name = coin_data['Name'].lower()
+    symbol = coin_data['Symbol'].lower()
+    description = coin_data.get('Description', '').lower()
+    image = coin_data.get('ImageUrl', '').lower()
+
+    meme_patterns = {
+        'name_keywords': ['meme', 'doge', 'shib', 'floki', 'pepe', 'elon', 'sats', 'bonk'],
+        'symbol_format': r'\$?[A-Z]{3,5}\d*$',
+        'animal_words': ['inu', 'kitty', 'woof', 'meow', 'hamster'],
+        'meme_references': ['wojak', 'diamond hands', 'to the moon', 'ngmi'],
+        'supply_indicators': ['quadrillion', 'trillion', 'billion supply'],
+        'mascot_check': bool(coin_data.get('LogoUrl'))
+    }
+
+    score = 0
+    score += 2 if any(kw in name for kw in meme_patterns['name_keywords']) else 0
+    score += 1 if re.search(r'(.+)(inu|coin|dog|cat)$', name) else 0
+    score += 2 if re.match(meme_patterns['symbol_format'], coin_data['Symbol']) else 0
+    score += 1.5 if any(kw in description for kw in meme_patterns['meme_references']) else 0
+    score += 1 if any(aw in description for aw in meme_patterns['animal_words']) else 0
+    score += 1 if any(si in description for si in meme_patterns['supply_indicators']) else 0
+    score += 1.5 if coin_data.get('SocialMentions', 0) > 1000 else 0
+    score += 1 if coin_data.get('RedditSubscribers', 0) > 5000 else 0
+
+    return score >= 3
+
+
+def legacy_rsi(prices, period=14):
+    """TradingBot.calculate_rsi before the NumPy indicators, over a list of Decimal prices"""
+    if len(prices) < period + 1:
+        return 0
+
+    deltas = [prices[i] - prices[i-1] for i in range(1, len(prices))]
+    gains = [d if d > 0 else 0 for d in deltas]
+    losses = [-d if d < 0 else 0 for d in deltas]
+
+    avg_gain = sum(gains[:period]) / period
+    avg_loss = sum(losses[:period]) / period
+
+    for i in range(period, len(gains)):
+        avg_gain = (avg_gain * (period-1) + gains[i]) / period
+        avg_loss = (avg_loss * (period-1) + losses[i]) / period
+
+    if avg_loss == 0:
+        return 100.0
+    rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
+
+
+def legacy_ma(prices, window):
+    """TradingBot.calculate_ma before the NumPy indicators, over a list of Decimal prices"""
+    historical = prices[-window:]
+    if len(historical) < window:
+        return 0.0
+    return sum(historical) / window
+
+
+def legacy_latest_market(coin_symbol):
+    """Market get_coin_insights picked with the per-symbol correlated subquery"""
+    latest_subquery = MarketData.objects.filter(
+        coin_id=coin_symbol,
+        market=OuterRef('market')
+    ).order_by('-last_updated').values('last_updated')[:1]
+    latest_data = MarketData.objects.filter(coin_id=coin_symbol, last_updated=Subquery(latest_subquery))
+    return latest_data.order_by('-volume_24h_base').first()
@@ -0,0 +1,92 @@
+import time
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from trading_bot.backtest import Backtest
+from trading_bot.filtering_handler import FilteringAlgorithm
+from trading_bot.history_store import HistoryStore
+
+
+def _moment(value):
+    moment = parse_datetime(value) or parse_datetime(f"{value}T00:00:00")
+    if moment is None:
+        raise CommandError(f"Invalid date {value!r}, expected YYYY-MM-DD or an ISO datetime")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return moment
+
+
+def add_backtest_arguments(parser):
+    """Options shared by the commands that replay the history"""
+    parser.add_argument("--start", help="First cycle traded, YYYY-MM-DD or ISO datetime (default: first tick)")
+    parser.add_argument("--end", help="Last tick replayed (default: last tick)")
+    parser.add_argument("--strategy", help="Strategy YAML file (default: STRATEGY_CONFIG or the built-in default)")
+    parser.add_argument("--cycle-minutes", type=int, default=15, help="Minutes between trading cycles")
+    parser.add_argument("--fee-bps", type=float, default=10, help="Fee per fill, in basis points")
+    parser.add_argument("--slippage-bps", type=float, default=50, help="Slippage per fill, in basis points")
+    parser.add_argument("--usd-per-trade", type=float, default=100, help="USD spent on each buy")
+    parser.add_argument("--max-buys", type=int, default=3, help="Buys per cycle at most")
+    parser.add_argument("--newest", type=int, help="Only buy the N most recently created coins, like the live cycle")
+    parser.add_argument("--dir", help="HistoryStore directory (default: HISTORY_STORE_DIR or .cache/history)")
+    parser.add_argument("--database", action="store_true", help="Read every tick from MarketData, not the HistoryStore")
+
+
+def backtest_options(options):
+    """Backtest arguments of the shared options, besides the algorithm and history store"""
+    return {
+        "fee_bps": options["fee_bps"],
+        "slippage_bps": options["slippage_bps"],
+        "usd_per_trade": options["usd_per_trade"],
+        "cycle_minutes": options["cycle_minutes"],
+        "max_buys": options["max_buys"],
+        "newest": options["newest"],
+    }
+
+
+class Command(BaseCommand):
+    help = "Replay the stored market data through the trading strategy and report PnL"
+
+    def add_arguments(self, parser):
+        parser.add_argument("coins", nargs="*", help="Coin ids to replay (default: all)")
+        add_backtest_arguments(parser)
+        parser.add_argument("--trades", type=int, default=20, help="Trades to list, best and worst (0 for none)")
+
+    def handle(self, *args, **options):
+        backtest = Backtest(
+            algorithm=FilteringAlgorithm(options["strategy"]),
+            history_store=None if options["database"] else HistoryStore(options["dir"]),
+            **backtest_options(options),
+        )
+        start = _moment(options["start"]) if options["start"] else None
+        end = _moment(options["end"]) if options["end"] else None
+
+        started = time.perf_counter()
+        result = backtest.run(options["coins"] or None, start, end)
+        elapsed = time.perf_counter() - started
+
+        summary = result["summary"]
+        if not summary["cycles"]:
+            raise CommandError("No market data to replay")
+        self.stdout.write(
+            f"Replayed {summary['ticks']} ticks of {summary['coins']} coins over {summary['cycles']} cycles "
+            f"({summary['start']:%Y-%m-%d %H:%M} to {summary['end']:%Y-%m-%d %H:%M}) in {elapsed:.1f}s"
+        )
+        win_rate = "-" if summary["win_rate"] is None else f"{summary['win_rate']:.1%}"
+        self.stdout.write(f"Trades        {summary['closed_trades']} closed, {summary['open_trades']} open, win rate {win_rate}")
+        self.stdout.write(f"Invested      {summary['invested']:.2f} USD, fees {summary['fees']:.2f} USD")
+        self.stdout.write(f"Realized PnL  {summary['realized_pnl']:+.2f} USD")
+        self.stdout.write(f"Open PnL      {summary['unrealized_pnl']:+.2f} USD (marked at the last price)")
+        self.stdout.write(f"Total PnL     {summary['total_pnl']:+.2f} USD")
+        self.stdout.write(f"Max drawdown  {summary['max_drawdown']:.2f} USD")
+
+        trades = sorted(result["trades"], key=lambda trade: trade["pnl"], reverse=True)
+        if options["trades"] and trades:
+            shown = trades if len(trades) <= 2 * options["trades"] else trades[:options["trades"]] + trades[-options["trades"]:]
+            self.stdout.write("")
+            for trade in shown:
+                sold_at = f"{trade['sold_at']:%Y-%m-%d %H:%M}" if trade["sold_at"] else "open"
+                self.stdout.write(
+                    f"{trade['coin_id']:<12} {trade['market']:<10} {trade['bought_at']:%Y-%m-%d %H:%M} -> {sold_at:<16} "
+                    f"{trade['buying_price']:.8g} -> {trade['selling_price']:.8g}  "
+                    f"{trade['pnl']:+9.2f} USD ({trade['return']:+.2%})"
+                )
@@ -0,0 +1,255 @@
+import json
+import time
+import random
+import datetime
+from decimal import Decimal
+from django.utils import timezone
+import numpy as np
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.management.base import BaseCommand, CommandError
+from trading_bot.ingest_handler import IngestAPIHandler
+from trading_bot.meme_classifier import MemeCoinClassifier
+from trading_bot import indicators
+from trading_bot.filtering_handler import FilteringAlgorithm
+from trading_bot.scoring import ColumnarScorer
+from trading_bot.models import MarketData, MemeCoins, Trades
+from trading_bot.insight_cache import InsightCache
+from trading_bot.legacy import legacy_is_meme_coin, legacy_latest_market, legacy_ma, legacy_rsi
+
+
+def _insights_bot():
+    """TradingBot computing every insight, without the insight cache"""
+    # Imported here so the other benchmarks do not need the Solana dependencies
+    from trading_bot.trading_bot import TradingBot
+
+    bot = TradingBot()
+    bot.insight_cache = InsightCache(max_entries=0)
+    return bot
+
+
+class Command(BaseCommand):
+    help = "Benchmark the trading bot hot paths"
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+        ingest = subparsers.add_parser("ingest", help="Per-coin vs batched market data fetching")
+        ingest.add_argument("--coins", type=int, default=200, help="Number of meme coins to fetch")
+
+        classifier = subparsers.add_parser("classifier", help="Legacy is_meme_coin vs the compiled classifier")
+        classifier.add_argument("--coin-list", help="Recorded coinlist JSON file (defaults to the cached coin list)")
+        classifier.add_argument("--repeat", type=int, default=3, help="Passes over the coin list per timing")
+
+        indicator = subparsers.add_parser("indicators", help="Legacy RSI/MA loops vs the NumPy indicators")
+        indicator.add_argument("--rows", type=int, default=100000, help="Length of the synthetic price history")
+
+        scoring = subparsers.add_parser("scoring", help="Per-dict vs columnar buy/sell scoring")
+        scoring.add_argument("--coins", type=int, default=10000, help="Number of synthetic candidates")
+        scoring.add_argument("--trades", type=int, default=1000, help="Number of synthetic open trades")
+        scoring.add_argument("--stored", action="store_true", help="Score the insights of every stored meme coin instead")
+
+        queries = subparsers.add_parser("queries", help="Per-symbol vs batched coin insights query counts")
+        queries.add_argument("--coins", type=int, default=100, help="Largest number of symbols to request")
+
+    def handle(self, *args, **options):
+        getattr(self, f"benchmark_{options['benchmark']}")(options)
+
+    def _count_calls(self, obj, method_name):
+        """Wrap a bound method on obj and return a dict counting its calls"""
+        counter = {"calls": 0}
+        method = getattr(obj, method_name)
+
+        def wrapper(*args, **kwargs):
+            counter["calls"] += 1
+            return method(*args, **kwargs)
+
+        setattr(obj, method_name, wrapper)
+        return counter
+
+    def _report(self, name, requests, seconds, coins):
+        self.stdout.write(f"{name:<10} requests={requests:<6} wall={seconds:8.2f}s coins_with_data={coins}")
+
+    def benchmark_ingest(self, options):
+        api = IngestAPIHandler()
+        meme_coins = [
+            coin for _, coin in api.iter_all_coins()
+            if coin.get("IsTrading", False) and api.is_meme_coin(coin)
+        ][:options["coins"]]
+        if not meme_coins:
+            raise CommandError("Failed to fetch the coin list")
+        symbols = [coin.get("Symbol") for coin in meme_coins]
+        self.stdout.write(f"Benchmarking {len(symbols)} meme coins")
+
+        # Per-coin path: one request per symbol
+        counter = self._count_calls(api, "fetch_coin_data")
+        start = time.perf_counter()
+        found = 0
+        for symbol in symbols:
+            coin_data = api.fetch_coin_data(symbol)
+            if coin_data and symbol in coin_data.get("RAW", {}):
+                found += 1
+        self._report("per-coin", counter["calls"], time.perf_counter() - start, found)
+
+        # Batched path: many symbols per request
+        api = IngestAPIHandler()
+        counter = self._count_calls(api, "fetch_coin_data")
+        start = time.perf_counter()
+        coins_data = api.fetch_coins_data(symbols)
+        found = sum(1 for symbol in symbols if symbol in coins_data["RAW"])
+        self._report("batched", counter["calls"], time.perf_counter() - start, found)
+
+    def _load_coin_list(self, path):
+        if path:
+            with open(path) as f:
+                payload = json.load(f)
+            return list(payload.get("Data", payload).values())
+        return [coin for _, coin in IngestAPIHandler().iter_all_coins()]
+
+    def _time(self, function, coins, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for coin in coins:
+                function(coin)
+        return (time.perf_counter() - start) / repeat
+
+    def benchmark_classifier(self, options):
+        coins = self._load_coin_list(options["coin_list"])
+        if not coins:
+            raise CommandError("No coin list available")
+
+        # The legacy function crashes on missing or null fields
+        coins = [coin for coin in coins if coin.get("Description") is not None]
+        legacy = self._time(legacy_is_meme_coin, coins, options["repeat"])
+        classifier = MemeCoinClassifier()
+        compiled = self._time(classifier.score_breakdown, coins, options["repeat"])
+        cold = self._time(classifier.is_meme_coin, coins, 1)
+        warm = self._time(classifier.is_meme_coin, coins, options["repeat"])
+        start = time.perf_counter()
+        for _ in range(options["repeat"]):
+            classifier.classify_batch(coins)
+        batch = (time.perf_counter() - start) / options["repeat"]
+
+        self.stdout.write(f"legacy      {legacy * 1000:9.1f}ms per pass over {len(coins)} coins")
+        self.stdout.write(f"compiled    {compiled * 1000:9.1f}ms ({legacy / compiled:.1f}x)")
+        self.stdout.write(f"cold cache  {cold * 1000:9.1f}ms")
+        self.stdout.write(f"warm cache  {warm * 1000:9.1f}ms ({legacy / warm:.1f}x), hits={classifier.hits} misses={classifier.misses}")
+        self.stdout.write(f"batch       {batch * 1000:9.1f}ms ({legacy / batch:.1f}x)")
+
+    def benchmark_indicators(self, options):
+        random.seed(0)
+        price = 1.0
+        decimal_prices = []
+        for _ in range(options["rows"]):
+            price *= 1 + random.gauss(0, 0.01)
+            decimal_prices.append(Decimal(str(round(price, 15))))
+
+        start = time.perf_counter()
+        expected = (legacy_rsi(decimal_prices), legacy_ma(decimal_prices, 50), legacy_ma(decimal_prices, 200))
+        legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        prices = np.fromiter(decimal_prices, dtype=np.float64)
+        convert = time.perf_counter() - start
+        start = time.perf_counter()
+        result = (
+            indicators.last(indicators.rsi(prices)),
+            indicators.last(indicators.sma(prices, 50)),
+            indicators.last(indicators.sma(prices, 200)),
+        )
+        vectorised = time.perf_counter() - start
+        start = time.perf_counter()
+        indicators.compute_indicators(prices, prices * 1.01, prices * 0.99)
+        everything = time.perf_counter() - start
+
+        for name, want, got in zip(("rsi_14", "ma_50", "ma_200"), expected, result):
+            self.stdout.write(f"{name:<7} legacy={float(want):.12f} numpy={got:.12f}")
+
+        self.stdout.write(f"legacy RSI + 2 MA       {legacy * 1000:9.1f}ms over {len(prices)} rows")
+        self.stdout.write(f"numpy RSI + 2 MA        {vectorised * 1000:9.1f}ms ({legacy / vectorised:.0f}x), "
+                          f"+{convert * 1000:.1f}ms Decimal conversion")
+        self.stdout.write(f"numpy all indicators    {everything * 1000:9.1f}ms")
+
+    def benchmark_queries(self, options):
+        symbols = list(
+            MarketData.objects.order_by('coin_id').values_list('coin_id', flat=True).distinct()[:options["coins"]]
+        )
+        if not symbols:
+            raise CommandError("No market data to benchmark against")
+
+        bot = _insights_bot()
+        for size in sorted({1, max(1, len(symbols) // 2), len(symbols)}):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                bot.get_insights_batch(symbols[:size])
+                seconds = time.perf_counter() - start
+            self.stdout.write(f"batch     symbols={size:<6} queries={len(queries):<4} wall={seconds * 1000:8.1f}ms")
+
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for symbol in symbols:
+                legacy_latest_market(symbol)
+            seconds = time.perf_counter() - start
+        self.stdout.write(f"legacy    symbols={len(symbols):<6} queries={len(queries):<4} wall={seconds * 1000:8.1f}ms "
+                          f"(latest market only)")
+
+    def _synthetic_insights(self, count):
+        insights = {}
+        for index in range(count):
+            price = random.lognormvariate(0, 1)
+            insights[f"COIN{index}"] = {
+                'symbol': f"COIN{index}",
+                'price': price,
+                'ma_50': price * random.uniform(0.8, 1.2),
+                'ma_200': price * random.uniform(0.8, 1.2),
+                'rsi_14': random.choice([0, random.uniform(0, 100)]),
+                'volume_24h': random.lognormvariate(13, 2),
+                'price_change_1h': random.gauss(0, 2),
+                'price_change_24h': random.gauss(0, 5),
+            }
+        return insights
+
+    def _synthetic_trades(self, symbols, count, now):
+        trades = []
+        for index in range(count):
+            trade = Trades(
+                trade_id=index + 1,
+                coin_id=random.choice(symbols),
+                buying_price=Decimal(str(random.lognormvariate(0, 1))),
+                quantity=1,
+                total_paid_amount=1,
+            )
+            trade.buy_date = now - datetime.timedelta(seconds=random.uniform(0, 14 * 24 * 60 * 60))
+            trades.append(trade)
+        return trades
+
+    def benchmark_scoring(self, options):
+        random.seed(0)
+        now = timezone.now()
+        if options["stored"]:
+            insights = _insights_bot().get_insights_batch(MemeCoins.objects.values_list("coin_id", flat=True))
+            if not insights:
+                raise CommandError("No stored meme coin has market data")
+        else:
+            insights = self._synthetic_insights(options["coins"])
+        trades = self._synthetic_trades(list(insights), options["trades"], now)
+
+        algorithm = FilteringAlgorithm()
+        start = time.perf_counter()
+        expected = algorithm.evaluate_many(insights, trades)
+        scalar = time.perf_counter() - start
+
+        scorer = ColumnarScorer(algorithm)
+        start = time.perf_counter()
+        result = scorer.evaluate_many(insights, trades)
+        columnar = time.perf_counter() - start
+        # Ranking the universe, without building the per-coin result dicts
+        start = time.perf_counter()
+        ranking = scorer.rank_buys(insights)
+        ranked = time.perf_counter() - start
+
+        self.stdout.write(f"{len(insights)} coins and {len(trades)} open trades")
+        self.stdout.write(f"per-dict evaluate_many    {scalar * 1000:9.1f}ms")
+        self.stdout.write(f"columnar evaluate_many    {columnar * 1000:9.1f}ms ({scalar / columnar:.1f}x)")
+        self.stdout.write(f"columnar rank_buys        {ranked * 1000:9.1f}ms ({scalar / ranked:.1f}x), "
+                          f"{len(ranking)} ready to buy")
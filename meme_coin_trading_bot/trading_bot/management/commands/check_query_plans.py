@@ -0,0 +1,113 @@
+import json
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.core.management.base import BaseCommand, CommandError
+from trading_bot.models import MarketData, LatestQuote, IndicatorState, Candle
+from trading_bot.latest_quotes import LatestQuoteStore
+from trading_bot.insight_cache import InsightCache
+
+# Tables that grow with history and must only be read through indexes
+WATCHED_TABLES = {model._meta.db_table for model in (MarketData, LatestQuote, IndicatorState, Candle)}
+
+
+def is_watched(relation):
+    # Partitions of MarketData are named <table>_pYYYYMM and <table>_default
+    return relation in WATCHED_TABLES or relation.startswith(f"{MarketData._meta.db_table}_")
+
+
+def capture_hot_path(coin_symbols):
+    """Run the read paths of the trading cycle and return the SELECTs they issued"""
+    # Imported here so the command loads without the Solana dependencies
+    from trading_bot.trading_bot import TradingBot
+
+    bot = TradingBot()
+    bot.insight_cache = InsightCache(max_entries=0)  # Every call computes
+    latest = MarketData.objects.filter(coin_id=coin_symbols[0]).order_by('-last_updated').first()
+    with CaptureQueriesContext(connection) as queries:
+        bot.indicator_timeframe = None
+        bot.get_insights_batch(coin_symbols)
+        bot.indicator_timeframe = "1h"
+        bot.get_insights_batch(coin_symbols)
+        bot.calculate_rsi(latest.coin_id, latest.market)
+        bot.calculate_ma(latest.coin_id, latest.market, 50)
+        LatestQuoteStore().latest("SOL")  # ExecutionHandler's SOL price lookup
+        with transaction.atomic():
+            # Exercise the update paths, rolled back so the check never writes
+            bot.indicator_store.update([latest])
+            bot.latest_quotes.update([latest])
+            bot.candle_store.update([latest])
+            transaction.set_rollback(True)
+    return [query["sql"] for query in queries if query["sql"].lstrip().upper().startswith("SELECT")]
+
+
+def _sequential_scans_postgresql(sql):
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Small test tables would otherwise be scanned because it is cheaper
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    scans, nodes = [], [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if node["Node Type"] == "Seq Scan" and is_watched(node.get("Relation Name", "")):
+            scans.append(node["Relation Name"])
+        nodes.extend(node.get("Plans", []))
+    return scans, json.dumps(plan, indent=2)
+
+
+def _sequential_scans_sqlite(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        details = [row[-1] for row in cursor.fetchall()]
+
+    # SEARCH is an index lookup; SCAN reads the whole table, or the whole index with USING INDEX
+    scans = []
+    for detail in details:
+        words = detail.split()
+        if words[0] == "SCAN" and is_watched(words[1]):
+            scans.append(words[1])
+    return scans, "\n".join(details)
+
+
+# Backends whose query plans can be checked
+PLAN_CHECKS = {"postgresql": _sequential_scans_postgresql, "sqlite": _sequential_scans_sqlite}
+
+
+def sequential_scans(sql):
+    """Watched tables the plan of a query scans sequentially, and the plan as text"""
+    return PLAN_CHECKS[connection.vendor](sql)
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the hot-path queries and fail when one scans a history table sequentially"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--coins", type=int, default=20, help="Number of coins to run the queries for")
+        parser.add_argument("--verbose-plans", action="store_true", help="Print every query plan")
+
+    def handle(self, *args, **options):
+        if connection.vendor not in PLAN_CHECKS:
+            raise CommandError(f"Query plans are not checked on {connection.vendor}")
+
+        coin_symbols = list(
+            MarketData.objects.order_by('coin_id').values_list('coin_id', flat=True).distinct()[:options["coins"]]
+        )
+        if not coin_symbols:
+            raise CommandError("No market data to run the queries against")
+
+        failures = 0
+        queries = capture_hot_path(coin_symbols)
+        for sql in queries:
+            scans, plan = sequential_scans(sql)
+            if options["verbose_plans"] or scans:
+                self.stdout.write(f"{sql}\n{plan}\n")
+            if scans:
+                failures += 1
+                self.stderr.write(f"Sequential scan on {', '.join(sorted(set(scans)))}")
+
+        if failures:
+            raise CommandError(f"{failures} of {len(queries)} queries scan a history table")
+        self.stdout.write(self.style.SUCCESS(f"All {len(queries)} queries use indexes"))
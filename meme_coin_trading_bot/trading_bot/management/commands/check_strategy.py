@@ -0,0 +1,20 @@
+import yaml
+from django.core.management.base import BaseCommand, CommandError
+from trading_bot.strategy import StrategyConfig, load_strategy
+
+
+class Command(BaseCommand):
+    help = "Compile a strategy config and print its evaluation plan"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", help="Strategy YAML file (default: STRATEGY_CONFIG or the built-in default)")
+
+    def handle(self, *args, **options):
+        path = options["path"] or StrategyConfig().path
+        try:
+            strategy = load_strategy(path)
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            raise CommandError(f"{path}: {e}")
+        for line in strategy.describe():
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(f"{path} is valid"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from trading_bot.history_store import HistoryStore
+
+
+class Command(BaseCommand):
+    help = "Export the MarketData history to memory-mappable column files, appending new ticks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("coins", nargs="*", help="Coin ids to export (default: all)")
+        parser.add_argument("--dir", help="Output directory (default: HISTORY_STORE_DIR or .cache/history)")
+        parser.add_argument("--full", action="store_true", help="Rewrite the files instead of appending")
+
+    def handle(self, *args, **options):
+        store = HistoryStore(options["dir"])
+        count = store.export(options["coins"] or None, full=options["full"])
+        self.stdout.write(self.style.SUCCESS(f"Exported {count} rows to {store.root}"))
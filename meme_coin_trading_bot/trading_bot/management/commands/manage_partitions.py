@@ -0,0 +1,51 @@
+import os
+from django.utils import timezone
+from django.core.management.base import BaseCommand, CommandError
+from trading_bot.partitions import MarketDataPartitions, month_start, add_months
+
+
+class Command(BaseCommand):
+    help = "Create upcoming MarketData partitions and apply the raw tick retention policy"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ahead", type=int, default=3, help="Months of partitions to keep created ahead")
+        parser.add_argument(
+            "--retention-months", type=int, default=os.getenv("MARKET_DATA_RETENTION_MONTHS"),
+            help="Months of raw ticks to keep (default: MARKET_DATA_RETENTION_MONTHS, unset keeps everything)",
+        )
+        parser.add_argument("--drop", action="store_true", help="Drop expired partitions instead of detaching them")
+        parser.add_argument("--dry-run", action="store_true", help="Only print what would be done")
+
+    def handle(self, *args, **options):
+        partitions = MarketDataPartitions()
+        if not partitions.is_partitioned():
+            raise CommandError("MarketData is not partitioned (PostgreSQL with migration 0015 is required)")
+
+        existing = set(partitions.partitions())
+        this_month = month_start(timezone.now())
+        for months in range(options["ahead"] + 1):
+            month = add_months(this_month, months)
+            if month in existing:
+                continue
+            self.stdout.write(f"Creating {partitions.partition_name(month)}")
+            if not options["dry_run"]:
+                partitions.create(month)
+
+        if options["retention_months"] is None:
+            return
+        cutoff = add_months(this_month, -int(options["retention_months"]))
+        action = "Dropping" if options["drop"] else "Detaching"
+        for month in sorted(existing):
+            if add_months(month, 1) > cutoff:
+                break
+            name = partitions.partition_name(month)
+            if not partitions.rolled_up(month):
+                self.stderr.write(f"Keeping {name}: not fully rolled up into 1d candles, run rebuild_candles first")
+                continue
+            self.stdout.write(f"{action} {name}")
+            if options["dry_run"]:
+                continue
+            if options["drop"]:
+                partitions.drop(month)
+            else:
+                partitions.detach(month)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from trading_bot.candles import CandleStore, TIMEFRAMES
+
+
+class Command(BaseCommand):
+    help = "Rebuild the OHLCV candles from the stored MarketData history"
+
+    def add_arguments(self, parser):
+        parser.add_argument("coins", nargs="*", help="Coin ids to rebuild (default: all)")
+        parser.add_argument("--timeframe", action="append", choices=list(TIMEFRAMES), help="Timeframe to rebuild (default: all)")
+
+    def handle(self, *args, **options):
+        count = CandleStore(options["timeframe"]).rebuild(options["coins"] or None)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} candles"))
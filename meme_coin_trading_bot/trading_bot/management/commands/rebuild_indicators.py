@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from trading_bot.indicator_store import IndicatorStore
+
+
+class Command(BaseCommand):
+    help = "Rebuild the incremental indicator state from the stored MarketData history"
+
+    def add_arguments(self, parser):
+        parser.add_argument("coins", nargs="*", help="Coin ids to rebuild (default: all)")
+
+    def handle(self, *args, **options):
+        count = IndicatorStore().rebuild(options["coins"] or None)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} indicator states"))
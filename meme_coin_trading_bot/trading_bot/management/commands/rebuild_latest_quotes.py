@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from trading_bot.latest_quotes import LatestQuoteStore
+
+
+class Command(BaseCommand):
+    help = "Backfill the latest quote of every coin and market from the stored MarketData history"
+
+    def add_arguments(self, parser):
+        parser.add_argument("coins", nargs="*", help="Coin ids to rebuild (default: all)")
+
+    def handle(self, *args, **options):
+        count = LatestQuoteStore().rebuild(options["coins"] or None)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} latest quotes"))
@@ -0,0 +1,80 @@
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from trading_bot.history_store import HistoryStore
+from trading_bot.sweep import OBJECTIVES, Sweep, grid, parse_space, sample
+from .backtest import _moment, add_backtest_arguments, backtest_options
+
+
+class Command(BaseCommand):
+    help = "Backtest a grid or random sample of strategy parameters in parallel and rank them"
+
+    def add_arguments(self, parser):
+        parser.add_argument("coins", nargs="*", help="Coin ids to replay (default: all)")
+        parser.add_argument(
+            "--param", action="append", required=True,
+            help="Parameter to vary, name=start:stop:step (inclusive) or name=a,b,c. "
+                 "Names are strategy params, buy_cutoff, sell_cutoff or usd_per_trade; repeat for more",
+        )
+        parser.add_argument("--random", type=int, help="Backtest N random parameter sets instead of the full grid")
+        parser.add_argument("--seed", type=int, help="Seed of --random")
+        parser.add_argument("--objective", choices=list(OBJECTIVES), default="total_pnl", help="Score the sets are ranked by")
+        parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (default: one per CPU)")
+        parser.add_argument("--name", help="Name the results are stored under (default: sweep-<timestamp>)")
+        parser.add_argument("--top", type=int, default=20, help="Ranked parameter sets to list")
+        parser.add_argument(
+            "--cache-dir", default=os.getenv("SWEEP_CACHE_DIR"),
+            help="Directory of the replayed cycle files, cycles x coins x 8 bytes per column "
+                 "(default: SWEEP_CACHE_DIR or the temp dir, often a RAM-backed tmpfs)",
+        )
+        add_backtest_arguments(parser)
+
+    def handle(self, *args, **options):
+        try:
+            space = parse_space(options["param"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        parameter_sets = sample(space, options["random"], options["seed"]) if options["random"] else grid(space)
+        if not parameter_sets:
+            raise CommandError("The parameter space is empty")
+
+        name = options["name"] or f"sweep-{timezone.now():%Y%m%d-%H%M%S}"
+        sweep = Sweep(
+            backtest_options=backtest_options(options),
+            history_store=None if options["database"] else HistoryStore(options["dir"]),
+            strategy_path=options["strategy"],
+            objective=options["objective"],
+            workers=options["workers"],
+            cache_dir=options["cache_dir"],
+        )
+        start = _moment(options["start"]) if options["start"] else None
+        end = _moment(options["end"]) if options["end"] else None
+
+        started = time.perf_counter()
+        try:
+            results = sweep.run(name, parameter_sets, options["coins"] or None, start, end)
+        except ValueError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        if results[0].start is None:
+            raise CommandError("No market data to replay")
+        self.stdout.write(
+            f"Sweep {name}: {len(results)} parameter sets over {results[0].start:%Y-%m-%d %H:%M} to "
+            f"{results[0].end:%Y-%m-%d %H:%M} with {min(sweep.workers, len(results))} workers in {elapsed:.1f}s "
+            f"({len(results) / elapsed:.2f} sets/s)"
+        )
+        self.stdout.write("")
+        self.stdout.write(
+            f"{'rank':>4} {options['objective']:>16} {'total pnl':>10} {'realized':>10} {'drawdown':>9} "
+            f"{'trades':>7} {'win rate':>8}  params"
+        )
+        for result in results[:options["top"]]:
+            score = "-" if result.score is None else f"{result.score:.4g}"
+            win_rate = "-" if result.win_rate is None else f"{result.win_rate:.1%}"
+            params = " ".join(f"{key}={value:g}" for key, value in result.params.items())
+            self.stdout.write(
+                f"{result.rank:>4} {score:>16} {result.total_pnl:>+10.2f} {result.realized_pnl:>+10.2f} "
+                f"{result.max_drawdown:>9.2f} {result.closed_trades:>7} {win_rate:>8}  {params}"
+            )
@@ -0,0 +1,137 @@
+import re
+import hashlib
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+
+# Keyword families (expandable lists)
+NAME_KEYWORDS = ['meme', 'doge', 'shib', 'floki', 'pepe', 'elon', 'sats', 'bonk']
+ANIMAL_WORDS = ['inu', 'kitty', 'woof', 'meow', 'hamster']
+MEME_REFERENCES = ['wojak', 'diamond hands', 'to the moon', 'ngmi']
+SUPPLY_INDICATORS = ['quadrillion', 'trillion', 'billion supply']
+
+# Score added by every description keyword family
+DESCRIPTION_SCORES = {
+    'meme_references': 1.5,
+    'animal_words': 1,
+    'supply_indicators': 1,
+}
+
+
+def _alternation(keywords):
+    return "|".join(re.escape(keyword) for keyword in keywords)
+
+
+class MemeCoinClassifier:
+    def __init__(self, threshold=3, cache_size=100000):
+        """
+            Meme coin detection with every pattern compiled once. Each
+            keyword family is a single precompiled alternation, and scores
+            are memoised by a digest of the fields they depend on so
+            unchanged coins are not rescored.
+        """
+        self.threshold = threshold
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        self.name_keywords = re.compile(_alternation(NAME_KEYWORDS))
+        self.name_suffix = re.compile(r'.+(?:inu|coin|dog|cat)$')
+        self.symbol_format = re.compile(r'\$?[A-Z]{3,5}\d*$')  # Matches formats like DOGE, PEPE2, $SHIB
+        # One alternation per family: cheaper than a combined pattern with
+        # named groups, which must then visit every match to tell families apart
+        self.description_keywords = {
+            'meme_references': re.compile(_alternation(MEME_REFERENCES)),
+            'animal_words': re.compile(_alternation(ANIMAL_WORDS)),
+            'supply_indicators': re.compile(_alternation(SUPPLY_INDICATORS)),
+        }
+
+    def _cache_key(self, coin_data):
+        fields = (
+            coin_data.get('Name'),
+            coin_data.get('Symbol'),
+            coin_data.get('Description'),
+            coin_data.get('SocialMentions'),
+            coin_data.get('RedditSubscribers'),
+        )
+        return hashlib.blake2b(repr(fields).encode(), digest_size=16).digest()
+
+    def score_breakdown(self, coin_data):
+        """Score of every classification factor for one coin"""
+        name = (coin_data.get('Name') or '').lower()
+        symbol = coin_data.get('Symbol') or ''
+        description = (coin_data.get('Description') or '').lower()
+
+        breakdown = {
+            # Name analysis
+            'name_keywords': 2 if self.name_keywords.search(name) else 0,
+            'name_suffix': 1 if self.name_suffix.search(name) else 0,
+            # Symbol analysis
+            'symbol_format': 2 if self.symbol_format.match(symbol) else 0,
+        }
+        # Description analysis
+        for family, pattern in self.description_keywords.items():
+            breakdown[family] = DESCRIPTION_SCORES[family] if pattern.search(description) else 0
+        # Social proof indicators
+        breakdown['social_mentions'] = 1.5 if (coin_data.get('SocialMentions') or 0) > 1000 else 0
+        breakdown['reddit_subscribers'] = 1 if (coin_data.get('RedditSubscribers') or 0) > 5000 else 0
+        return breakdown
+
+    def score(self, coin_data):
+        key = self._cache_key(coin_data)
+        score = self.cache.get(key)
+        if score is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return score
+
+        self.misses += 1
+        score = sum(self.score_breakdown(coin_data).values())
+        self.cache[key] = score
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return score
+
+    def is_meme_coin(self, coin_data):
+        return self.score(coin_data) >= self.threshold  # Threshold for meme classification
+
+    def classify_batch(self, coins):
+        """
+            Score many coins at once using columnar string operations and
+            numeric masks. Returns (mask, scores, breakdown): a boolean array
+            of meme coins, their scores and a DataFrame with the score of
+            every factor, indexed by coin Name.
+        """
+        coins = list(coins)
+        names = pd.Series([coin.get('Name') or '' for coin in coins], dtype=object)
+        symbols = pd.Series([coin.get('Symbol') or '' for coin in coins], dtype=object)
+        descriptions = pd.Series([coin.get('Description') or '' for coin in coins], dtype=object).str.lower()
+        social_mentions = np.array([coin.get('SocialMentions') or 0 for coin in coins], dtype=float)
+        reddit_subscribers = np.array([coin.get('RedditSubscribers') or 0 for coin in coins], dtype=float)
+        lower_names = names.str.lower()
+
+        factors = {
+            # Name analysis
+            'name_keywords': lower_names.str.contains(self.name_keywords).to_numpy(bool) * 2,
+            'name_suffix': lower_names.str.contains(self.name_suffix).to_numpy(bool) * 1,
+            # Symbol analysis
+            'symbol_format': symbols.str.match(self.symbol_format).to_numpy(bool) * 2,
+            # Description analysis
+            **{
+                family: descriptions.str.contains(pattern).to_numpy(bool) * DESCRIPTION_SCORES[family]
+                for family, pattern in self.description_keywords.items()
+            },
+            # Social proof indicators
+            'social_mentions': (social_mentions > 1000) * 1.5,
+            'reddit_subscribers': (reddit_subscribers > 5000) * 1,
+        }
+
+        matrix = np.column_stack(list(factors.values())).astype(float)
+        scores = matrix.sum(axis=1)
+        breakdown = pd.DataFrame(matrix, index=names.to_numpy(), columns=list(factors))
+        return scores >= self.threshold, scores, breakdown
+
+
+# Shared so the memo cache survives across handler instances
+meme_classifier = MemeCoinClassifier()
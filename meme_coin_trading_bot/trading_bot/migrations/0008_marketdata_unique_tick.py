@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-18 10:26
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_ticks(apps, schema_editor):
+    """Keep the first copy of every (coin_id, market, last_updated) tick"""
+    MarketData = apps.get_model('trading_bot', 'MarketData')
+    duplicates = (
+        MarketData.objects.order_by()
+        .values('coin_id', 'market', 'last_updated')
+        .annotate(first_id=Min('id'), copies=Count('id'))
+        .filter(copies__gt=1)
+    )
+    for duplicate in duplicates.iterator():
+        MarketData.objects.filter(
+            coin_id=duplicate['coin_id'],
+            market=duplicate['market'],
+            last_updated=duplicate['last_updated'],
+        ).exclude(id=duplicate['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading_bot', '0007_trades'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_ticks, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='marketdata',
+            constraint=models.UniqueConstraint(fields=('coin_id', 'market', 'last_updated'), name='unique_market_data_tick'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2 on 2026-10-18 10:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading_bot', '0008_marketdata_unique_tick'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('coin_list_version', models.CharField(max_length=64, null=True)),
+                ('digests', models.JSONField(default=dict)),
+                ('meme_coins', models.JSONField(default=dict)),
+                ('last_coin_creation_date', models.DateTimeField(null=True)),
+                ('coins_ingested', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
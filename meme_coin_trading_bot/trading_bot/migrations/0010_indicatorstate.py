@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-18 10:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading_bot', '0009_ingeststate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndicatorState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('coin_id', models.CharField(max_length=100)),
+                ('market', models.CharField(max_length=100, null=True)),
+                ('last_updated', models.DateTimeField(null=True)),
+                ('last_price', models.FloatField(null=True)),
+                ('sample_count', models.PositiveIntegerField(default=0)),
+                ('avg_gain', models.FloatField(default=0)),
+                ('avg_loss', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='indicatorstate',
+            constraint=models.UniqueConstraint(fields=('coin_id', 'market'), name='unique_indicator_state'),
+        ),
+    ]
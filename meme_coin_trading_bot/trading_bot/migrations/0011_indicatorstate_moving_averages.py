@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-18 10:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading_bot', '0010_indicatorstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='indicatorstate',
+            name='price_window',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='indicatorstate',
+            name='window_sums',
+            field=models.JSONField(default=dict),
+        ),
+    ]
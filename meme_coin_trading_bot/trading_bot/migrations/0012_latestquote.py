@@ -0,0 +1,43 @@
+# Generated by Django 4.2 on 2026-10-18 10:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading_bot', '0011_indicatorstate_moving_averages'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatestQuote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('coin_id', models.CharField(max_length=100)),
+                ('market', models.CharField(max_length=100)),
+                ('last_updated', models.DateTimeField()),
+                ('is_best', models.BooleanField(default=False)),
+                ('price', models.DecimalField(decimal_places=15, max_digits=30)),
+                ('currency', models.CharField(default='USD', max_length=5)),
+                ('high_24h', models.DecimalField(decimal_places=15, default=0, max_digits=30, null=True)),
+                ('low_24h', models.DecimalField(decimal_places=15, default=0, max_digits=30, null=True)),
+                ('volume_24h_base', models.DecimalField(decimal_places=15, default=0, max_digits=30, null=True)),
+                ('price_change_percentage_1h', models.DecimalField(decimal_places=5, default=0, max_digits=10, null=True)),
+                ('price_change_percentage_24h', models.DecimalField(decimal_places=5, default=0, max_digits=10, null=True)),
+                ('circulating_supply', models.BigIntegerField()),
+                ('total_supply', models.BigIntegerField(blank=True, null=True)),
+                ('market_cap', models.DecimalField(decimal_places=15, default=0, max_digits=30, null=True)),
+                ('market_cap_rank', models.PositiveIntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='latestquote',
+            constraint=models.UniqueConstraint(fields=('coin_id', 'market'), name='unique_latest_quote'),
+        ),
+        migrations.AddConstraint(
+            model_name='latestquote',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_best', True)), fields=('coin_id',), name='unique_best_quote'),
+        ),
+    ]
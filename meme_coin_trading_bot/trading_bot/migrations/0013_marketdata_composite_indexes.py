@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-18 10:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading_bot', '0012_latestquote'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='marketdata',
+            index=models.Index(fields=['coin_id', 'market', '-last_updated'], include=('price', 'high_24h', 'low_24h', 'volume_24h_base'), name='marketdata_coin_market_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='marketdata',
+            index=models.Index(fields=['coin_id', '-last_updated'], name='marketdata_coin_recent'),
+        ),
+    ]
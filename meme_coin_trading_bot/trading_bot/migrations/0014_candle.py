@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-18 10:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading_bot', '0013_marketdata_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Candle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('coin_id', models.CharField(max_length=100)),
+                ('market', models.CharField(max_length=100)),
+                ('timeframe', models.CharField(choices=[('1m', '1 minute'), ('15m', '15 minutes'), ('1h', '1 hour'), ('1d', '1 day')], max_length=3)),
+                ('bucket_start', models.DateTimeField()),
+                ('open', models.DecimalField(decimal_places=15, max_digits=30)),
+                ('high', models.DecimalField(decimal_places=15, max_digits=30)),
+                ('low', models.DecimalField(decimal_places=15, max_digits=30)),
+                ('close', models.DecimalField(decimal_places=15, max_digits=30)),
+                ('volume', models.DecimalField(decimal_places=15, default=0, max_digits=30, null=True)),
+                ('tick_count', models.PositiveIntegerField(default=0)),
+                ('open_at', models.DateTimeField()),
+                ('close_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='candle',
+            constraint=models.UniqueConstraint(fields=('coin_id', 'market', 'timeframe', 'bucket_start'), name='unique_candle'),
+        ),
+    ]
@@ -0,0 +1,92 @@
+import datetime
+
+from django.db import migrations
+
+TABLE = 'trading_bot_marketdata'
+MONTHS_AHEAD = 3
+
+
+def _add_months(month, months):
+    month_index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=month_index // 12, month=month_index % 12 + 1)
+
+
+def partition_marketdata(apps, schema_editor):
+    """
+    Rebuild MarketData as a table partitioned by month on last_updated.
+    The primary key becomes UNIQUE (id, last_updated) because PostgreSQL
+    requires the partition key in every unique constraint; rows without
+    last_updated go to the default partition. Other databases are left as is.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", [TABLE])
+        if cursor.fetchone():
+            return
+
+        # Definitions to replay on the partitioned table (CHECK constraints are copied by LIKE)
+        cursor.execute(
+            "SELECT pg_get_indexdef(indexrelid) FROM pg_index WHERE indrelid = %s::regclass "
+            "AND indexrelid NOT IN (SELECT conindid FROM pg_constraint WHERE conrelid = %s::regclass)",
+            [TABLE, TABLE],
+        )
+        index_definitions = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype IN ('p', 'u')",
+            [TABLE],
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(
+            f"SELECT date_trunc('month', min(last_updated) AT TIME ZONE 'UTC'), max(id) FROM {TABLE}"
+        )
+        first_month, max_id = cursor.fetchone()
+
+        cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {TABLE}_unpartitioned")
+        cursor.execute(
+            f"CREATE TABLE {TABLE} (LIKE {TABLE}_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE (last_updated)"
+        )
+        cursor.execute(f"CREATE SEQUENCE {TABLE}_id_seq_partitioned OWNED BY {TABLE}.id")
+        cursor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{TABLE}_id_seq_partitioned')")
+
+        # Monthly partitions from the oldest tick to a few months ahead, plus a default partition
+        cursor.execute(f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT")
+        this_month = datetime.datetime.now(datetime.timezone.utc).replace(
+            day=1, hour=0, minute=0, second=0, microsecond=0
+        )
+        month = first_month.replace(tzinfo=datetime.timezone.utc) if first_month else this_month
+        while month <= _add_months(this_month, MONTHS_AHEAD):
+            end = _add_months(month, 1)
+            cursor.execute(
+                f"CREATE TABLE {TABLE}_p{month:%Y%m} PARTITION OF {TABLE} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{end.isoformat()}')"
+            )
+            month = end
+
+        cursor.execute(f"INSERT INTO {TABLE} SELECT * FROM {TABLE}_unpartitioned")
+        cursor.execute(f"SELECT setval('{TABLE}_id_seq_partitioned', %s, false)", [(max_id or 0) + 1])
+        cursor.execute(f"DROP TABLE {TABLE}_unpartitioned")
+        cursor.execute(f"ALTER SEQUENCE {TABLE}_id_seq_partitioned RENAME TO {TABLE}_id_seq")
+
+        # Indexes are built after the copy, once per partition
+        for name, constraint_type, definition in constraints:
+            if constraint_type == 'p':
+                definition = 'UNIQUE (id, last_updated)'
+            cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT "{name}" {definition}')
+        for definition in index_definitions:
+            cursor.execute(definition)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading_bot', '0014_candle'),
+    ]
+
+    operations = [
+        # Not reversed: the partitioned table keeps the same columns and indexes
+        migrations.RunPython(partition_marketdata, migrations.RunPython.noop),
+    ]
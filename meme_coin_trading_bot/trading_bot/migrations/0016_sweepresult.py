@@ -0,0 +1,39 @@
+# Generated by Django 4.2 on 2026-10-18 11:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading_bot', '0015_marketdata_partitioning'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SweepResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sweep', models.CharField(max_length=100)),
+                ('rank', models.PositiveIntegerField()),
+                ('objective', models.CharField(max_length=30)),
+                ('score', models.FloatField(null=True)),
+                ('params', models.JSONField(default=dict)),
+                ('total_pnl', models.FloatField()),
+                ('realized_pnl', models.FloatField()),
+                ('unrealized_pnl', models.FloatField()),
+                ('max_drawdown', models.FloatField()),
+                ('fees', models.FloatField()),
+                ('closed_trades', models.PositiveIntegerField()),
+                ('open_trades', models.PositiveIntegerField()),
+                ('win_rate', models.FloatField(null=True)),
+                ('start', models.DateTimeField(null=True)),
+                ('end', models.DateTimeField(null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='sweepresult',
+            constraint=models.UniqueConstraint(fields=('sweep', 'rank'), name='unique_sweep_rank'),
+        ),
+    ]
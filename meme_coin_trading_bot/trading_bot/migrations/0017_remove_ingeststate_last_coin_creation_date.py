@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 11:21
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading_bot', '0016_sweepresult'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='ingeststate',
+            name='last_coin_creation_date',
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+TABLE = 'trading_bot_marketdata'
+
+
+def restore_check_constraints(apps, schema_editor):
+    """
+    Add back the column CHECK constraints (e.g. market_cap_rank >= 0) that
+    0015 dropped when it rebuilt MarketData as a partitioned table. Adding
+    them to the parent table adds them to every partition.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    MarketData = apps.get_model('trading_bot', 'MarketData')
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", [TABLE])
+        if not cursor.fetchone():
+            return
+        cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'c'", [TABLE])
+        existing = {row[0] for row in cursor.fetchall()}
+
+        for field in MarketData._meta.concrete_fields:
+            check = field.db_parameters(connection)['check']
+            # PostgreSQL names inline column checks <table>_<column>_check
+            name = f'{TABLE}_{field.column}_check'
+            if check and name not in existing:
+                cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT "{name}" CHECK ({check})')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading_bot', '0017_remove_ingeststate_last_coin_creation_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(restore_check_constraints, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2 on 2026-10-18 11:36
+
+from django.db import migrations
+
+TABLE = 'trading_bot_marketdata'
+CONSTRAINT = 'unique_market_data_tick'
+KEY = 'coin_id, market, last_updated'
+COVERED = 'price, high_24h, low_24h, volume_24h_base'
+
+
+def _replace_unique_tick(schema_editor, definition):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {TABLE} DROP CONSTRAINT "{CONSTRAINT}"')
+        cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT "{CONSTRAINT}" {definition}')
+
+
+def cover_unique_tick(apps, schema_editor):
+    """
+    Rebuild unique_market_data_tick with the indicator inputs as non-key
+    columns (PostgreSQL only), so it replaces marketdata_coin_market_recent
+    which had the same key.
+    """
+    _replace_unique_tick(schema_editor, f'UNIQUE ({KEY}) INCLUDE ({COVERED})')
+
+
+def uncover_unique_tick(apps, schema_editor):
+    _replace_unique_tick(schema_editor, f'UNIQUE ({KEY})')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading_bot', '0018_marketdata_partition_checks'),
+    ]
+
+    operations = [
+        # Same key as unique_market_data_tick, maintained twice on every insert
+        migrations.RemoveIndex(
+            model_name='marketdata',
+            name='marketdata_coin_market_recent',
+        ),
+        # Latest tick of a coin across markets, read from LatestQuote now
+        migrations.RemoveIndex(
+            model_name='marketdata',
+            name='marketdata_coin_recent',
+        ),
+        migrations.RunPython(cover_unique_tick, uncover_unique_tick),
+    ]
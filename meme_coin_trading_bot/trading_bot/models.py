@@ -41,6 +41,119 @@ class MemeCoinCategories(models.Model):
         return f"{self.coin_id} - {self.category_id}"
     
 
+class IngestState(models.Model):
+    """
+    IngestState model to store the watermark of incremental ingest jobs
+    """
+    name = models.CharField(max_length=100, unique=True)
+    coin_list_version = models.CharField(max_length=64, null=True)  # Content hash of the last processed coin list
+    digests = models.JSONField(default=dict)  # Coin Name -> digest of its coin list entry
+    meme_coins = models.JSONField(default=dict)  # Coin Name -> Symbol of every known meme coin
+    coins_ingested = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.updated_at}"
+
+
+class IndicatorState(models.Model):
+    """
+    IndicatorState model to store incrementally maintained technical indicators per coin and market
+    """
+    coin_id = models.CharField(max_length=100)
+    market = models.CharField(max_length=100, null=True)
+    last_updated = models.DateTimeField(null=True)  # Last tick applied to the state
+    last_price = models.FloatField(null=True)
+
+    # Wilder RSI
+    sample_count = models.PositiveIntegerField(default=0)  # Number of prices applied
+    avg_gain = models.FloatField(default=0)
+    avg_loss = models.FloatField(default=0)
+
+    # Rolling moving averages
+    price_window = models.JSONField(default=list)  # Last max(window) prices, oldest first
+    window_sums = models.JSONField(default=dict)  # Window size -> running sum of its prices
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['coin_id', 'market'], name='unique_indicator_state'),
+        ]
+
+    def __str__(self):
+        return f"{self.coin_id} - {self.market}"
+
+
+class Candle(models.Model):
+    """
+    Candle model to store OHLCV rollups of MarketData ticks per coin, market and timeframe
+    """
+    TIMEFRAMES = (
+        ("1m", "1 minute"),
+        ("15m", "15 minutes"),
+        ("1h", "1 hour"),
+        ("1d", "1 day"),
+    )
+
+    coin_id = models.CharField(max_length=100)
+    market = models.CharField(max_length=100)
+    timeframe = models.CharField(max_length=3, choices=TIMEFRAMES)
+    bucket_start = models.DateTimeField()
+
+    open = models.DecimalField(max_digits=30, decimal_places=15)
+    high = models.DecimalField(max_digits=30, decimal_places=15)
+    low = models.DecimalField(max_digits=30, decimal_places=15)
+    close = models.DecimalField(max_digits=30, decimal_places=15)
+    volume = models.DecimalField(max_digits=30, decimal_places=15, null=True, default=0)  # Rolling 24h volume at close
+    tick_count = models.PositiveIntegerField(default=0)
+
+    open_at = models.DateTimeField()  # Tick that set the open
+    close_at = models.DateTimeField()  # Tick that set the close
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['coin_id', 'market', 'timeframe', 'bucket_start'], name='unique_candle'),
+        ]
+
+    def __str__(self):
+        return f"{self.coin_id} - {self.market} {self.timeframe} @ {self.bucket_start}"
+
+
+class LatestQuote(models.Model):
+    """
+    LatestQuote model to store the newest MarketData tick per coin and market, upserted on ingest
+    """
+    coin_id = models.CharField(max_length=100)
+    market = models.CharField(max_length=100)
+    last_updated = models.DateTimeField()
+    is_best = models.BooleanField(default=False)  # Highest 24h volume market of the coin
+
+    # Copy of the MarketData tick
+    price = models.DecimalField(max_digits=30, decimal_places=15)
+    currency = models.CharField(max_length=5, default="USD")
+    high_24h = models.DecimalField(max_digits=30, decimal_places=15, null=True, default=0)
+    low_24h = models.DecimalField(max_digits=30, decimal_places=15, null=True, default=0)
+    volume_24h_base = models.DecimalField(max_digits=30, decimal_places=15, null=True, default=0)
+    price_change_percentage_1h = models.DecimalField(max_digits=10, decimal_places=5, null=True, default=0)
+    price_change_percentage_24h = models.DecimalField(max_digits=10, decimal_places=5, null=True, default=0)
+    circulating_supply = models.BigIntegerField()
+    total_supply = models.BigIntegerField(null=True, blank=True)
+    market_cap = models.DecimalField(max_digits=30, decimal_places=15, null=True, default=0)
+    market_cap_rank = models.PositiveIntegerField(null=True, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['coin_id', 'market'], name='unique_latest_quote'),
+            models.UniqueConstraint(fields=['coin_id'], condition=models.Q(is_best=True), name='unique_best_quote'),
+        ]
+
+    def __str__(self):
+        return f"{self.coin_id} - {self.market} @ {self.last_updated}"
+
+
 class MarketData(models.Model):
     coin_id = models.CharField(max_length=100, unique=False)
     market = models.CharField(max_length=100, null=True)  # RAW.MARKET
@@ -89,6 +202,13 @@ class MarketData(models.Model):
             models.Index(fields=['market_cap']),
             models.Index(fields=['price_change_percentage_24h']),
         ]
+        constraints = [
+            # Also the index of the latest ticks and recent history of one market. On
+            # PostgreSQL migration 0019 adds INCLUDE (price, high_24h, low_24h,
+            # volume_24h_base) to cover the indicator inputs; it is not declared here
+            # because Django skips unique constraints with INCLUDE on other backends
+            models.UniqueConstraint(fields=['coin_id', 'market', 'last_updated'], name='unique_market_data_tick'),
+        ]
         ordering = ['-last_updated']
 
 
@@ -97,6 +217,7 @@ class MarketData(models.Model):
 
 class Trades(models.Model):
     TRADE_TYPES = ("BUY", "SELL", "HOLD")
+    BUY, SELL, HOLD = TRADE_TYPES  # Also the actions FilteringAlgorithm decides for an open trade
     STATUS_TYPES = ("OPEN", "CLOSED")
 
 
@@ -126,3 +247,35 @@ class Trades(models.Model):
 
     def __str__(self):
         return f"{self.coin_id} | {self.trade_type} | {self.status} | {self.buy_date}"
+
+
+class SweepResult(models.Model):
+    """
+    SweepResult model to store the backtest summary of one parameter set of a strategy sweep, ranked by its objective
+    """
+    sweep = models.CharField(max_length=100)  # Name of the sweep run
+    rank = models.PositiveIntegerField()  # 1 is the best score of the sweep
+    objective = models.CharField(max_length=30)
+    score = models.FloatField(null=True)  # Objective value, null when undefined (e.g. no closed trade)
+    params = models.JSONField(default=dict)  # Parameter name -> value tried
+
+    total_pnl = models.FloatField()
+    realized_pnl = models.FloatField()
+    unrealized_pnl = models.FloatField()
+    max_drawdown = models.FloatField()
+    fees = models.FloatField()
+    closed_trades = models.PositiveIntegerField()
+    open_trades = models.PositiveIntegerField()
+    win_rate = models.FloatField(null=True)
+
+    start = models.DateTimeField(null=True)  # First cycle traded
+    end = models.DateTimeField(null=True)  # Last cycle traded
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['sweep', 'rank'], name='unique_sweep_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.sweep} #{self.rank} {self.objective}={self.score}"
@@ -0,0 +1,102 @@
+import re
+import datetime
+from django.db import connection, transaction
+from django.db.models import Sum
+from .models import MarketData, Candle
+
+
+def month_start(value):
+    return value.astimezone(datetime.timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month, months):
+    month_index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=month_index // 12, month=month_index % 12 + 1)
+
+
+class MarketDataPartitions:
+    def __init__(self):
+        """
+            Monthly range partitions of MarketData on last_updated (PostgreSQL,
+            set up by migration 0015). Partitions are named <table>_pYYYYMM;
+            ticks outside every partition land in <table>_default.
+        """
+        self.table = MarketData._meta.db_table
+        self.default_partition = f"{self.table}_default"
+        self.name_pattern = re.compile(rf"^{self.table}_p(\d{{4}})(\d{{2}})$")
+
+    def partition_name(self, month):
+        return f"{self.table}_p{month:%Y%m}"
+
+    def is_partitioned(self):
+        if connection.vendor != "postgresql":
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", [self.table])
+            return cursor.fetchone() is not None
+
+    def partitions(self):
+        """Month start of every attached monthly partition, oldest first"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = %s::regclass",
+                [self.table],
+            )
+            names = [row[0] for row in cursor.fetchall()]
+
+        months = []
+        for name in names:
+            match = self.name_pattern.match(name)
+            if match:
+                months.append(datetime.datetime(int(match[1]), int(match[2]), 1, tzinfo=datetime.timezone.utc))
+        return sorted(months)
+
+    def create(self, month):
+        """
+            Create and attach the partition of a month. Ticks of that month
+            already sitting in the default partition are moved into it first,
+            otherwise the attach would be rejected.
+        """
+        name = self.partition_name(month)
+        start, end = month.isoformat(), add_months(month, 1).isoformat()
+        with transaction.atomic(), connection.cursor() as cursor:
+            # ATTACH requires the CHECK constraints of the parent table
+            cursor.execute(f'CREATE TABLE "{name}" (LIKE "{self.table}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM "{self.default_partition}" '
+                f'WHERE last_updated >= %s AND last_updated < %s RETURNING *) '
+                f'INSERT INTO "{name}" SELECT * FROM moved',
+                [start, end],
+            )
+            cursor.execute(
+                f'ALTER TABLE "{self.table}" ATTACH PARTITION "{name}" FOR VALUES FROM (\'{start}\') TO (\'{end}\')'
+            )
+
+    def rolled_up(self, month):
+        """
+            Whether every tick with a market in a partition is counted in the
+            1d candles of its coin and market, so the raw rows can go.
+        """
+        end = add_months(month, 1)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT coin_id, market, count(*) FROM "{self.partition_name(month)}" '
+                f'WHERE market IS NOT NULL GROUP BY coin_id, market'
+            )
+            ticks = {(coin_id, market): count for coin_id, market, count in cursor.fetchall()}
+        candle_ticks = {
+            (row["coin_id"], row["market"]): row["ticks"]
+            for row in Candle.objects.filter(
+                timeframe="1d", bucket_start__gte=month, bucket_start__lt=end
+            ).values("coin_id", "market").annotate(ticks=Sum("tick_count"))
+        }
+        return all(candle_ticks.get(key, 0) >= count for key, count in ticks.items())
+
+    def detach(self, month):
+        with connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE "{self.table}" DETACH PARTITION "{self.partition_name(month)}"')
+
+    def drop(self, month):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE "{self.partition_name(month)}"')
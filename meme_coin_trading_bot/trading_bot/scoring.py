@@ -0,0 +1,137 @@
+import datetime
+import numpy as np
+from django.utils import timezone
+from .models import Trades
+
+# Insight columns the rules read, with the default of a missing key
+INSIGHT_COLUMNS = {
+    'price': np.nan,
+    'ma_50': np.nan,
+    'ma_200': np.nan,
+    'rsi_14': 0,
+    'volume_24h': 0,
+    'price_change_1h': np.nan,
+    'price_change_24h': np.nan,
+}
+
+MICROSECONDS_PER_DAY = 24 * 60 * 60 * 10 ** 6
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def insight_columns(insights_list):
+    """Stack insight dicts into one float64 array per column"""
+    return {
+        name: np.array([insights.get(name, default) for insights in insights_list], dtype=np.float64)
+        for name, default in INSIGHT_COLUMNS.items()
+    }
+
+
+class ColumnarScorer:
+    def __init__(self, algorithm):
+        """
+            Buy and sell scoring of FilteringAlgorithm over arrays: the rules
+            of its compiled strategy are evaluated as boolean masks over all
+            candidates (or open trades) and scores are their weighted sum.
+            Reproduces the per-dict scores and buy reasons exactly.
+        """
+        self.algorithm = algorithm
+
+    def score_buys(self, columns, strategy):
+        rows = len(columns['price'])
+        rules, scores = strategy.masks(strategy.buy_rules, columns, rows)
+        return scores >= strategy.buy_cutoff, scores, rules
+
+    def score_sells(self, columns, buying_price, bought_at, now, strategy):
+        """
+            Sell scores of positions. `columns` holds the insights of each
+            position's coin; bought_at and now are in microseconds since the
+            epoch. Also returns the price change of each position.
+        """
+        price_change = (columns['price'] - buying_price) / buying_price
+        held_days = (now - bought_at) // MICROSECONDS_PER_DAY  # timedelta.days
+        positions = dict(columns, price_change=price_change, held_days=held_days)
+        rules, scores = strategy.masks(strategy.sell_rules, positions, len(price_change))
+        return scores >= strategy.sell_cutoff, scores, rules, price_change
+
+    def _reason_codes(self, rules, rows):
+        """
+            One code per row for its combination of rule hits, with the
+            indexes of the rules hit by every distinct combination, so reasons
+            are built once per combination rather than once per row.
+        """
+        hits = np.column_stack([mask for _, mask in rules]) if rules else np.zeros((rows, 0), dtype=bool)
+        combinations, codes = np.unique(hits, axis=0, return_inverse=True)
+        reasons = {
+            code: [index for index, hit in enumerate(combination) if hit]
+            for code, combination in enumerate(combinations.tolist())
+        }
+        return codes.reshape(-1).tolist(), reasons
+
+    def rank_buys(self, insights_by_symbol, limit=None):
+        """
+            (symbol, buy score) of the coins ready to buy, best first with
+            ties in input order, as the trading cycle sorts its candidates.
+            Only arrays are built, so the whole universe is scored cheaply.
+        """
+        symbols = list(insights_by_symbol)
+        if not symbols:
+            return []
+        strategy = self.algorithm.strategy
+        ready, scores, _ = self.score_buys(insight_columns(list(insights_by_symbol.values())), strategy)
+        candidates = np.flatnonzero(ready)
+        order = candidates[np.argsort(-scores[candidates], kind='stable')][:limit]
+        return [(symbols[index], scores[index].item()) for index in order.tolist()]
+
+    def evaluate_many(self, insights_by_symbol, open_trades, now=None):
+        """Same result as FilteringAlgorithm.evaluate_coin for every symbol, scored column-wise"""
+        symbols = list(insights_by_symbol)
+        if not symbols:
+            return {}
+        strategy = self.algorithm.strategy
+        insights_list = [insights_by_symbol[symbol] for symbol in symbols]
+        candidates = insight_columns(insights_list)
+        ready, scores, rules = self.score_buys(candidates, strategy)
+
+        codes, hits = self._reason_codes(rules, len(symbols))
+        buy_rules = strategy.buy_rules
+        # Reasons formatted with a coin's values are built per coin, the others per combination
+        reasons = {code: [buy_rules[index].reason for index in indexes] for code, indexes in hits.items()}
+        formatted = {code for code, indexes in hits.items() if any(buy_rules[index].fields for index in indexes)}
+        results = {}
+        for symbol, insights, code, is_ready, score in zip(symbols, insights_list, codes, ready.tolist(), scores.tolist()):
+            results[symbol] = {
+                "ready_to_buy": is_ready,
+                "buy_reasons": (
+                    [strategy.reason(buy_rules[index], insights) for index in hits[code]]
+                    if code in formatted else list(reasons[code])
+                ),
+                "buy_score": score,
+                "trades": [],
+            }
+
+        # One row per open trade of an evaluated coin, joined to its coin's insights
+        trades = [trade for trade in open_trades if trade.coin_id in results]
+        if trades:
+            row = {symbol: index for index, symbol in enumerate(symbols)}
+            positions = np.array([row[trade.coin_id] for trade in trades])
+            columns = {name: values[positions] for name, values in candidates.items()}
+            buying_price = np.array([float(trade.buying_price) for trade in trades])
+            bought_at = np.array([_microseconds(trade.buy_date) for trade in trades], dtype=np.int64)
+            sell, _, _, _ = self.score_sells(
+                columns, buying_price, bought_at, _microseconds(now or timezone.now()), strategy
+            )
+            profit = columns['price'] * strategy.profit_target
+
+            for trade, is_sell, trade_profit in zip(trades, sell.tolist(), profit.tolist()):
+                results[trade.coin_id]["trades"].append({
+                    "id": trade.pk,
+                    "action": Trades.SELL if is_sell else Trades.HOLD,
+                    "profit": trade_profit,
+                })
+        return results
+
+
+def _microseconds(value):
+    # Exact integer arithmetic so day counts match timedelta.days
+    delta = value - EPOCH
+    return (delta.days * 24 * 60 * 60 + delta.seconds) * 10 ** 6 + delta.microseconds
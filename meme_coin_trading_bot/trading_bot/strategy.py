@@ -0,0 +1,236 @@
+import os
+import re
+import string
+import operator
+import math
+import functools
+import numpy as np
+import yaml
+from pathlib import Path
+from collections import namedtuple
+from .scoring import INSIGHT_COLUMNS
+
+DEFAULT_STRATEGY = Path(__file__).resolve().parent / "strategies" / "default.yaml"
+
+# Columns a rule can compare; sell rules also see the position of the trade
+BUY_COLUMNS = dict(INSIGHT_COLUMNS)
+SELL_COLUMNS = {**INSIGHT_COLUMNS, 'price_change': np.nan, 'held_days': 0}
+
+OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+CONDITION = re.compile(r'^\s*(.+?)\s*(<=|>=|==|!=|<|>)\s*(.+?)\s*$')
+
+# predicate(values) -> bool, or a boolean mask when values holds arrays; fields
+# are the columns the reason is formatted with, e.g. "Hit stop loss ({price_change:.2%})"
+Rule = namedtuple('Rule', ['reason', 'weight', 'predicate', 'conditions', 'fields'])
+
+
+def _number(value, what):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{what} must be a number, got {value!r}")
+    return value
+
+
+class Strategy:
+    def __init__(self, config, name=None):
+        """
+            Buy and sell rules compiled from a config dict (see
+            strategies/default.yaml). Params are folded into constants at
+            compile time, so every rule becomes a flat predicate over insight
+            columns that works the same on one coin's insights and on the
+            column arrays of ColumnarScorer.
+        """
+        if not isinstance(config, dict):
+            raise ValueError("A strategy config must be a mapping")
+        self.name = config.get('name') or name or 'unnamed'
+        self.params = config.get('params') or {}
+        if not isinstance(self.params, dict):
+            raise ValueError("params must be a mapping")
+        for param, value in self.params.items():
+            _number(value, f"Param {param}")
+        _number(self.params.get('profit_target'), "Param profit_target")
+
+        self.buy_rules, self.buy_cutoff = self._compile_side(config, 'buy', BUY_COLUMNS)
+        self.sell_rules, self.sell_cutoff = self._compile_side(config, 'sell', SELL_COLUMNS)
+
+    @property
+    def profit_target(self):
+        return self.params['profit_target']
+
+    def _compile_side(self, config, side, columns):
+        section = config.get(side)
+        if not isinstance(section, dict) or not isinstance(section.get('rules'), list):
+            raise ValueError(f"{side} must be a mapping with a list of rules")
+        cutoff = _number(section.get('cutoff'), f"{side} cutoff")
+
+        rules = []
+        for rule in section['rules']:
+            if not isinstance(rule, dict) or 'reason' not in rule or 'when' not in rule:
+                raise ValueError(f"Every {side} rule needs a reason and a when, got {rule!r}")
+            conditions = rule['when'] if isinstance(rule['when'], list) else [rule['when']]
+            if not conditions:
+                raise ValueError(f"{side} rule {rule['reason']!r} has no conditions")
+            predicates = [self._compile_condition(condition, columns, rule['reason']) for condition in conditions]
+            if len(predicates) == 1:
+                predicate = predicates[0]
+            else:
+                predicate = functools.partial(_all, predicates)
+            weight = _number(rule.get('weight', 1), f"Weight of {rule['reason']!r}")
+            fields = self._reason_fields(str(rule['reason']), columns)
+            rules.append(Rule(str(rule['reason']), weight, predicate, [str(condition) for condition in conditions], fields))
+        return rules, cutoff
+
+    def _reason_fields(self, reason, columns):
+        """Columns a reason is formatted with, checked by formatting it once"""
+        try:
+            fields = tuple(dict.fromkeys(field for _, field, _, _ in string.Formatter().parse(reason) if field is not None))
+            unknown = [field for field in fields if field not in columns]
+            if unknown:
+                raise ValueError(f"unknown column {unknown[0]!r}")
+            reason.format_map({field: 0.0 for field in fields})
+        except (ValueError, IndexError) as e:
+            raise ValueError(f"Invalid reason {reason!r}: {e}") from None
+        return fields
+
+    def _compile_condition(self, condition, columns, reason):
+        match = CONDITION.match(str(condition))
+        if match is None:
+            raise ValueError(f"Cannot parse condition {condition!r} of {reason!r}")
+        left, op, right = match.groups()
+        compare = OPERATORS[op]
+        left_column, left_constant = self._parse_operand(left, columns, reason)
+        right_column, right_constant = self._parse_operand(right, columns, reason)
+
+        # Comparing a bare column with a constant is by far the common case
+        if left_column is not None and left_constant is None and right_column is None:
+            default = columns[left_column]
+            return lambda values: compare(values.get(left_column, default), right_constant)
+        left = self._operand(left_column, left_constant, columns)
+        right = self._operand(right_column, right_constant, columns)
+        return lambda values: compare(left(values), right(values))
+
+    def _parse_operand(self, text, columns, reason):
+        """
+            (column, constant) of an operand: a column, a number or a param,
+            optionally multiplied by more numbers or params
+        """
+        column, constant = None, None
+        for factor in (factor.strip() for factor in text.split('*')):
+            if factor in columns:
+                if column is not None:
+                    raise ValueError(f"Cannot multiply two columns in {text!r} of {reason!r}")
+                column = factor
+                continue
+            if factor in self.params:
+                value = self.params[factor]
+            else:
+                try:
+                    value = float(factor)
+                except ValueError:
+                    raise ValueError(f"Unknown name {factor!r} in {text!r} of {reason!r}") from None
+            constant = value if constant is None else constant * value
+        return column, constant
+
+    def _operand(self, column, constant, columns):
+        if column is None:
+            return lambda values: constant
+        default = columns[column]
+        if constant is None:
+            return lambda values: values.get(column, default)
+        return lambda values: values.get(column, default) * constant
+
+    def reason(self, rule, values):
+        """Reason of a rule for one row, formatted with the row's values when it has fields"""
+        if not rule.fields:
+            return rule.reason
+        return rule.reason.format_map({field: values.get(field, math.nan) for field in rule.fields})
+
+    def score(self, rules, values):
+        """(score, reasons) of one row, values being a dict of scalars"""
+        score, reasons = 0, []
+        for rule in rules:
+            if rule.predicate(values):
+                score += rule.weight
+                reasons.append(self.reason(rule, values))
+        return score, reasons
+
+    def masks(self, rules, columns, rows):
+        """(reason, mask) of every rule and the scores of `rows` rows of column arrays"""
+        masks = []
+        for rule in rules:
+            mask = np.asarray(rule.predicate(columns), dtype=bool)
+            masks.append((rule.reason, mask if mask.shape == (rows,) else np.broadcast_to(mask, (rows,))))
+        integral = all(isinstance(rule.weight, int) for rule in rules)
+        scores = np.zeros(rows, dtype=np.int64 if integral else np.float64)
+        for rule, (_, mask) in zip(rules, masks):
+            scores += rule.weight * mask
+        return masks, scores
+
+    def describe(self):
+        """Readable lines of the compiled plan"""
+        lines = [f"Strategy {self.name}"]
+        for side, rules, cutoff in (('buy', self.buy_rules, self.buy_cutoff), ('sell', self.sell_rules, self.sell_cutoff)):
+            lines.append(f"  {side} when score >= {cutoff}")
+            for rule in rules:
+                lines.append(f"    +{rule.weight} {rule.reason}: {' and '.join(rule.conditions)}")
+        return lines
+
+
+def _all(predicates, values):
+    # & rather than `and`, so masks combine element-wise
+    return functools.reduce(operator.and_, (predicate(values) for predicate in predicates))
+
+
+def read_config(path):
+    """Raw config dict of a strategy YAML file"""
+    with open(path) as f:
+        return yaml.safe_load(f)
+
+
+def load_strategy(path):
+    return Strategy(read_config(path), name=Path(path).stem)
+
+
+class StrategyConfig:
+    def __init__(self, path=None):
+        """
+            Strategy compiled from a YAML file (STRATEGY_CONFIG, or the
+            built-in default). current() compares the file's modification
+            time and recompiles it when it changed, so a strategy can be
+            swapped without a restart. A config that fails to load is reported
+            and the previous strategy keeps running.
+        """
+        self.path = Path(path or os.getenv("STRATEGY_CONFIG") or DEFAULT_STRATEGY)
+        self.strategy = None
+        self.mtime = None
+
+    def current(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            if self.strategy is None:
+                raise
+            print(f"Keeping strategy {self.strategy.name}: {e}")
+            return self.strategy
+        if mtime == self.mtime:
+            return self.strategy
+
+        try:
+            strategy = load_strategy(self.path)
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            if self.strategy is None:
+                raise
+            self.mtime = mtime  # Reported once, until the file changes again
+            print(f"Keeping strategy {self.strategy.name}: {self.path} failed to load: {e}")
+            return self.strategy
+
+        if self.strategy is not None:
+            print(f"Reloaded strategy {strategy.name} from {self.path}")
+        self.strategy, self.mtime = strategy, mtime
+        return strategy
@@ -0,0 +1,295 @@
+import os
+import copy
+import json
+import math
+import random
+import shutil
+import tempfile
+import itertools
+import django
+import numpy as np
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from django.db import connections, transaction
+from .backtest import Backtest
+from .filtering_handler import FilteringAlgorithm
+from .models import SweepResult
+from .strategy import Strategy, read_config
+
+# Parameters outside the strategy params that a sweep can vary
+CUTOFF_PARAMETERS = {"buy_cutoff": "buy", "sell_cutoff": "sell"}
+BACKTEST_PARAMETERS = ("usd_per_trade",)
+
+
+def _pnl_to_drawdown(summary):
+    if summary["max_drawdown"]:
+        return summary["total_pnl"] / summary["max_drawdown"]
+    # No drawdown: a gain is unbounded, a flat run scores 0
+    return math.copysign(math.inf, summary["total_pnl"]) if summary["total_pnl"] else 0.0
+
+
+# Objective name -> score of a backtest summary (higher is better, None ranks last)
+OBJECTIVES = {
+    "total_pnl": lambda summary: summary["total_pnl"],
+    "realized_pnl": lambda summary: summary["realized_pnl"],
+    "win_rate": lambda summary: summary["win_rate"],
+    "pnl_to_drawdown": _pnl_to_drawdown,
+    "return_on_invested": lambda summary: (
+        summary["total_pnl"] / summary["invested"] if summary["invested"] else None
+    ),
+}
+
+
+def parse_space(specs):
+    """
+        Parameter space from "name=start:stop:step" (inclusive range) or
+        "name=a,b,c" (choices) specs, as a dict of name -> (kind, values).
+        Values stay integers when every number of a spec is an integer.
+    """
+    space = {}
+    for spec in specs:
+        name, sep, values = spec.partition("=")
+        if not sep or not name.strip() or not values.strip():
+            raise ValueError(f"Invalid parameter {spec!r}, expected name=start:stop:step or name=a,b,c")
+        parts = values.split(":") if ":" in values else values.split(",")
+        try:
+            numbers = [int(part) if part.strip().lstrip("-").isdigit() else float(part) for part in parts]
+        except ValueError:
+            raise ValueError(f"Invalid number in {spec!r}") from None
+        if ":" in values:
+            if len(numbers) != 3 or numbers[2] <= 0 or numbers[1] < numbers[0]:
+                raise ValueError(f"Invalid range in {spec!r}, expected start:stop:step with start <= stop and step > 0")
+            space[name.strip()] = ("range", numbers)
+        else:
+            space[name.strip()] = ("choice", numbers)
+    return space
+
+
+def _range_values(start, stop, step):
+    if all(isinstance(number, int) for number in (start, stop, step)):
+        return list(range(start, stop + 1, step))
+    count = int(round((stop - start) / step)) + 1
+    return [round(start + index * step, 10) for index in range(count) if start + index * step <= stop + step * 1e-9]
+
+
+def grid(space):
+    """Every combination of the values of a parameter space"""
+    names = list(space)
+    values = [
+        _range_values(*numbers) if kind == "range" else numbers
+        for kind, numbers in (space[name] for name in names)
+    ]
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def sample(space, count, seed=None):
+    """
+        `count` random parameter sets: ranges are sampled uniformly between
+        start and stop (integers when the range is), choices picked evenly
+    """
+    rng = random.Random(seed)
+    parameter_sets = []
+    for _ in range(count):
+        parameters = {}
+        for name, (kind, numbers) in space.items():
+            if kind == "choice":
+                parameters[name] = rng.choice(numbers)
+            elif all(isinstance(number, int) for number in numbers):
+                parameters[name] = rng.randint(numbers[0], numbers[1])
+            else:
+                parameters[name] = rng.uniform(numbers[0], numbers[1])
+        parameter_sets.append(parameters)
+    return parameter_sets
+
+
+def strategy_config(config, parameters):
+    """Copy of a strategy config with the strategy params and cutoffs of `parameters` applied"""
+    config = copy.deepcopy(config)
+    for name, value in parameters.items():
+        if name in CUTOFF_PARAMETERS:
+            config[CUTOFF_PARAMETERS[name]]["cutoff"] = value
+        elif name not in BACKTEST_PARAMETERS:
+            config["params"][name] = value
+    return config
+
+
+class CycleCache:
+    def __init__(self, root):
+        """
+            Insight columns of every replayed cycle written once to raw
+            files: timestamps.bin plus one (cycles, coins) float64 file per
+            column. Sweep workers memory-map them read-only, so the market
+            history is shared through the page cache rather than pickled
+            or replayed per parameter set.
+        """
+        self.root = Path(root)
+
+    def write(self, cycles, coins):
+        """Write the (t, columns) of replay(). Returns the number of cycles"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        count, names, files = 0, None, {}
+        timestamps = open(self.root / "timestamps.bin", "wb")
+        try:
+            for t, columns in cycles:
+                if names is None:
+                    names = list(columns)
+                    files = {name: open(self.root / f"{name}.bin", "wb") for name in names}
+                timestamps.write(np.int64(t).tobytes())
+                for name in names:
+                    files[name].write(np.ascontiguousarray(columns[name], dtype=np.float64).tobytes())
+                count += 1
+        finally:
+            timestamps.close()
+            for f in files.values():
+                f.close()
+        with open(self.root / "meta.json", "w") as f:
+            json.dump({"cycles": count, "coins": coins, "columns": names or []}, f)
+        return count
+
+    def load(self):
+        """(timestamps, columns) memory maps of the cached cycles"""
+        with open(self.root / "meta.json") as f:
+            meta = json.load(f)
+        if meta["cycles"] == 0:
+            return np.empty(0, dtype=np.int64), {}
+        timestamps = np.memmap(self.root / "timestamps.bin", dtype=np.int64, mode="r", shape=(meta["cycles"],))
+        # Plain ndarray views of the maps, so arithmetic does not build memmap objects
+        columns = {
+            name: np.asarray(np.memmap(
+                self.root / f"{name}.bin", dtype=np.float64, mode="r", shape=(meta["cycles"], meta["coins"])
+            ))
+            for name in meta["columns"]
+        }
+        return timestamps, columns
+
+    def cycles(self):
+        """(t, columns) of every cached cycle, in the form trade() consumes"""
+        timestamps, columns = self.load()
+        for index, t in enumerate(timestamps.tolist()):
+            yield t, {name: values[index] for name, values in columns.items()}
+
+
+# State of a sweep worker process, set once by _init_worker
+_worker = {}
+
+
+def _init_worker(cache_root, pairs, creation_dates, strategy_path, config, backtest_options):
+    django.setup()  # No-op when forked from a configured process
+    _worker.update(
+        algorithm=FilteringAlgorithm(strategy_path),
+        cache=CycleCache(cache_root),
+        pairs=pairs,
+        creation_dates=creation_dates,
+        config=config,
+        backtest_options=backtest_options,
+    )
+
+
+def _run_parameters(parameters):
+    """Backtest summary of one parameter set over the cached cycles"""
+    options = dict(_worker["backtest_options"])
+    options.update({name: parameters[name] for name in BACKTEST_PARAMETERS if name in parameters})
+    backtest = Backtest(algorithm=_worker["algorithm"], **options)
+    strategy = Strategy(strategy_config(_worker["config"], parameters))
+    result = backtest.trade(_worker["pairs"], _worker["cache"].cycles(), strategy, _worker["creation_dates"])
+    return result["summary"]
+
+
+class Sweep:
+    def __init__(self, backtest_options=None, history_store=None, strategy_path=None, objective="total_pnl",
+                 workers=None, cache_dir=None):
+        """
+            Backtests of many parameter sets of a strategy, fanned out over a
+            process pool. The history is replayed once (indicators do not
+            depend on the parameters) into a CycleCache that every worker
+            maps read-only; tasks only carry their parameter set, so
+            throughput grows with the number of workers. `backtest_options`
+            are Backtest arguments shared by every run. The cache is written
+            under `cache_dir` (default: the temp dir).
+        """
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Unknown objective {objective!r}, expected one of {', '.join(OBJECTIVES)}")
+        self.backtest_options = dict(backtest_options or {})
+        algorithm = FilteringAlgorithm(strategy_path)
+        self.backtest = Backtest(algorithm=algorithm, history_store=history_store, **self.backtest_options)
+        self.strategy_path = str(algorithm.strategy_config.path)
+        self.config = read_config(self.strategy_path)
+        self.objective = objective
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_dir = cache_dir
+
+    def check(self, parameter_sets):
+        """Compile the strategy of every parameter set, raising ValueError on the first invalid one"""
+        known = set(self.config.get("params") or {}) | set(CUTOFF_PARAMETERS) | set(BACKTEST_PARAMETERS)
+        for parameters in parameter_sets:
+            unknown = set(parameters) - known
+            if unknown:
+                raise ValueError(f"Unknown parameters {', '.join(sorted(unknown))}, expected some of {', '.join(sorted(known))}")
+            Strategy(strategy_config(self.config, parameters))
+
+    def run(self, name, parameter_sets, coin_ids=None, start=None, end=None):
+        """
+            Backtest every parameter set and store the summaries as
+            SweepResult rows of sweep `name`, ranked by the objective.
+            Returns them best first.
+        """
+        parameter_sets = list(parameter_sets)
+        self.check(parameter_sets)
+        pairs = self.backtest.pairs(coin_ids)
+        creation_dates = self.backtest.creation_dates([coin_id for coin_id, _ in pairs]) if self.backtest.newest else None
+
+        cache_root = tempfile.mkdtemp(prefix="sweep-", dir=self.cache_dir)
+        try:
+            cache = CycleCache(cache_root)
+            cycles = cache.write(self.backtest.replay(pairs, start, end), len(pairs))
+            print(f"Replayed {self.backtest.ticks_replayed} ticks into {cycles} cycles of {len(pairs)} coins")
+
+            # Forked workers must not share the parent's database connections
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=min(self.workers, len(parameter_sets)) or 1,
+                initializer=_init_worker,
+                initargs=(cache_root, pairs, creation_dates, self.strategy_path, self.config, self.backtest_options),
+            ) as pool:
+                summaries = list(pool.map(_run_parameters, parameter_sets))
+        finally:
+            shutil.rmtree(cache_root, ignore_errors=True)
+
+        for summary in summaries:
+            summary["ticks"] = self.backtest.ticks_replayed
+
+        return self.save(name, parameter_sets, summaries)
+
+    def save(self, name, parameter_sets, summaries):
+        objective = OBJECTIVES[self.objective]
+        scored = [
+            (objective(summary), index)
+            for index, summary in enumerate(summaries)
+        ]
+        # Best score first, undefined scores last, ties in parameter set order
+        scored.sort(key=lambda item: (item[0] is None, -(item[0] or 0), item[1]))
+
+        results = []
+        for rank, (score, index) in enumerate(scored, start=1):
+            summary = summaries[index]
+            results.append(SweepResult(
+                sweep=name,
+                rank=rank,
+                objective=self.objective,
+                score=score,
+                params=parameter_sets[index],
+                total_pnl=summary["total_pnl"],
+                realized_pnl=summary["realized_pnl"],
+                unrealized_pnl=summary["unrealized_pnl"],
+                max_drawdown=summary["max_drawdown"],
+                fees=summary["fees"],
+                closed_trades=summary["closed_trades"],
+                open_trades=summary["open_trades"],
+                win_rate=summary["win_rate"],
+                start=summary["start"],
+                end=summary["end"],
+            ))
+        with transaction.atomic():
+            SweepResult.objects.filter(sweep=name).delete()
+            SweepResult.objects.bulk_create(results, batch_size=1000)
+        return results
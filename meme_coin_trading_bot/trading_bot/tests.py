@@ -1,3 +1,1247 @@
-from django.test import TestCase
+import io
+import os
+import json
+import time
+import shutil
+import hashlib
+import datetime
+import random
+import asyncio
+import tempfile
+from decimal import Decimal
+from unittest import mock
+import numpy as np
+import yaml
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from email.utils import format_datetime
+from .filtering_handler import FilteringAlgorithm
+from .http_client import retry_after_seconds
+from .async_ingest_handler import AsyncIngestAPIHandler, TokenBucket
+from .insight_cache import InsightCache
+from .latest_quotes import LatestQuoteStore
+from . import indicators
+from .management.commands.check_query_plans import PLAN_CHECKS, capture_hot_path, sequential_scans
+from .legacy import legacy_is_meme_coin, legacy_latest_market, legacy_ma, legacy_rsi
+from .meme_classifier import MemeCoinClassifier
+from .backtest import Backtest
+from .candles import CandleStore
+from .history_store import HistoryStore
+from .partitions import MarketDataPartitions
+from .coin_list_cache import CoinListCache
+from .indicator_store import IndicatorStore
+from .ingest_handler import IngestAPIHandler, IngestDBHandler
+from .scoring import ColumnarScorer
+from .strategy import StrategyConfig
+from .sweep import Sweep
+from .models import Candle, Categories, IndicatorState, LatestQuote, MarketData, MemeCoinCategories, MemeCoins, SweepResult, Trades
 
-# Create your tests here.
+START = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def make_bot():
+    from .trading_bot import TradingBot
+
+    bot = TradingBot()
+    bot.insight_cache = InsightCache(max_entries=0)  # Every call computes
+    return bot
+
+
+def make_tick(coin_id, market, minutes, price, volume=1000, **fields):
+    """Unsaved MarketData row `minutes` after START"""
+    return MarketData(
+        coin_id=coin_id,
+        market=market,
+        last_updated=START + datetime.timedelta(minutes=minutes),
+        price=Decimal(str(price)),
+        high_24h=Decimal(str(price)),
+        low_24h=Decimal(str(price)),
+        volume_24h_base=Decimal(str(volume)),
+        circulating_supply=1000,
+        **fields,
+    )
+
+
+def listed_coin(name, launched="2026-01-01"):
+    """Coin list entry of a trading meme coin"""
+    return {"Name": name, "Symbol": name, "CoinName": name, "FullName": name, "IsTrading": True,
+            "AssetLaunchDate": launched}
+
+
+def raw_quote(price, minutes, volume=1000, market="Binance"):
+    """pricemultifull RAW entry of one coin"""
+    return {"USD": {
+        "MARKET": market, "PRICE": price, "TOSYMBOL": "USD", "VOLUME24HOUR": volume, "CIRCULATINGSUPPLY": 1000,
+        "LASTUPDATE": int((START + datetime.timedelta(minutes=minutes)).timestamp()),
+    }}
+
+
+class CoinListTestCase(TestCase):
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        self.coin_list_cache = CoinListCache("coinlist", cache_dir=cache_dir, ttl=3600)
+        self.bot = make_bot()
+
+    def ingest(self, coins, quotes):
+        """Run ingest_all_data with `coins` as the cached coin list and `quotes` as the pricemultifull RAW entries"""
+        payload = json.dumps({"Data": {coin["Name"]: coin for coin in coins}}).encode()
+        self.coin_list_cache.payload_path.write_bytes(payload)
+        self.coin_list_cache._write_json(self.coin_list_cache.meta_path, {
+            "version": hashlib.sha256(payload).hexdigest(), "fetched_at": time.time(),
+        })
+        api = self.bot.ingest_api_handler
+        api.coin_list_cache = self.coin_list_cache
+        with mock.patch.object(api, "is_meme_coin", return_value=True), \
+                mock.patch.object(api, "fetch_coins_data", return_value={"RAW": quotes}):
+            return self.bot.ingest_all_data()
+
+
+def make_trade(coin_id, buying_price, tx_hash, **fields):
+    return Trades.objects.create(
+        coin_id=coin_id,
+        trade_type=Trades.BUY,
+        buying_price=Decimal(buying_price),
+        quantity=Decimal(1),
+        total_paid_amount=Decimal(buying_price),
+        tx_hash=tx_hash,
+        wallet_address="wallet",
+        **fields,
+    )
+
+
+def sell_insights(symbol):
+    # Overbought, below the 200 MA and on low volume: three default sell rules
+    return {
+        'symbol': symbol, 'price': 1.0, 'ma_50': 1.0, 'ma_200': 2.0, 'rsi_14': 80,
+        'volume_24h': 0, 'price_change_1h': 0, 'price_change_24h': 0,
+    }
+
+
+def hold_insights(symbol):
+    return {
+        'symbol': symbol, 'price': 1.0, 'ma_50': 1.0, 'ma_200': 0.5, 'rsi_14': 50,
+        'volume_24h': 10 ** 9, 'price_change_1h': 0, 'price_change_24h': 0,
+    }
+
+
+class TradeActionTests(TestCase):
+    def setUp(self):
+        self.sell = make_trade("AAA", "1.0", "tx-aaa")
+        self.hold = make_trade("BBB", "1.0", "tx-bbb")
+        self.insights = {"AAA": sell_insights("AAA"), "BBB": hold_insights("BBB")}
+
+    def test_evaluations_use_trade_actions(self):
+        trades = [self.sell, self.hold]
+        algorithm = FilteringAlgorithm()
+        for evaluations in (
+            algorithm.evaluate_many(self.insights, trades),
+            ColumnarScorer(algorithm).evaluate_many(self.insights, trades),
+        ):
+            self.assertEqual(evaluations["AAA"]["trades"][0]["action"], Trades.SELL)
+            self.assertEqual(evaluations["BBB"]["trades"][0]["action"], Trades.HOLD)
+
+    def test_cycle_closes_sells_and_keeps_holds_open(self):
+        bot = make_bot()
+        with mock.patch.object(bot, "ingest_all_data"), \
+                mock.patch.object(bot, "get_insights_batch", return_value=self.insights), \
+                mock.patch.object(bot, "close_trade", return_value=True) as close_trade, \
+                mock.patch.object(bot, "register_trade"), \
+                mock.patch("trading_bot.trading_bot.time.sleep"):
+            bot.execute_trading_cycle()
+
+        close_trade.assert_called_once_with(self.sell.pk)
+        self.hold.refresh_from_db()
+        self.assertEqual(self.hold.status, "OPEN")
+
+
+class BulkInsertTests(TestCase):
+    def test_failed_rows_are_not_returned(self):
+        rows = [
+            make_tick("AAA", "Binance", 0, 1),
+            make_tick("AAA", "Binance", 1, 1, volume=10 ** 16),  # Overflows volume_24h_base
+            make_tick("AAA", "Binance", 2, 1),
+        ]
+        saved = IngestDBHandler().save_market_data_bulk(rows)
+
+        self.assertEqual(saved, [rows[0], rows[2]])
+        self.assertEqual(MarketData.objects.count(), 2)
+
+    def test_categories_that_failed_to_insert_are_skipped(self):
+        handler = IngestDBHandler()
+        handler.save_meme_coins([listed_coin("AAA")])
+        bulk_create = handler._bulk_create
+
+        def fail_meme_category(model, rows, label):
+            # The "meme" category insert fails
+            if model is Categories:
+                rows = [row for row in rows if row.category_id != "meme"]
+            return bulk_create(model, rows, label)
+
+        with mock.patch.object(handler, "_bulk_create", side_effect=fail_meme_category):
+            handler.save_meme_coin_categories([{"id": "AAA", "categories": ["meme", "dog"]}])
+
+        self.assertEqual(
+            list(MemeCoinCategories.objects.values_list("coin_id__coin_id", "category_id__category_id")),
+            [("AAA", "dog")],
+        )
+
+    def test_only_new_ticks_are_returned(self):
+        IngestDBHandler().save_market_data_bulk([make_tick("AAA", "Binance", 0, 1)])
+        rows = [
+            make_tick("AAA", "Binance", 0, 1),  # Already stored
+            make_tick("AAA", "Binance", 1, 1),
+            make_tick("AAA", "Kraken", 0, 1),
+            make_tick("AAA", "Binance", 1, 1),  # Repeated in the cycle
+        ]
+
+        self.assertEqual(IngestDBHandler().save_market_data_bulk(rows), [rows[1], rows[2]])
+        self.assertEqual(MarketData.objects.count(), 3)
+
+
+class IngestTests(CoinListTestCase):
+    def test_failed_ticks_are_not_passed_to_the_stores(self):
+        self.ingest([listed_coin("AAA"), listed_coin("BBB"), listed_coin("CCC")], {
+            "AAA": raw_quote(1, 0),
+            "BBB": raw_quote(2, 0),
+            "CCC": raw_quote(3, 0, volume=1e16),  # Overflows volume_24h_base
+        })
+
+        self.assertEqual(set(MarketData.objects.values_list("coin_id", flat=True)), {"AAA", "BBB"})
+        self.assertEqual(set(LatestQuote.objects.values_list("coin_id", flat=True)), {"AAA", "BBB"})
+
+    def test_coins_whose_insert_failed_are_retried(self):
+        coins = [listed_coin("AAA"), listed_coin("BBB")]
+        save_meme_coins = self.bot.ingest_db_handler.save_meme_coins
+        with mock.patch.object(
+            self.bot.ingest_db_handler, "save_meme_coins",
+            side_effect=lambda coins: save_meme_coins([coin for coin in coins if coin["Name"] != "BBB"]),
+        ):
+            self.ingest(coins, {})
+        self.assertEqual(set(MemeCoins.objects.values_list("coin_id", flat=True)), {"AAA"})
+
+        # Same coin list: only the failed coin is diffed and inserted again
+        with mock.patch.object(self.bot.ingest_db_handler, "save_meme_coins", wraps=save_meme_coins) as retried:
+            self.ingest(coins, {})
+        self.assertEqual([coin["Name"] for coin in retried.call_args.args[0]], ["BBB"])
+        self.assertEqual(set(MemeCoins.objects.values_list("coin_id", flat=True)), {"AAA", "BBB"})
+
+        with mock.patch.object(self.bot.ingest_db_handler, "save_meme_coins", wraps=save_meme_coins) as unchanged:
+            self.ingest(coins, {})
+        self.assertEqual(unchanged.call_args.args[0], [])
+
+
+class ChunkSymbolsTests(TestCase):
+    def setUp(self):
+        self.handler = IngestAPIHandler()
+
+    def chunks(self, symbols):
+        return list(self.handler.chunk_symbols(symbols))
+
+    def test_at_most_100_symbols_per_request(self):
+        symbols = [f"S{index}" for index in range(250)]  # Short enough to stay under 300 characters
+        self.handler.max_fsyms_length = 10 ** 6
+
+        chunks = self.chunks(symbols)
+
+        self.assertEqual([len(chunk) for chunk in chunks], [100, 100, 50])
+        self.assertEqual(sum(chunks, []), symbols)
+
+    def test_fsyms_stay_under_300_characters(self):
+        symbols = [f"COIN{index:05d}" for index in range(100)]  # 9 characters, 10 with the comma
+
+        chunks = self.chunks(symbols)
+
+        self.assertEqual([len(chunk) for chunk in chunks], [30, 30, 30, 10])
+        self.assertTrue(all(len(",".join(chunk)) <= 300 for chunk in chunks))
+        self.assertEqual(sum(chunks, []), symbols)
+
+    def test_duplicate_and_empty_symbols_are_dropped(self):
+        self.assertEqual(self.chunks(["AAA", "", "BBB", None, "AAA"]), [["AAA", "BBB"]])
+        self.assertEqual(self.chunks(["", None]), [])
+        self.assertEqual(self.chunks([]), [])
+
+    def test_symbol_longer_than_the_limit_gets_its_own_request(self):
+        long_symbol = "X" * 301
+        self.assertEqual(self.chunks(["AAA", long_symbol, "BBB"]), [["AAA"], [long_symbol], ["BBB"]])
+
+    def test_fetch_coins_data_merges_the_chunks(self):
+        symbols = [f"S{index}" for index in range(150)]
+        requests = []
+
+        def fetch_coin_data(fsyms, currency):
+            requests.append(fsyms)
+            return {"RAW": {symbol: {"USD": {}} for symbol in fsyms.split(",")}}
+
+        with mock.patch.object(self.handler, "fetch_coin_data", side_effect=fetch_coin_data):
+            coins_data = self.handler.fetch_coins_data(symbols + symbols[:10])
+
+        self.assertEqual(requests, [",".join(chunk) for chunk in self.chunks(symbols)])
+        self.assertEqual(list(coins_data["RAW"]), symbols)
+
+
+class CoinListResponse:
+    """Streamed requests response of the coin list, failing after `fail_after` chunks when set"""
+    def __init__(self, status_code, chunks=(), headers=None, fail_after=None):
+        self.status_code = status_code
+        self.chunks = list(chunks)
+        self.headers = headers or {}
+        self.fail_after = fail_after
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.closed = True
+
+    def iter_content(self, chunk_size):
+        for index, chunk in enumerate(self.chunks):
+            if index == self.fail_after:
+                raise ConnectionError("connection reset")
+            yield chunk
+
+
+class CoinListCacheTests(TestCase):
+    payload = json.dumps({"Data": {"AAA": listed_coin("AAA"), "BBB": listed_coin("BBB")}}).encode()
+
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        self.cache = CoinListCache("coinlist", cache_dir=cache_dir, ttl=3600)
+
+    def refresh(self, response):
+        with mock.patch("trading_bot.coin_list_cache.http_client") as http_client, mock.patch("builtins.print"):
+            http_client.get.return_value = response
+            meta = self.cache.refresh()
+        return meta, http_client.get
+
+    def download(self):
+        response = CoinListResponse(200, [self.payload[:10], self.payload[10:]], headers={"ETag": "v1"})
+        meta, _ = self.refresh(response)
+        self.assertTrue(response.closed)
+        return meta
+
+    def expire(self, meta):
+        self.cache._write_json(self.cache.meta_path, dict(meta, fetched_at=time.time() - 3601))
+
+    def test_download_is_cached(self):
+        meta = self.download()
+
+        self.assertEqual(meta["version"], hashlib.sha256(self.payload).hexdigest())
+        self.assertEqual(self.cache.payload_path.read_bytes(), self.payload)
+        self.assertEqual(self.cache.load_meta(), meta)
+
+    def test_payload_is_reused_within_the_ttl(self):
+        meta = self.download()
+
+        again, get = self.refresh(CoinListResponse(200, [b"{}"]))
+
+        get.assert_not_called()
+        self.assertEqual(again, meta)
+
+    def test_not_modified_keeps_the_payload(self):
+        meta = self.download()
+        self.expire(meta)
+
+        response = CoinListResponse(304)
+        revalidated, get = self.refresh(response)
+
+        self.assertEqual(get.call_args.kwargs["headers"], {"If-None-Match": "v1"})
+        self.assertTrue(response.closed)
+        self.assertEqual(revalidated["version"], meta["version"])
+        self.assertGreater(revalidated["fetched_at"], time.time() - 60)
+        self.assertEqual(self.cache.payload_path.read_bytes(), self.payload)
+
+    def test_error_status_falls_back_to_the_cached_copy(self):
+        meta = self.download()
+        self.expire(meta)
+
+        response = CoinListResponse(503)
+        self.assertEqual(self.refresh(response)[0]["version"], meta["version"])
+        self.assertTrue(response.closed)
+
+    def test_interrupted_download_falls_back_to_the_cached_copy(self):
+        meta = self.download()
+        self.expire(meta)
+
+        response = CoinListResponse(200, [b'{"Data": {', b"}}"], fail_after=1)
+        fallback, _ = self.refresh(response)
+
+        self.assertEqual(fallback["version"], meta["version"])
+        self.assertTrue(response.closed)
+        self.assertEqual(self.cache.payload_path.read_bytes(), self.payload)
+        self.assertEqual(sorted(os.listdir(self.cache.cache_dir)), ["coinlist.json", "coinlist.meta.json"])
+
+    def test_interrupted_first_download(self):
+        response = CoinListResponse(200, [b'{"Data": {', b"}}"], fail_after=1)
+        self.assertIsNone(self.refresh(response)[0])
+        self.assertEqual(os.listdir(self.cache.cache_dir), [])
+
+    def test_iter_delta_yields_added_and_changed_coins(self):
+        self.download()
+        digests = {}
+        self.assertEqual([name for name, _ in self.cache.iter_delta({}, digests)], ["AAA", "BBB"])
+
+        previous = dict(digests, AAA="stale", CCC="removed")
+        digests = {}
+        self.assertEqual([name for name, _ in self.cache.iter_delta(previous, digests)], ["AAA"])
+        self.assertEqual(set(previous) - set(digests), {"CCC"})
+
+
+def price_path(count, start=1.0):
+    """Deterministic zig-zag price path, so RSI has gains and losses"""
+    return [start * (1 + 0.01 * (index % 7) - 0.02 * (index % 3)) for index in range(count)]
+
+
+class IndicatorStoreTests(TestCase):
+    def test_new_state_is_seeded_from_history(self):
+        MarketData.objects.bulk_create([
+            make_tick("AAA", "Binance", minutes, price) for minutes, price in enumerate(price_path(250))
+        ])
+        store = IndicatorStore()
+        store.update([MarketData.objects.filter(coin_id="AAA").order_by("-last_updated").first()])
+        seeded = IndicatorState.objects.get(coin_id="AAA", market="Binance")
+
+        store.rebuild(["AAA"])
+        rebuilt = IndicatorState.objects.get(coin_id="AAA", market="Binance")
+        self.assertEqual(seeded.sample_count, 250)
+        self.assertAlmostEqual(store.rsi(seeded), store.rsi(rebuilt))
+        self.assertGreater(store.rsi(seeded), 0)
+        for window in (50, 200):
+            self.assertAlmostEqual(store.ma(seeded, window), store.ma(rebuilt, window))
+            self.assertGreater(store.ma(seeded, window), 0)
+
+    def test_configured_windows_extend_the_strategy_windows(self):
+        ticks = [make_tick("AAA", "Binance", minutes, price) for minutes, price in enumerate(price_path(250))]
+        MarketData.objects.bulk_create(ticks)
+        with mock.patch.dict(os.environ, {"MA_WINDOWS": "20,100"}):
+            bot = make_bot()
+        self.assertEqual(bot.indicator_store.ma_windows, (20, 50, 100, 200))
+        bot.indicator_store.rebuild()
+
+        insights = bot.get_coin_insights("AAA")
+        prices = [float(tick.price) for tick in ticks]
+        for window in (20, 50, 100, 200):
+            self.assertAlmostEqual(insights[f"ma_{window}"], sum(prices[-window:]) / window)
+
+
+class CandleStoreTests(TestCase):
+    def setUp(self):
+        # Hourly ticks over three days
+        MarketData.objects.bulk_create([
+            make_tick("AAA", "Binance", hour * 60, price) for hour, price in enumerate(price_path(72))
+        ])
+        self.store = CandleStore(["1d"])
+        self.store.rebuild()
+
+    def test_rebuild_keeps_candles_of_dropped_ticks(self):
+        first_day = Candle.objects.get(timeframe="1d", bucket_start=START)
+        # Retention dropped the raw ticks of the first day
+        MarketData.objects.filter(last_updated__lt=START + datetime.timedelta(days=1)).delete()
+
+        self.assertEqual(self.store.rebuild(), 2)
+        candles = Candle.objects.filter(timeframe="1d").order_by("bucket_start")
+        self.assertEqual([candle.tick_count for candle in candles], [24, 24, 24])
+        self.assertEqual(candles[0].pk, first_day.pk)
+
+    def test_rebuild_without_history_keeps_candles(self):
+        MarketData.objects.all().delete()
+
+        self.assertEqual(self.store.rebuild(), 0)
+        self.assertEqual(Candle.objects.filter(timeframe="1d").count(), 3)
+
+
+class RetryAfterTests(TestCase):
+    def test_delay_seconds(self):
+        self.assertEqual(retry_after_seconds("120"), 120.0)
+
+    def test_http_date(self):
+        retry_at = timezone.now() + datetime.timedelta(seconds=90)
+        self.assertAlmostEqual(retry_after_seconds(format_datetime(retry_at, usegmt=True)), 90, delta=2)
+        self.assertEqual(retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+
+    def test_unparsable(self):
+        for value in (None, "", "soon", "-5"):
+            self.assertIsNone(retry_after_seconds(value))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+
+
+class TokenBucketTests(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("trading_bot.async_ingest_handler.time.monotonic", self.clock.monotonic)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_refills_up_to_capacity(self):
+        bucket = TokenBucket(rate=10, capacity=5)
+        bucket.tokens = 0
+        self.clock.now = 0.3
+        bucket._refill()
+        self.assertAlmostEqual(bucket.tokens, 3)
+        self.clock.now = 10
+        bucket._refill()
+        self.assertEqual(bucket.tokens, 5)
+
+    def test_acquire_waits_for_a_token(self):
+        bucket = TokenBucket(rate=10, capacity=1)
+        with mock.patch("trading_bot.async_ingest_handler.asyncio.sleep", self.clock.sleep):
+            asyncio.run(bucket.acquire())
+            self.assertEqual(self.clock.now, 0)
+            asyncio.run(bucket.acquire())
+        self.assertAlmostEqual(self.clock.now, 0.1)
+
+    def test_concurrent_penalties_do_not_stack(self):
+        bucket = TokenBucket(rate=20)
+        for _ in range(50):
+            bucket.penalize(60)
+        self.assertEqual(bucket.tokens, -60 * 20)
+        with mock.patch("trading_bot.async_ingest_handler.asyncio.sleep", self.clock.sleep):
+            asyncio.run(bucket.acquire())
+        self.assertAlmostEqual(self.clock.now, 60 + 1 / 20)
+
+
+class FakeResponse:
+    def __init__(self, status, payload=None, headers=None):
+        self.status = status
+        self.payload = payload
+        self.headers = headers or {}
+        self.released = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.released = True
+
+    async def json(self, content_type=None):
+        return self.payload
+
+
+class AsyncIngestRetryTests(TestCase):
+    def test_rate_limited_request_backs_off_and_retries(self):
+        limited = FakeResponse(429, headers={"Retry-After": "7"})
+        ok = FakeResponse(200, {"RAW": {"AAA": {}}})
+        session = mock.Mock()
+        session.get.side_effect = [limited, ok]
+        bucket = mock.Mock(acquire=mock.AsyncMock())
+        slept = []
+
+        async def run():
+            semaphore = asyncio.Semaphore(1)
+
+            async def sleep(seconds):
+                # The response and the concurrency slot are released before backing off
+                slept.append((seconds, limited.released, semaphore.locked()))
+
+            with mock.patch("trading_bot.async_ingest_handler.asyncio.sleep", sleep):
+                return await AsyncIngestAPIHandler()._get_json(session, bucket, semaphore, "https://example.com/data")
+
+        self.assertEqual(asyncio.run(run()), {"RAW": {"AAA": {}}})
+        bucket.penalize.assert_called_once_with(7.0)
+        self.assertEqual(len(slept), 1)
+        seconds, released, locked = slept[0]
+        self.assertTrue(7 <= seconds <= 8)
+        self.assertTrue(released)
+        self.assertFalse(locked)
+
+    def test_gives_up_after_max_retries(self):
+        session = mock.Mock()
+        session.get.side_effect = [FakeResponse(429) for _ in range(3)]
+        bucket = mock.Mock(acquire=mock.AsyncMock())
+        handler = AsyncIngestAPIHandler(max_retries=2)
+        with mock.patch("trading_bot.async_ingest_handler.asyncio.sleep", mock.AsyncMock()):
+            result = asyncio.run(handler._get_json(session, bucket, asyncio.Semaphore(1), "https://example.com/data"))
+        self.assertIsNone(result)
+        self.assertEqual([call.args[0] for call in bucket.penalize.call_args_list], [1, 2, 4])
+
+
+def backtest_summary(total_pnl, max_drawdown, closed_trades=1):
+    return {
+        "total_pnl": total_pnl, "realized_pnl": total_pnl, "unrealized_pnl": 0.0, "max_drawdown": max_drawdown,
+        "fees": 0.0, "invested": 100.0 * closed_trades, "closed_trades": closed_trades, "open_trades": 0,
+        "win_rate": 1.0 if total_pnl > 0 else 0.0, "start": START, "end": START,
+    }
+
+
+class SweepRankingTests(TestCase):
+    def test_pnl_to_drawdown_ranks_gains_without_drawdown_first(self):
+        parameter_sets = [{"rsi_oversold": value} for value in (20, 25, 30, 35)]
+        summaries = [
+            backtest_summary(10.0, 5.0),
+            backtest_summary(4.0, 0.0),  # Profitable without any drawdown
+            backtest_summary(0.0, 0.0, closed_trades=0),
+            backtest_summary(-5.0, 10.0),
+        ]
+        Sweep(objective="pnl_to_drawdown").save("test", parameter_sets, summaries)
+
+        ranked = SweepResult.objects.filter(sweep="test").order_by("rank")
+        self.assertEqual([result.params["rsi_oversold"] for result in ranked], [25, 20, 30, 35])
+        self.assertEqual([result.score for result in ranked], [float("inf"), 2.0, 0.0, -0.5])
+
+
+class InsightQueryTests(TestCase):
+    symbols = ["AAA", "BBB", "CCC", "DDD"]
+
+    @classmethod
+    def setUpTestData(cls):
+        # Two markets per coin; the second has more volume but stops earlier
+        ticks = []
+        for index, symbol in enumerate(cls.symbols):
+            prices = price_path(60, start=index + 1)
+            ticks += [make_tick(symbol, "Binance", minutes, price) for minutes, price in enumerate(prices)]
+            ticks += [
+                make_tick(symbol, "Kraken", minutes, price, volume=5000) for minutes, price in enumerate(prices[:40])
+            ]
+        MarketData.objects.bulk_create(ticks)
+        IndicatorStore().rebuild()
+
+    def setUp(self):
+        self.bot = make_bot()
+
+    def query_counts(self):
+        counts = []
+        for size in (1, 2, len(self.symbols)):
+            with CaptureQueriesContext(connection) as queries:
+                insights = self.bot.get_insights_batch(self.symbols[:size])
+            self.assertEqual(len(insights), size)
+            counts.append(len(queries))
+        return counts
+
+    def test_query_count_does_not_grow_with_symbols(self):
+        # Latest quotes, indicator states, the history lower bound and the recent history
+        LatestQuoteStore().rebuild()
+        self.assertEqual(self.query_counts(), [4, 4, 4])
+
+    def test_query_count_without_latest_quotes(self):
+        # Plus one windowed query for the latest tick of every market
+        self.assertEqual(self.query_counts(), [5, 5, 5])
+
+    def test_get_coin_insights_queries(self):
+        LatestQuoteStore().rebuild()
+        with self.assertNumQueries(4):
+            self.bot.get_coin_insights("AAA")
+
+    def test_history_load_is_bounded_by_the_lookback(self):
+        LatestQuoteStore().rebuild()
+        pairs = [(symbol, "Binance") for symbol in self.symbols] + [("AAA", "Kraken")]
+        with CaptureQueriesContext(connection) as queries:
+            histories = indicators.load_histories(pairs, limit=10)
+        # Binance ticks run to minute 59 and Kraken ticks to minute 39
+        self.assertIn(str((START + datetime.timedelta(minutes=30)).replace(tzinfo=None)), queries[-1]["sql"])
+        for symbol, market in pairs:
+            expected = MarketData.objects.filter(coin_id=symbol, market=market).order_by("-last_updated")[:10]
+            self.assertEqual(
+                list(histories[(symbol, market)]["price"]), [float(tick.price) for tick in reversed(expected)]
+            )
+
+    def test_history_of_pairs_shorter_than_the_lookback(self):
+        LatestQuoteStore().rebuild()
+        histories = indicators.load_histories([("AAA", "Binance"), ("BBB", "Kraken")], limit=100)
+        self.assertEqual(len(histories[("AAA", "Binance")]["price"]), 60)
+        self.assertEqual(len(histories[("BBB", "Kraken")]["price"]), 40)
+
+    def test_history_without_latest_quotes_is_unbounded(self):
+        histories = indicators.load_histories([("AAA", "Binance")], limit=10)
+        self.assertEqual(len(histories[("AAA", "Binance")]["price"]), 10)
+
+    def test_latest_market_matches_the_correlated_subquery(self):
+        for rebuild_quotes in (False, True):
+            if rebuild_quotes:
+                LatestQuoteStore().rebuild()
+            insights = self.bot.get_insights_batch(self.symbols)
+            for symbol in self.symbols:
+                expected = legacy_latest_market(symbol)
+                self.assertEqual(
+                    (insights[symbol]["market"], insights[symbol]["last_updated"]),
+                    (expected.market, expected.last_updated),
+                )
+
+
+CLASSIFIER_COINS = [
+    {"Name": "Doge Killer", "Symbol": "LEASH", "Description": "To the moon"},
+    {"Name": "Shiba Inu", "Symbol": "SHIB", "Description": "A woof community", "SocialMentions": 5000},
+    {"Name": "Frogcoin", "Symbol": "frog", "Description": "One quadrillion tokens"},
+    {"Name": "Bitcoin", "Symbol": "BTC", "Description": "Peer to peer electronic cash"},
+    {"Name": "Ethereum", "Symbol": "ETH2", "Description": "", "RedditSubscribers": 100000},
+    {"Name": "Hamster Kombat", "Symbol": "HMSTR", "Description": "Meow, ngmi", "LogoUrl": "/logo.png"},
+    {"Name": "Chainlink", "Symbol": "LINK", "Description": "Oracles", "SocialMentions": 999},
+    {"Name": "Based Cat", "Symbol": "$BCAT", "Description": "Diamond hands only"},
+]
+
+
+class InsightCacheTests(TestCase):
+    def setUp(self):
+        MarketData.objects.bulk_create([
+            make_tick(symbol, "Binance", minutes, price)
+            for symbol in ("AAA", "BBB") for minutes, price in enumerate(price_path(30))
+        ])
+        LatestQuoteStore().rebuild()
+        self.bot = make_bot()
+        self.bot.insight_cache = self.cache = InsightCache(max_entries=10, ttl=60)
+
+    def test_hit_while_the_tick_version_is_unchanged(self):
+        first = self.bot.get_insights_batch(["AAA", "BBB"])
+        with CaptureQueriesContext(connection) as queries:
+            second = self.bot.get_insights_batch(["AAA", "BBB"])
+
+        self.assertEqual(len(queries), 1)  # Only the latest quotes
+        self.assertIs(second["AAA"], first["AAA"])
+        self.assertEqual(self.cache.stats(), {"entries": 2, "hits": 2, "misses": 2, "invalidations": 0})
+
+    def test_miss_after_a_new_tick(self):
+        first = self.bot.get_insights_batch(["AAA", "BBB"])
+        tick = make_tick("AAA", "Binance", 30, 2.0)
+        tick.save()
+        LatestQuoteStore().update([tick])
+        self.cache.invalidate({"AAA"})
+
+        second = self.bot.get_insights_batch(["AAA", "BBB"])
+
+        self.assertEqual(second["AAA"]["price"], 2.0)
+        self.assertIs(second["BBB"], first["BBB"])
+        self.assertEqual(self.cache.stats(), {"entries": 2, "hits": 1, "misses": 3, "invalidations": 1})
+
+    def test_miss_after_invalidate(self):
+        self.cache.set("AAA", 1, {"price": 1.0})
+        self.cache.set("BBB", 1, {"price": 2.0})
+
+        self.cache.invalidate({"AAA", "CCC"})
+        self.assertIsNone(self.cache.get("AAA", 1))
+        self.assertEqual(self.cache.get("BBB", 1), {"price": 2.0})
+        self.cache.invalidate()
+        self.assertIsNone(self.cache.get("BBB", 1))
+        self.assertEqual(self.cache.stats()["invalidations"], 2)
+
+    def test_miss_on_another_version(self):
+        self.cache.set("AAA", 1, {"price": 1.0})
+        self.assertIsNone(self.cache.get("AAA", 2))
+        self.assertEqual(self.cache.get("AAA", 1), {"price": 1.0})
+
+    def test_entries_expire_after_the_ttl(self):
+        with mock.patch("trading_bot.insight_cache.time.monotonic", return_value=1000):
+            self.cache.set("AAA", 1, {"price": 1.0})
+        with mock.patch("trading_bot.insight_cache.time.monotonic", return_value=1060):
+            self.assertEqual(self.cache.get("AAA", 1), {"price": 1.0})
+        with mock.patch("trading_bot.insight_cache.time.monotonic", return_value=1061):
+            self.assertIsNone(self.cache.get("AAA", 1))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = InsightCache(max_entries=2, ttl=60)
+        cache.set("AAA", 1, {"price": 1.0})
+        cache.set("BBB", 1, {"price": 2.0})
+        cache.get("AAA", 1)  # BBB is now the least recently used
+        cache.set("CCC", 1, {"price": 3.0})
+
+        self.assertEqual(list(cache.entries), ["AAA", "CCC"])
+        self.assertIsNone(cache.get("BBB", 1))
+
+    def test_disabled_cache_stores_nothing(self):
+        cache = InsightCache(max_entries=0, ttl=60)
+        cache.set("AAA", 1, {"price": 1.0})
+        self.assertIsNone(cache.get("AAA", 1))
+
+
+class MemeClassifierTests(TestCase):
+    def test_matches_legacy_is_meme_coin(self):
+        classifier = MemeCoinClassifier()
+        for coin in CLASSIFIER_COINS:
+            with self.subTest(coin=coin["Name"]):
+                self.assertEqual(classifier.is_meme_coin(coin), legacy_is_meme_coin(coin))
+        self.assertTrue(any(legacy_is_meme_coin(coin) for coin in CLASSIFIER_COINS))
+        self.assertFalse(all(legacy_is_meme_coin(coin) for coin in CLASSIFIER_COINS))
+
+    def test_cached_scores_match(self):
+        classifier = MemeCoinClassifier()
+        first = [classifier.is_meme_coin(coin) for coin in CLASSIFIER_COINS]
+        self.assertEqual([classifier.is_meme_coin(coin) for coin in CLASSIFIER_COINS], first)
+        self.assertEqual(classifier.hits, len(CLASSIFIER_COINS))
+
+    def test_classify_batch_matches_is_meme_coin(self):
+        classifier = MemeCoinClassifier()
+        coins = CLASSIFIER_COINS + [{"Name": "Null Inu", "Symbol": None, "Description": None}]
+        mask, scores, _ = classifier.classify_batch(coins)
+        self.assertEqual(list(mask), [classifier.is_meme_coin(coin) for coin in coins])
+        self.assertEqual(list(scores), [classifier.score(coin) for coin in coins])
+
+
+def random_walk(count, seed=0):
+    rng = random.Random(seed)
+    price, prices = 1.0, []
+    for _ in range(count):
+        price *= 1 + rng.gauss(0, 0.01)
+        prices.append(Decimal(str(round(price, 15))))
+    return prices
+
+
+class IndicatorParityTests(TestCase):
+    def assertParity(self, decimal_prices):
+        prices = np.fromiter(decimal_prices, dtype=np.float64)
+        expected = (legacy_rsi(decimal_prices), legacy_ma(decimal_prices, 50), legacy_ma(decimal_prices, 200))
+        result = (
+            indicators.last(indicators.rsi(prices)),
+            indicators.last(indicators.sma(prices, 50)),
+            indicators.last(indicators.sma(prices, 200)),
+        )
+        for name, want, got in zip(("rsi_14", "ma_50", "ma_200"), expected, result):
+            with self.subTest(name=name):
+                self.assertTrue(np.isclose(float(want), got, rtol=1e-9), f"legacy {want} vs numpy {got}")
+
+    def test_matches_legacy_loops(self):
+        self.assertParity(random_walk(1000))
+
+    def test_short_history_has_not_warmed_up(self):
+        self.assertParity(random_walk(10))
+        self.assertParity(random_walk(100))
+
+    def test_rising_prices(self):
+        self.assertParity([Decimal(price) for price in range(1, 300)])
+
+    def test_compute_indicators_matches_the_single_indicators(self):
+        prices = np.fromiter(random_walk(300), dtype=np.float64)
+        values = indicators.compute_indicators(prices, ma_windows=(20, 50))
+        self.assertEqual(values["rsi_14"], indicators.last(indicators.rsi(prices)))
+        self.assertEqual(values["ma_20"], indicators.last(indicators.sma(prices, 20)))
+        self.assertEqual(values["ma_50"], indicators.last(indicators.sma(prices, 50)))
+
+
+def random_insights(count, rng):
+    insights = {}
+    for index in range(count):
+        price = rng.lognormvariate(0, 1)
+        insights[f"COIN{index}"] = {
+            'symbol': f"COIN{index}",
+            'price': price,
+            'ma_50': price * rng.uniform(0.8, 1.2),
+            'ma_200': price * rng.uniform(0.8, 1.2),
+            'rsi_14': rng.choice([0, rng.uniform(0, 100)]),
+            'volume_24h': rng.lognormvariate(13, 2),
+            'price_change_1h': rng.gauss(0, 2),
+            'price_change_24h': rng.gauss(0, 5),
+        }
+    return insights
+
+
+def random_trades(symbols, count, now, rng):
+    trades = []
+    for index in range(count):
+        trade = Trades(
+            trade_id=index + 1,
+            coin_id=rng.choice(symbols),
+            buying_price=Decimal(str(rng.lognormvariate(0, 1))),
+            quantity=1,
+            total_paid_amount=1,
+        )
+        trade.buy_date = now - datetime.timedelta(seconds=rng.uniform(0, 14 * 24 * 60 * 60))
+        trades.append(trade)
+    return trades
+
+
+class ColumnarScorerTests(TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        self.now = timezone.now()
+        self.insights = random_insights(300, rng)
+        self.trades = random_trades(list(self.insights), 100, self.now, rng)
+        self.algorithm = FilteringAlgorithm()
+        self.scorer = ColumnarScorer(self.algorithm)
+
+    def test_evaluate_many_matches_per_dict_scoring(self):
+        with mock.patch("trading_bot.filtering_handler.timezone.now", return_value=self.now):
+            expected = self.algorithm.evaluate_many(self.insights, self.trades)
+        self.assertEqual(self.scorer.evaluate_many(self.insights, self.trades, now=self.now), expected)
+        self.assertTrue(any(result["ready_to_buy"] for result in expected.values()))
+        actions = {trade["action"] for result in expected.values() for trade in result["trades"]}
+        self.assertEqual(actions, {Trades.SELL, Trades.HOLD})
+
+    def test_rank_buys_matches_sorted_evaluations(self):
+        expected = self.algorithm.evaluate_many(self.insights, [])
+        ranking = sorted(
+            ((symbol, result["buy_score"]) for symbol, result in expected.items() if result["ready_to_buy"]),
+            key=lambda candidate: candidate[1], reverse=True,
+        )
+        self.assertEqual(self.scorer.rank_buys(self.insights), ranking)
+        self.assertEqual(self.scorer.rank_buys(self.insights, limit=5), ranking[:5])
+
+    def test_empty_universe(self):
+        self.assertEqual(self.scorer.evaluate_many({}, self.trades), {})
+        self.assertEqual(self.scorer.rank_buys({}), [])
+
+
+class QueryPlanTests(TestCase):
+    symbols = ["AAA", "BBB", "CCC"]
+
+    @classmethod
+    def setUpTestData(cls):
+        ticks = []
+        for index, symbol in enumerate(cls.symbols + ["SOL"]):
+            for market in ("Binance", "Kraken"):
+                ticks += [
+                    make_tick(symbol, market, minutes * 10, price)
+                    for minutes, price in enumerate(price_path(30, start=index + 1))
+                ]
+        MarketData.objects.bulk_create(ticks)
+        IndicatorStore().rebuild()
+        LatestQuoteStore().rebuild()
+        CandleStore().rebuild()
+
+    def setUp(self):
+        if connection.vendor not in PLAN_CHECKS:
+            self.skipTest(f"Query plans are not checked on {connection.vendor}")
+
+    def test_hot_path_uses_indexes(self):
+        queries = capture_hot_path(self.symbols)
+        self.assertTrue(queries)
+        for sql in queries:
+            with self.subTest(sql=sql):
+                scans, plan = sequential_scans(sql)
+                self.assertEqual(scans, [], plan)
+
+    def test_sequential_scans_are_reported(self):
+        sql = str(MarketData.objects.filter(price__gt=1).query)
+        scans, _ = sequential_scans(sql)
+        self.assertEqual(scans, [MarketData._meta.db_table])
+
+    def test_hot_path_query_count_does_not_grow_with_symbols(self):
+        self.assertEqual(len(capture_hot_path(self.symbols[:1])), len(capture_hot_path(self.symbols)))
+
+    def test_store_updates_query_count_does_not_grow_with_rows(self):
+        counts = []
+        for symbols in (self.symbols[:1], self.symbols):
+            ticks = MarketData.objects.bulk_create(
+                [make_tick(symbol, "Binance", 400 + len(symbols), 2.0) for symbol in symbols]
+            )
+            with CaptureQueriesContext(connection) as queries:
+                IndicatorStore().update(ticks)
+                LatestQuoteStore().update(ticks)
+                CandleStore().update(ticks)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class PartitionTests(TestCase):
+    # Past the partitions migration 0015 creates ahead, so ticks land in the default partition
+    month = datetime.datetime(2099, 1, 1, tzinfo=datetime.timezone.utc)
+
+    def setUp(self):
+        self.partitions = MarketDataPartitions()
+        if not self.partitions.is_partitioned():
+            self.skipTest("MarketData is only partitioned on PostgreSQL")
+
+    def tick(self, coin_id, days):
+        tick = make_tick(coin_id, "Binance", 0, 1)
+        tick.last_updated = self.month + datetime.timedelta(days=days)
+        return tick
+
+    def count(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM "{table}"')
+            return cursor.fetchone()[0]
+
+    def test_create_moves_ticks_out_of_the_default_partition(self):
+        MarketData.objects.bulk_create([self.tick("AAA", 0), self.tick("AAA", 40)])
+        default_ticks = self.count(self.partitions.default_partition)
+
+        self.partitions.create(self.month)
+
+        self.assertIn(self.month, self.partitions.partitions())
+        self.assertEqual(self.count(self.partitions.partition_name(self.month)), 1)
+        self.assertEqual(self.count(self.partitions.default_partition), default_ticks - 1)
+        self.assertEqual(MarketData.objects.filter(coin_id="AAA").count(), 2)
+
+    def test_check_constraints_are_kept(self):
+        self.partitions.create(self.month)
+        for days in (0, 40):  # Monthly and default partition
+            tick = self.tick("AAA", days)
+            tick.market_cap_rank = -1
+            with self.subTest(days=days), self.assertRaises(IntegrityError), transaction.atomic():
+                tick.save()
+
+    def test_rolled_up_compares_every_coin(self):
+        self.partitions.create(self.month)
+        MarketData.objects.bulk_create([self.tick("AAA", 0), self.tick("AAA", 1), self.tick("BBB", 0)])
+        self.assertFalse(self.partitions.rolled_up(self.month))
+        # As many candle ticks as partition ticks overall, but none for BBB
+        Candle.objects.create(
+            coin_id="AAA", market="Binance", timeframe="1d", bucket_start=self.month, tick_count=3,
+            open=1, high=1, low=1, close=1, open_at=self.month, close_at=self.month,
+        )
+        self.assertFalse(self.partitions.rolled_up(self.month))
+        CandleStore().rebuild()
+        self.assertTrue(self.partitions.rolled_up(self.month))
+
+    def test_retention_keeps_months_not_rolled_up(self):
+        self.partitions.create(self.month)
+        MarketData.objects.bulk_create([self.tick("AAA", 0)])
+        now = self.month + datetime.timedelta(days=95)
+        name = self.partitions.partition_name(self.month)
+
+        with mock.patch("trading_bot.management.commands.manage_partitions.timezone.now", return_value=now):
+            stderr = io.StringIO()
+            call_command("manage_partitions", ahead=0, retention_months=1, stdout=io.StringIO(), stderr=stderr)
+            self.assertIn(f"Keeping {name}", stderr.getvalue())
+            self.assertIn(self.month, self.partitions.partitions())
+
+            CandleStore().rebuild()
+            call_command("manage_partitions", ahead=0, retention_months=1, stdout=io.StringIO())
+            self.assertNotIn(self.month, self.partitions.partitions())
+
+
+def write_strategy(directory, buy_rules, sell_rules, cutoff=1, **params):
+    """Strategy YAML file in `directory` with one-condition rules given as {reason: condition}"""
+    config = {
+        "name": "test",
+        "params": {"profit_target": 0.02, **params},
+        "buy": {"cutoff": cutoff, "rules": [{"reason": reason, "when": when} for reason, when in buy_rules.items()]},
+        "sell": {"cutoff": cutoff, "rules": [{"reason": reason, "when": when} for reason, when in sell_rules.items()]},
+    }
+    path = os.path.join(directory, "strategy.yaml")
+    with open(path, "w") as f:
+        yaml.safe_dump(config, f)
+    return path
+
+
+class StrategyConfigTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = write_strategy(self.directory, {"Cheap": "price < 1"}, {"Profit": "price_change >= profit_target"})
+        self.config = StrategyConfig(self.path)
+
+    def rewrite(self, text):
+        # A later modification time than the previous write, even on coarse clocks
+        mtime = os.stat(self.path).st_mtime_ns + 10 ** 9
+        with open(self.path, "w") as f:
+            f.write(text)
+        os.utime(self.path, ns=(mtime, mtime))
+
+    def test_reloads_when_the_file_changes(self):
+        strategy = self.config.current()
+        self.assertIs(self.config.current(), strategy)
+
+        with open(self.path) as f:
+            self.rewrite(f.read().replace("cutoff: 1", "cutoff: 2"))
+        with mock.patch("builtins.print"):
+            reloaded = self.config.current()
+
+        self.assertIsNot(reloaded, strategy)
+        self.assertEqual((strategy.buy_cutoff, reloaded.buy_cutoff), (1, 2))
+
+    def test_keeps_the_last_good_strategy(self):
+        strategy = self.config.current()
+
+        for text in ("buy: [unclosed", "name: test\nbuy: {rules: [{reason: Bad, when: price < missing}]}\n"):
+            self.rewrite(text)
+            with mock.patch("builtins.print") as report:
+                self.assertIs(self.config.current(), strategy)
+                self.assertIs(self.config.current(), strategy)
+            report.assert_called_once()  # Once per change of the file
+
+    def test_reasons_show_row_values(self):
+        write_strategy(
+            self.directory,
+            {"Cheap ({price:.2f})": "price < 1", "Quiet": "volume_24h < 1"},
+            {"Hit profit target (+{price_change:.2%})": "price_change >= profit_target"},
+        )
+        algorithm = FilteringAlgorithm(self.path)
+        strategy = algorithm.strategy
+
+        _, reasons = strategy.score(strategy.sell_rules, {"price_change": 0.05})
+        self.assertEqual(reasons, ["Hit profit target (+5.00%)"])
+
+        insights = {"AAA": dict(hold_insights("AAA"), price=0.5), "BBB": dict(hold_insights("BBB"), price=0.25)}
+        evaluations = ColumnarScorer(algorithm).evaluate_many(insights, [])
+        self.assertEqual(evaluations, algorithm.evaluate_many(insights, []))
+        self.assertEqual(evaluations["BBB"]["buy_reasons"], ["Cheap (0.25)"])
+
+    def test_reason_of_an_unknown_column_is_refused(self):
+        write_strategy(self.directory, {"Cheap ({cost})": "price < 1"}, {})
+        with self.assertRaisesRegex(ValueError, "cost"):
+            FilteringAlgorithm(self.path)
+
+
+class BacktestTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def backtest(self, buy_rules, sell_rules, **options):
+        algorithm = FilteringAlgorithm(write_strategy(self.directory, buy_rules, sell_rules))
+        return Backtest(algorithm=algorithm, fee_bps=10, slippage_bps=50, usd_per_trade=100, **options)
+
+    def test_pnl_includes_fees_and_slippage(self):
+        MarketData.objects.bulk_create([make_tick("AAA", "Binance", 0, 1.0), make_tick("AAA", "Binance", 15, 2.0)])
+        backtest = self.backtest({"Cheap": "price < 1.5"}, {"Doubled": "price_change >= 0.5"}, cycle_minutes=15)
+
+        result = backtest.run()
+
+        # Bought at 1.0 + 0.5% slippage with 0.1% of the 100 USD as fee, sold at 2.0 - 0.5%, less 0.1%
+        quantity = 100 * 0.999 / 1.005
+        proceeds = quantity * 2.0 * 0.995 * 0.999
+        [trade] = result["trades"]
+        self.assertEqual(trade["status"], "CLOSED")
+        self.assertAlmostEqual(trade["quantity"], 99.402985, places=6)
+        self.assertAlmostEqual(trade["buying_price"], 100 / quantity)
+        self.assertAlmostEqual(trade["proceeds"], proceeds)
+        self.assertAlmostEqual(trade["pnl"], 97.614128, places=6)
+        self.assertAlmostEqual(trade["fees"], 0.1 + quantity * 2.0 * 0.995 * 0.001)
+        summary = result["summary"]
+        self.assertEqual((summary["cycles"], summary["closed_trades"], summary["open_trades"]), (2, 1, 0))
+        self.assertAlmostEqual(summary["total_pnl"], proceeds - 100)
+        # Marked at the liquidation value after buying: the round trip costs are the only drawdown
+        self.assertAlmostEqual(result["equity"][0], quantity * 0.995 * 0.999 - 100)
+        self.assertAlmostEqual(summary["max_drawdown"], 100 - quantity * 0.995 * 0.999)
+
+    def test_several_ticks_of_a_coin_in_one_cycle(self):
+        # Cycles at minutes 0 and 60: the second one gets 39 AAA ticks and 20 BBB ticks
+        prices = price_path(40)
+        MarketData.objects.bulk_create(
+            [make_tick("AAA", "Binance", minutes, price) for minutes, price in enumerate(prices)]
+            + [make_tick("BBB", "Binance", minutes * 3, price) for minutes, price in enumerate(prices[:21])]
+        )
+        backtest = self.backtest({"Never": "price < 0"}, {"Never": "price < 0"}, cycle_minutes=60)
+        pairs = backtest.pairs()
+
+        _, (_, columns) = backtest.replay(pairs)
+        self.assertEqual(backtest.ticks_replayed, 61)
+        for index, coin_prices in enumerate((prices, prices[:21])):
+            history = np.array([float(Decimal(str(price))) for price in coin_prices])
+            self.assertEqual(columns["price"][index], history[-1])
+            self.assertAlmostEqual(columns["rsi_14"][index], indicators.last(indicators.rsi(history)))
+
+        # Same indicator values as one tick per cycle
+        backtest.cycle_seconds = 60
+        *_, (_, per_tick) = backtest.replay(pairs)
+        self.assertEqual(backtest.ticks_replayed, 61)
+        for name in ("price", "rsi_14", "ma_50"):
+            self.assertTrue(np.allclose(per_tick[name], columns[name]), name)
+
+    def test_history_store_matches_the_database(self):
+        ticks = []
+        for index, symbol in enumerate(["AAA", "BBB", "CCC"]):
+            ticks += [
+                make_tick(symbol, "Binance", minutes * 5 + index, price)
+                for minutes, price in enumerate(price_path(300, start=index + 1))
+            ]
+        MarketData.objects.bulk_create(ticks)
+        store = HistoryStore(self.directory)
+        store.export()
+        strategy = ({"Oversold": "rsi_14 < 40"}, {"Profit": "price_change >= 0.01", "Loss": "price_change <= -0.01"})
+
+        from_store = self.backtest(*strategy, history_store=store).run()
+        from_database = self.backtest(*strategy, history_store=None).run()
+
+        self.assertTrue(from_database["trades"])
+        self.assertEqual(from_store["summary"], from_database["summary"])
+        self.assertEqual(from_store["trades"], from_database["trades"])
+        self.assertTrue(np.array_equal(from_store["equity"], from_database["equity"]))
+
+
+class HistoryStoreTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.store = HistoryStore(directory)
+
+    def assertExported(self, coin_id, market):
+        columns = self.store.load(coin_id, market)
+        ticks = MarketData.objects.filter(coin_id=coin_id, market=market).order_by("last_updated")
+        self.assertEqual(list(columns["timestamp"]), [int(tick.last_updated.timestamp()) for tick in ticks])
+        self.assertEqual(list(columns["price"]), [float(tick.price) for tick in ticks])
+        self.assertEqual(list(columns["volume_24h"]), [float(tick.volume_24h_base) for tick in ticks])
+
+    def test_export_appends_new_ticks(self):
+        MarketData.objects.bulk_create(
+            [make_tick("AAA", "Binance", minutes, minutes + 1) for minutes in range(5)]
+            + [make_tick("BBB", "Kraken", 0, 9)]
+        )
+        self.assertEqual(self.store.export(), 6)
+        self.assertEqual(self.store.pairs(), [("AAA", "Binance"), ("BBB", "Kraken")])
+
+        MarketData.objects.bulk_create([make_tick("AAA", "Binance", minutes, minutes + 1) for minutes in (5, 6)])
+        self.assertEqual(self.store.export(), 2)
+        self.assertEqual(self.store.meta("AAA", "Binance")["rows"], 7)
+        self.assertEqual(self.store.export(), 0)
+        self.assertExported("AAA", "Binance")
+        self.assertExported("BBB", "Kraken")
+
+    def test_late_ticks_re_export_the_pair(self):
+        MarketData.objects.bulk_create([make_tick("AAA", "Binance", minutes, 1) for minutes in (0, 2, 4)])
+        self.store.export()
+
+        MarketData.objects.bulk_create([make_tick("AAA", "Binance", 3, 2)])  # Older than the last export
+        self.assertEqual(self.store.export(), 4)
+        self.assertExported("AAA", "Binance")
+
+    def test_interrupted_export_is_truncated(self):
+        MarketData.objects.bulk_create([make_tick("AAA", "Binance", minutes, 1) for minutes in range(3)])
+        self.store.export()
+        with open(self.store._pair_dir("AAA", "Binance") / "price.bin", "ab") as f:
+            f.write(b"partial")
+
+        MarketData.objects.bulk_create([make_tick("AAA", "Binance", 3, 2)])
+        self.assertEqual(self.store.export(), 1)
+        self.assertExported("AAA", "Binance")
+
+
+class SweepTests(TransactionTestCase):
+    # Not TestCase: the sweep closes the database connections before forking its workers
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        ticks = []
+        for index, symbol in enumerate(["AAA", "BBB"]):
+            ticks += [
+                make_tick(symbol, "Binance", minutes * 5 + index, price)
+                for minutes, price in enumerate(price_path(200, start=index + 1))
+            ]
+        MarketData.objects.bulk_create(ticks)
+
+    def strategy(self, name, rsi_oversold):
+        directory = os.path.join(self.directory, name)
+        os.mkdir(directory)
+        return write_strategy(
+            directory, {"Oversold": "rsi_14 < rsi_oversold"},
+            {"Profit": "price_change >= 0.01", "Loss": "price_change <= -0.01"}, rsi_oversold=rsi_oversold,
+        )
+
+    def test_parallel_sweep_matches_single_backtests(self):
+        cache_dir = os.path.join(self.directory, "cache")
+        os.mkdir(cache_dir)
+        sweep = Sweep(
+            strategy_path=self.strategy("base", 30), workers=2, cache_dir=cache_dir,
+            backtest_options={"cycle_minutes": 15, "usd_per_trade": 100},
+        )
+        parameter_sets = [{"rsi_oversold": 40}, {"rsi_oversold": 60, "usd_per_trade": 50}]
+        with mock.patch("trading_bot.sweep.tempfile.mkdtemp", wraps=tempfile.mkdtemp) as mkdtemp:
+            results = sweep.run("test", parameter_sets)
+        self.assertEqual(mkdtemp.call_args.kwargs["dir"], cache_dir)
+        self.assertEqual(os.listdir(cache_dir), [])  # Removed once the sweep is done
+
+        by_params = {json.dumps(result.params, sort_keys=True): result for result in results}
+        for parameters in parameter_sets:
+            backtest = Backtest(
+                algorithm=FilteringAlgorithm(self.strategy(str(parameters["rsi_oversold"]), parameters["rsi_oversold"])),
+                cycle_minutes=15, usd_per_trade=parameters.get("usd_per_trade", 100),
+            )
+            summary = backtest.run()["summary"]
+            result = by_params[json.dumps(parameters, sort_keys=True)]
+            self.assertGreater(summary["closed_trades"], 0)
+            for field in ("total_pnl", "realized_pnl", "unrealized_pnl", "max_drawdown", "fees",
+                          "closed_trades", "open_trades", "win_rate", "start", "end"):
+                self.assertEqual(getattr(result, field), summary[field], field)
@@ -1,65 +1,125 @@
-import datetime
-import pytz
+import os
 import time
-from django.db.models import OuterRef, Subquery
+from collections import Counter
 from django.db import transaction
-from django.utils import timezone
-from .ingest_handler import IngestAPIHandler, IngestDBHandler
+from .ingest_handler import IngestAPIHandler, IngestDBHandler, parse_launch_date
+from .async_ingest_handler import AsyncIngestAPIHandler
 from .filtering_handler import FilteringAlgorithm
-from .execution_handler import ExecutionHandler, ExecutionError
-from .models import Categories, MemeCoins, MemeCoinCategories, MarketData, Trades
+from .indicator_store import IndicatorStore
+from .latest_quotes import LatestQuoteStore, latest_market_data
+from .candles import CandleStore
+from .insight_cache import insight_cache
+from . import indicators
+from .execution_handler import ExecutionHandler
+from .models import MemeCoins, MarketData, Trades, IngestState, IndicatorState
 
 class TradingBot:
     def __init__(self):
         self.trading_cycle = 15 # Minutes
-        self.ingest_api_handler = IngestAPIHandler()
+        # "sync" issues requests one after another, "async" runs them concurrently under a rate limit
+        self.ingest_engine = os.getenv("INGEST_ENGINE", "sync")
+        if self.ingest_engine == "async":
+            self.ingest_api_handler = AsyncIngestAPIHandler()
+        else:
+            self.ingest_api_handler = IngestAPIHandler()
         self.ingest_db_handler = IngestDBHandler()
         self.filtering_algorithm = FilteringAlgorithm()
-        self.execution_handler = ExecutionHandler()
+        self.indicator_store = IndicatorStore()
+        self.latest_quotes = LatestQuoteStore()
+        self.candle_store = CandleStore()
+        self.insight_cache = insight_cache
+        self._execution_handler = None
 
         self.usd_amount_per_trade = 100
+        self.indicator_lookback = 500  # Ticks (or candles) used for the EMA/MACD/Bollinger/ATR indicators
+        # Candle timeframe ("1m", "15m", "1h" or "1d") the indicators are computed over, None for raw ticks
+        self.indicator_timeframe = os.getenv("INDICATOR_TIMEFRAME") or None
 
 
+    @property
+    def execution_handler(self):
+        """
+            ExecutionHandler, created on first use: it loads the wallet and
+            the Jupiter token list, which the read paths do not need
+        """
+        if self._execution_handler is None:
+            self._execution_handler = ExecutionHandler()
+        return self._execution_handler
+
     def ingest_all_data(self):
+        # Only coins added or changed since the previous cycle are classified
+        state, _ = IngestState.objects.get_or_create(name="coin_list")
+        delta = self.ingest_api_handler.fetch_coin_list_delta({
+            "version": state.coin_list_version,
+            "digests": state.digests,
+        })
+        if delta is None:
+            print("Coin list unavailable, skipping ingest")
+            return False
+
         # Variables
-        all_coins = self.ingest_api_handler.fetch_all_coins()
+        meme_index = state.meme_coins  # Name -> Symbol of every known meme coin
         meme_coins = []
         new_meme_coins = []
-        last_coin = MemeCoins.objects.order_by('-coin_creation_date').first()
-        utc = pytz.UTC
-
-        # Filter out coins that are not trading
-        for key, value in all_coins.items():
-            if value.get("IsTrading", False):
-                if self.ingest_api_handler.is_meme_coin(value):
-                    meme_coins.append(value)
 
-        # Insert only new meme coins
+        # Filter out coins that are not trading, streaming the coin list
+        changed = 0
+        for name, value in delta["coins"]:
+            changed += 1
+            if value.get("IsTrading", False) and self.ingest_api_handler.is_meme_coin(value):
+                meme_index[name] = value.get("Symbol")
+                meme_coins.append(value)
+            else:
+                meme_index.pop(name, None)
+
+        removed = set(state.digests) - set(delta["digests"])
+        for name in removed:
+            meme_index.pop(name, None)
+        print(f"Coin list delta: {changed} added or changed, {len(removed)} removed")
+
+        # Insert only meme coins that are not stored yet, whatever their launch date
+        known_coins = set(MemeCoins.objects.values_list('coin_id', flat=True))
         for coin in meme_coins:
-            asset_launch_date_str = coin.get("AssetLaunchDate")
-            if not asset_launch_date_str or asset_launch_date_str == "0000-00-00":
+            if coin.get("Name") in known_coins:
+                continue
+            if parse_launch_date(coin.get("AssetLaunchDate")) is None:
                 print(f"Skipping invalid date for coin: {coin.get('Name')}")
                 continue  # Skip this coin
-
-            asset_launch_date = utc.localize(datetime.datetime.strptime(asset_launch_date_str, '%Y-%m-%d'))
-            last_coin_date = last_coin.coin_creation_date.astimezone(utc)
-        
-            if asset_launch_date > last_coin_date:
-                new_meme_coins.append(coin)
+            new_meme_coins.append(coin)
 
         print("Number of new meme coins: ", len(new_meme_coins))
-        self.ingest_db_handler.save_meme_coins(new_meme_coins)
-
-        # Add SOL Coin
-        meme_coins.append({"Name": "SOL", "Symbol": "SOL", "AssetLaunchDate": "2017-06-26"})
-
-
-        # Save market data
-        for coin in meme_coins:
-            coin_data = self.ingest_api_handler.fetch_coin_data(coin.get("Symbol"))
-            if coin_data:
-                self.ingest_db_handler.save_market_data(coin.get("Name"), coin.get("Symbol"), "USD", coin_data)
-
+        saved_coins = {coin.coin_id for coin in self.ingest_db_handler.save_meme_coins(new_meme_coins)}
+        # Coins whose insert failed lose their digest, so the next delta yields them again
+        failed_coins = [coin.get("Name") for coin in new_meme_coins if coin.get("Name") not in saved_coins]
+        for name in failed_coins:
+            delta["digests"].pop(name, None)
+        if failed_coins:
+            print(f"Retrying {len(failed_coins)} meme coins next cycle")
+
+        # Market data is fetched for every known meme coin plus SOL
+        market_coins = [{"Name": name, "Symbol": symbol} for name, symbol in meme_index.items()]
+        market_coins.append({"Name": "SOL", "Symbol": "SOL", "AssetLaunchDate": "2017-06-26"})
+
+        # Save market data, packing many symbols into each request
+        coins_data = self.ingest_api_handler.fetch_coins_data([coin.get("Symbol") for coin in market_coins])
+        market_data = []
+        for coin in market_coins:
+            row = self.ingest_db_handler.parse_market_data(coin.get("Name"), coin.get("Symbol"), "USD", coins_data)
+            if row:
+                market_data.append(row)
+        # Stores maintained on ingest only see the ticks that were saved
+        market_data = self.ingest_db_handler.save_market_data_bulk(market_data)
+        self.indicator_store.update(market_data)
+        self.latest_quotes.update(market_data)
+        self.candle_store.update(market_data)
+        self.insight_cache.invalidate({row.coin_id for row in market_data})
+
+        # No version when coins are retried, as an unchanged coin list would skip the diff
+        state.coin_list_version = None if failed_coins else delta["version"]
+        state.digests = delta["digests"]
+        state.meme_coins = meme_index
+        state.coins_ingested += len(saved_coins)
+        state.save()
         return True
 
 
@@ -79,30 +139,84 @@ class TradingBot:
 
     def get_coin_insights(self, coin_symbol):
         """Get comprehensive insights for decision-making"""
-        # Get latest entry for each market
-        latest_subquery = MarketData.objects.filter(
-            coin_id=coin_symbol,
-            market=OuterRef('market')
-        ).order_by('-last_updated').values('last_updated')[:1]
-
-        latest_data = MarketData.objects.filter(
-            coin_id=coin_symbol,
-            last_updated=Subquery(latest_subquery)
-        )
+        return self.get_insights_batch([coin_symbol]).get(coin_symbol, {})
+
+    def get_insights_batch(self, coin_symbols):
+        """
+            Insights for many coins in a fixed number of queries: the best
+            market quotes, the indicator states and the recent price history
+            are each fetched once for all symbols. Insights of symbols without
+            a newer tick come from the insight cache. Returns a dict of
+            insights keyed by symbol; symbols without market data are left out.
+        """
+        coin_symbols = list(dict.fromkeys(coin_symbols))
+        if not coin_symbols:
+            return {}
 
-        if not latest_data.exists():
+        # Latest tick of the highest volume market, from the quotes kept on ingest
+        best_markets = self.latest_quotes.best_many(coin_symbols)
+        missing = [coin_symbol for coin_symbol in coin_symbols if coin_symbol not in best_markets]
+        if missing:
+            # Quotes not backfilled yet, pick the latest entry for each market
+            for market_data in latest_market_data(missing):
+                best = best_markets.get(market_data.coin_id)
+                if best is None or (market_data.volume_24h_base or 0) > (best.volume_24h_base or 0):
+                    best_markets[market_data.coin_id] = market_data
+        if not best_markets:
             return {}
 
-        # Select market with highest volume
-        market_data = latest_data.order_by('-volume_24h_base').first()
+        # Unchanged since the last computation: no new tick and same indicator settings
+        insights, versions = {}, {}
+        for coin_id, market_data in list(best_markets.items()):
+            versions[coin_id] = (
+                market_data.market, market_data.last_updated, self.indicator_timeframe, self.indicator_lookback
+            )
+            cached = self.insight_cache.get(coin_id, versions[coin_id])
+            if cached is not None:
+                insights[coin_id] = cached
+                del best_markets[coin_id]
+        if not best_markets:
+            return insights
+
+        pairs = [(coin_id, market_data.market) for coin_id, market_data in best_markets.items()]
+        if self.indicator_timeframe:
+            # Indicators over candles, the tick based states do not apply
+            states = {}
+            histories = indicators.load_candle_histories(pairs, self.indicator_timeframe, limit=self.indicator_lookback)
+        else:
+            states = {
+                (state.coin_id, state.market): state
+                for state in IndicatorState.objects.filter(coin_id__in=best_markets)
+            }
+            histories = indicators.load_histories(pairs, limit=self.indicator_lookback)
+
+        for coin_id, market_data in best_markets.items():
+            insights[coin_id] = self._build_insights(
+                market_data,
+                states.get((coin_id, market_data.market)),
+                histories[(coin_id, market_data.market)],
+            )
+            self.insight_cache.set(coin_id, versions[coin_id], insights[coin_id])
+        return insights
 
+    def _build_insights(self, market_data, indicator_state, history):
         # Calculate technical indicators
-        rsi = self.calculate_rsi(coin_symbol, market_data.market)
-        ma_50 = self.calculate_ma(coin_symbol, market_data.market, 50)
-        ma_200 = self.calculate_ma(coin_symbol, market_data.market, 200)
+        ma_windows = self.indicator_store.ma_windows
+        technicals = indicators.compute_indicators(
+            history['price'], history['high'], history['low'], ma_windows=ma_windows
+        )
+        if indicator_state:
+            rsi = self.indicator_store.rsi(indicator_state)
+            moving_averages = {
+                f'ma_{window}': self.indicator_store.ma(indicator_state, window) for window in ma_windows
+            }
+        else:
+            # Candle timeframe, or no state yet: use the loaded history
+            rsi = technicals['rsi_14']
+            moving_averages = {f'ma_{window}': technicals[f'ma_{window}'] for window in ma_windows}
 
         return {
-            'symbol': coin_symbol,
+            'symbol': market_data.coin_id,
             'market': market_data.market,
             'price': float(market_data.price),
             'currency': market_data.currency,
@@ -112,54 +226,30 @@ class TradingBot:
             'market_cap': float(market_data.market_cap),
             'circulating_supply': market_data.circulating_supply,
             'total_supply': market_data.total_supply,
+            'indicator_timeframe': self.indicator_timeframe or 'tick',
             'rsi_14': rsi,
-            'ma_50': ma_50,
-            'ma_200': ma_200,
+            **moving_averages,  # ma_50, ma_200 and any other MA_WINDOWS
             'last_updated': market_data.last_updated,
             # Additional metrics can be added below
             'market_cap_rank': market_data.market_cap_rank,
             'high_24h': float(market_data.high_24h),
             'low_24h': float(market_data.low_24h),
+            'ema_12': technicals['ema_12'],
+            'ema_26': technicals['ema_26'],
+            'macd': technicals['macd'],
+            'macd_signal': technicals['macd_signal'],
+            'bollinger_upper': technicals['bollinger_upper'],
+            'bollinger_lower': technicals['bollinger_lower'],
+            'atr_14': technicals['atr_14'],
         }
 
     def calculate_rsi(self, coin_symbol, market, period=14):
         """Calculate Relative Strength Index for the specified market"""
-        historical = MarketData.objects.filter(
-            coin_id=coin_symbol,
-            market=market
-        ).order_by('last_updated')
-
-        prices = [h.price for h in historical]
-        if len(prices) < period + 1:
-            return 0
-
-        deltas = [prices[i] - prices[i-1] for i in range(1, len(prices))]
-        gains = [d if d > 0 else 0 for d in deltas]
-        losses = [-d if d < 0 else 0 for d in deltas]
-
-        avg_gain = sum(gains[:period]) / period
-        avg_loss = sum(losses[:period]) / period
-
-        for i in range(period, len(gains)):
-            avg_gain = (avg_gain * (period-1) + gains[i]) / period
-            avg_loss = (avg_loss * (period-1) + losses[i]) / period
-
-        if avg_loss == 0:
-            return 100.0
-        rs = avg_gain / avg_loss
-        return 100 - (100 / (1 + rs))
+        return indicators.last(indicators.rsi(indicators.load_prices(coin_symbol, market), period))
 
     def calculate_ma(self, coin_symbol, market, window):
         """Calculate Moving Average for the specified market"""
-        historical = MarketData.objects.filter(
-            coin_id=coin_symbol,
-            market=market
-        ).order_by('-last_updated')[:window]
-
-        if len(historical) < window:
-            return 0.0
-
-        return sum([h.price for h in historical]) / window
+        return indicators.last(indicators.sma(indicators.load_prices(coin_symbol, market, limit=window), window))
 
     def close_trade(self, trade_id):
         """Execute sell order and update trade record"""
@@ -193,43 +283,37 @@ class TradingBot:
             print(f"Failed to buy {coin.coin_symbol}: {e}")
             return None
 
-    def update_trade(self, trade_id):
-        """Update trade parameters based on market conditions"""
-        try:
-            trade = Trades.objects.get(pk=trade_id)
-            trade.status = "HOLD"
-            trade.save()
-            return True
-        except Exception as e:
-            print(f"Failed to update trade: {e}")
-            return None
-
-
     def execute_trading_cycle(self):
         """Enhanced trading cycle with proper error handling"""
         try:
             print("Ingesting data...")
             self.ingest_all_data()
             print("Data ingested successfully.")
-            newest_coins = self.get_newest_coins()
-            active_trades = Trades.objects.filter(status='OPEN')
+            newest_coins = list(self.get_newest_coins())
+            active_trades = list(Trades.objects.filter(status='OPEN'))
+            coin_insights = self.get_insights_batch(
+                [trade.coin_id for trade in active_trades] + [coin.coin_symbol for coin in newest_coins]
+            )
+
+            evaluations = self.filtering_algorithm.evaluate_many(coin_insights, active_trades)
+            open_positions = Counter(trade.coin_id for trade in active_trades)
 
             # Process existing trades first
-            for trade in active_trades:
-                insights = self.get_coin_insights(trade.coin_id)
-                evaluation = self.filtering_algorithm.evaluate_coin(insights)
-                
+            for coin_symbol in open_positions.copy():
+                evaluation = evaluations.get(coin_symbol, {})
+
+                # Held trades stay OPEN so the next cycle evaluates them again
                 for trade_eval in evaluation.get("trades", []):
-                    if trade_eval["action"] == "SELL":
-                        self.close_trade(trade_eval["id"])
-                    elif trade_eval["action"] == "HOLD":
-                        self.update_trade(trade_eval["id"])
+                    if trade_eval["action"] == Trades.SELL:
+                        if self.close_trade(trade_eval["id"]):
+                            open_positions[coin_symbol] -= 1
 
             # Process new buy opportunities
             buy_candidates = []
             for coin in newest_coins:
-                insights = self.get_coin_insights(coin.coin_symbol)
-                evaluation = self.filtering_algorithm.evaluate_coin(insights)
+                evaluation = evaluations.get(coin.coin_symbol)
+                if evaluation is None:
+                    continue  # No market data yet
 
                 print(f"Evaluation for {coin.coin_symbol}: {evaluation}")
 
@@ -238,10 +322,10 @@ class TradingBot:
 
             # Execute top 3 buy candidates sorted by score
             for coin, _ in sorted(buy_candidates, key=lambda x: x[1], reverse=True)[:3]:
-                existing = Trades.objects.filter(coin_id=coin.coin_symbol, status='OPEN')
-                if not existing.exists():  # Prevent duplicate positions
+                if open_positions[coin.coin_symbol] <= 0:  # Prevent duplicate positions
                     self.register_trade(coin)
 
+            print(f"Insight cache: {self.insight_cache.stats()}")
             print("Trading cycle completed successfully")
         except Exception as e:
             print(f"Error in trading cycle: {e}")